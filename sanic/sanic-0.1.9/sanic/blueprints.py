@@ -29,14 +29,17 @@ class BlueprintSetup:
 
     # 辅助接口:
     #   - 调用 Sanic 对象的实现
-    def add_route(self, handler, uri, methods):
+    def add_route(self, handler, uri, methods, cache_size=None,
+                  stream=False, concurrency_limit=None):
         """
         A helper method to register a handler to the application url routes.
         """
         if self.url_prefix:
             uri = self.url_prefix + uri
 
-        self.app.route(uri=uri, methods=methods)(handler)
+        self.app.route(uri=uri, methods=methods, cache_size=cache_size,
+                       stream=stream,
+                       concurrency_limit=concurrency_limit)(handler)
 
     #
     # 辅助接口:
@@ -133,12 +136,15 @@ class Blueprint:
     # 路由装饰器:
     #   - s 是 BlueprintSetup()对象
     #
-    def route(self, uri, methods=None):
+    def route(self, uri, methods=None, cache_size=None, stream=False,
+              concurrency_limit=None):
         """
         """
         def decorator(handler):    # 装饰器
             # 登记延迟执行的函数
-            self.record(lambda s: s.add_route(handler, uri, methods))   # s 是 BlueprintSetup()对象
+            self.record(lambda s: s.add_route(
+                handler, uri, methods, cache_size, stream,
+                concurrency_limit))   # s 是 BlueprintSetup()对象
             return handler
         return decorator
 
@@ -146,11 +152,13 @@ class Blueprint:
     # 添加路由:
     #   - s 是 BlueprintSetup()对象
     #
-    def add_route(self, handler, uri, methods=None):
+    def add_route(self, handler, uri, methods=None, cache_size=None,
+                  stream=False, concurrency_limit=None):
         """
         """
         # 登记延迟执行的函数
-        self.record(lambda s: s.add_route(handler, uri, methods))    # s 是 BlueprintSetup()对象
+        self.record(lambda s: s.add_route(
+            handler, uri, methods, cache_size, stream, concurrency_limit))    # s 是 BlueprintSetup()对象
         return handler
 
     def listener(self, event):
@@ -0,0 +1,187 @@
+from asyncio import get_event_loop
+from zlib import compressobj, DEFLATED
+
+from .response import HTTPResponse
+
+#
+# brotli:
+#   - 可选依赖, 未安装时只支持 gzip
+#   - brotli 或 brotlicffi, 接口相同
+#
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+#
+# 支持的压缩格式, 按服务端偏好排序:
+#   - 客户端同时接受多种格式(且权重相同)时, 优先使用靠前的
+#
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+#
+# 预压缩文件的后缀, 见 sanic.static
+#
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+#
+# 可压缩的内容类型:
+#   - 图片, 视频, 压缩包等已压缩的格式, 再压缩只会浪费 CPU
+#
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'application/xml', 'application/xhtml+xml',
+                      'application/rss+xml', 'application/atom+xml',
+                      'image/svg+xml')
+
+#
+# Accept-Encoding 解析结果缓存:
+#   - 客户端发送的 Accept-Encoding 取值很少, 缓存后不必每次解析
+#   - 超过上限时清空, 防止任意取值撑大缓存
+#
+ACCEPT_ENCODING_CACHE_SIZE = 256
+_accept_encodings = {}
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+#
+# 解析 Accept-Encoding:
+#   - 返回客户端接受的压缩格式, 按权重, 再按服务端偏好排序
+#   - q=0 表示拒绝; '*' 匹配其余未列出的格式
+#
+def accepted_encodings(accept_encoding):
+    try:
+        return _accept_encodings[accept_encoding]
+    except KeyError:
+        pass
+
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    default = weights.get('*', 0.0)
+    ranked = sorted(
+        (-weights.get(encoding, default), index, encoding)
+        for index, encoding in enumerate(ENCODINGS))
+    encodings = tuple(encoding for weight, _, encoding in ranked if weight)
+
+    if len(_accept_encodings) >= ACCEPT_ENCODING_CACHE_SIZE:
+        _accept_encodings.clear()
+    _accept_encodings[accept_encoding] = encodings
+    return encodings
+
+
+#
+# 压缩数据:
+#   - gzip: zlib 直接输出 gzip 格式(wbits=31), 头部不含时间戳, 相同内容压缩结果相同
+#
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    compressor = compressobj(gzip_level, DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+##################################################################################
+#                              响应压缩
+#
+# 说明:
+#   - 由 Sanic.handle_request() 在响应中间件之后调用, Config.COMPRESS_RESPONSES 启用
+#   - 只压缩 HTTPResponse 的 body, 流式响应, 已指定 Content-Encoding 的响应不处理
+#   - min_size: 小于此大小的 body 不压缩, 压缩收益抵不上开销
+#   - thread_size: 不小于此大小的 body, 交给线程池压缩, 不阻塞事件循环
+#       - zlib 与 brotli 压缩时释放 GIL
+#
+##################################################################################
+class Compressor:
+    __slots__ = ('min_size', 'thread_size', 'gzip_level', 'brotli_quality',
+                 'executor')
+
+    def __init__(self, min_size=500, thread_size=65536, gzip_level=6,
+                 brotli_quality=4, executor=None):
+        self.min_size = min_size
+        self.thread_size = thread_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.executor = executor          # None: 事件循环默认的线程池
+
+    #
+    # 压缩响应:
+    #   - 就地修改 response, HTTP 头复制后修改
+    #   - 需要在线程池中压缩时, 返回协程, 由调用者 await; 否则返回 None
+    #
+    def compress_response(self, request, response):
+        if type(response) is not HTTPResponse or response.status < 200 or \
+                response.status in (204, 206, 304):
+            return None
+        body = response.body
+        if len(body) < self.min_size or \
+                not is_compressible(response.content_type):
+            return None
+        if 'Content-Encoding' in response.headers:
+            return None
+
+        # 调用者传入的 headers 可能被多个响应共用, 复制后再修改
+        headers = response.headers = response.headers.copy()
+        vary = headers.get('Vary')
+        if not vary:
+            headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            headers['Vary'] = vary + ', Accept-Encoding'
+
+        accept_encoding = request.headers.get('Accept-Encoding')
+        if not accept_encoding:
+            return None
+        encodings = accepted_encodings(accept_encoding)
+        if not encodings:
+            return None
+
+        encoding = encodings[0]
+        if len(body) >= self.thread_size:
+            return self.compress_in_thread(response, encoding)
+        self.set_body(response, encoding, self.compress(body, encoding))
+        return None
+
+    async def compress_in_thread(self, response, encoding):
+        self.set_body(response, encoding,
+                      await self.compress_bytes(response.body, encoding))
+
+    #
+    # 压缩数据, 大数据交给线程池
+    #
+    async def compress_bytes(self, data, encoding):
+        if len(data) < self.thread_size:
+            return self.compress(data, encoding)
+        return await get_event_loop().run_in_executor(
+            self.executor, compress, data, encoding, self.gzip_level,
+            self.brotli_quality)
+
+    def compress(self, data, encoding):
+        return compress(data, encoding, self.gzip_level, self.brotli_quality)
+
+    #
+    # 压缩后的响应:
+    #   - 压缩后的内容与原内容不同, 强 ETag 改为弱 ETag
+    #
+    @staticmethod
+    def set_body(response, encoding, body):
+        response.body = body
+        headers = response.headers
+        headers['Content-Encoding'] = encoding
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = 'W/' + etag
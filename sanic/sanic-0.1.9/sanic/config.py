@@ -21,5 +21,25 @@ class Config:
  ▀▀▄▄▀
 """
     REQUEST_MAX_SIZE = 100000000         # 100 megababies   允许最大请求数
+    REQUEST_BUFFER_QUEUE_SIZE = 100      # 流式请求体, 未读取的数据块上限, 超过后暂停读取 socket
     REQUEST_TIMEOUT = 60                 # 60 seconds   请求超时
-    ROUTER_CACHE_SIZE = 1024             # 路由缓存最大数目, sanic.router.Router._get() 中引用
+    KEEP_ALIVE_TIMEOUT = 5               # 5 seconds    长连接空闲超时, 超时后关闭连接
+    GRACEFUL_SHUTDOWN_TIMEOUT = 15       # 15 seconds   多进程: worker 停止时处理完连接的时限, 超时强制结束
+    WORKER_CPU_AFFINITY = False          # 多进程: 每个 worker 绑定一个 CPU
+    REQUEST_PIPELINE_CONCURRENCY = 8     # 流水线请求, 同一连接上同时执行的 handler 数目上限
+    CONCURRENCY_LIMIT = 0                # 每个 worker 同时执行的 handler 上限, 0 表示不限制
+    CONCURRENCY_QUEUE_SIZE = 100         # 达到并发上限后, 等待执行的请求上限, 超过后返回 503
+    CONCURRENCY_RETRY_AFTER = 1          # 1 second     503 响应的 Retry-After
+    MAX_LOOP_LAG = 0                     # 事件循环延迟超过此秒数时, 新请求直接返回 503; 0 表示不启用
+    REQUEST_LAZY_HEADERS = False         # 延迟解析 HTTP 头: 首次访问 request.headers 时才解码
+    RESPONSE_WRITELINES_SIZE = 65536     # 响应体不小于此大小, HTTP 头与响应体分开写出, 不再拼接; 0 表示不启用
+    COMPRESS_RESPONSES = False           # 按 Accept-Encoding 压缩响应(gzip, 安装 brotli 时支持 br)
+    COMPRESS_MIN_SIZE = 500              # 响应体不小于此大小, 才压缩
+    COMPRESS_THREAD_SIZE = 65536         # 响应体不小于此大小, 在线程池中压缩, 不阻塞事件循环
+    COMPRESS_GZIP_LEVEL = 6              # gzip 压缩级别 1-9
+    COMPRESS_BROTLI_QUALITY = 4          # brotli 压缩质量 0-11, 动态响应宜用较低值
+    STATIC_CACHE_CHECK_INTERVAL = 1      # 静态文件信息缓存, 每隔多少秒重新 stat() 检查文件是否变化
+    STATIC_CONTENT_CACHE_SIZE = 0        # 静态文件内容缓存总字节数, 0 表示不缓存内容
+    STATIC_CONTENT_CACHE_FILE_SIZE = 65536   # 单个静态文件不超过此大小, 才缓存内容
+    ROUTER_CACHE_SIZE = 1024             # 路由缓存最大数目, sanic.router.Router.get() 中引用
+    ROUTER_ROUTE_CACHE_SIZE = 128        # 单个动态路由的缓存最大数目, 防止高基数 URL 挤占其他路由
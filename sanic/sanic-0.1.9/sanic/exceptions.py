@@ -52,6 +52,16 @@ class PayloadTooLarge(SanicException):
     status_code = 413
 
 
+# 503:
+class ServiceUnavailable(SanicException):
+    status_code = 503
+
+
+# 416:
+class ContentRangeError(SanicException):
+    status_code = 416
+
+
 #########################################
 #             异常处理器
 #
@@ -61,13 +71,33 @@ class PayloadTooLarge(SanicException):
 #########################################
 class Handler:
     handlers = None
+    cached_handlers = None
 
     def __init__(self, sanic):
         self.handlers = {}
+        self.cached_handlers = {}    # 异常类型: 解析出的 handler, 注册新 handler 时清空
         self.sanic = sanic
 
     def add(self, exception, handler):
         self.handlers[exception] = handler
+        self.cached_handlers.clear()
+
+    #
+    # 查找异常类型对应的 handler:
+    #   - 沿 MRO 查找, 为基类注册的 handler 同样处理子类异常
+    #   - 结果按异常类型缓存, 之后同类型异常查找为 O(1)
+    #
+    def lookup(self, exception_type):
+        try:
+            return self.cached_handlers[exception_type]
+        except KeyError:
+            handler = self.default
+            for cls in exception_type.__mro__:
+                if cls in self.handlers:
+                    handler = self.handlers[cls]
+                    break
+            self.cached_handlers[exception_type] = handler
+            return handler
 
     def response(self, request, exception):
         """
@@ -76,7 +106,7 @@ class Handler:
         :param exception: Exception to handle
         :return: Response object
         """
-        handler = self.handlers.get(type(exception), self.default)
+        handler = self.lookup(type(exception))
         response = handler(request=request, exception=exception)
         return response
 
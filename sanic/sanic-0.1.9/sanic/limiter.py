@@ -0,0 +1,91 @@
+from collections import deque
+from functools import partial
+
+
+##################################################################################
+#                              并发限制与过载保护
+#
+# 说明:
+#   - 每个 worker 一个, 所有连接共用, 由 serve() 创建
+#   - limit: 同时执行的 handler 总数上限, 0 表示不限制
+#   - route_limits: {路由 uri: 上限}, 单个路由同时执行的 handler 数上限
+#   - 达到上限的请求进入等待队列(FIFO), 有 handler 结束时依次启动
+#       - 等待队列已满: 拒绝请求, 由 HttpProtocol 立即返回 503 + Retry-After
+#       - 只受路由上限限制的请求, 不阻塞其他路由的请求
+#   - max_lag: 事件循环延迟(由时间轮每次 tick 测量)超过此秒数时, 拒绝所有新请求
+#       - 事件循环已过载, 排队只会让所有请求一起变慢
+#
+##################################################################################
+class ConcurrencyLimiter:
+    __slots__ = ('limit', 'queue_size', 'route_limits', 'retry_after',
+                 'max_lag', 'timer_wheel', 'active', 'route_active', 'queue',
+                 'rejected')
+
+    def __init__(self, limit=0, queue_size=100, route_limits=None,
+                 retry_after=1, max_lag=0, timer_wheel=None):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.route_limits = route_limits or {}
+        self.retry_after = retry_after      # 503 响应的 Retry-After 秒数
+        self.max_lag = max_lag
+        self.timer_wheel = timer_wheel      # 提供事件循环延迟: timer_wheel.lag
+        self.active = 0                     # 正在执行的 handler 数
+        self.route_active = {}              # {路由 uri: 正在执行的数目}
+        self.queue = deque()                # 等待中的请求: (路由, 启动函数)
+        self.rejected = 0                   # 已拒绝的请求数
+
+    #
+    # 提交一个请求:
+    #   - key: 有路由上限的请求, 为其路由 uri; 否则为 None
+    #   - start: 启动 handler 的函数, 返回 handler 任务, 连接已断开时返回 None
+    #   - 返回 False: 请求被拒绝
+    #
+    def submit(self, key, start):
+        if self.max_lag and self.timer_wheel.lag > self.max_lag:
+            self.rejected += 1
+            return False
+        if self.has_capacity(key):
+            self.run(key, start)
+            return True
+        if len(self.queue) >= self.queue_size:
+            self.rejected += 1
+            return False
+        self.queue.append((key, start))
+        return True
+
+    def has_capacity(self, key):
+        if self.limit and self.active >= self.limit:
+            return False
+        if key is not None and \
+                self.route_active.get(key, 0) >= self.route_limits[key]:
+            return False
+        return True
+
+    def run(self, key, start):
+        task = start()
+        if task is None:     # 排队期间连接已断开
+            return
+        self.active += 1
+        if key is not None:
+            self.route_active[key] = self.route_active.get(key, 0) + 1
+        task.add_done_callback(partial(self.release, key))
+
+    #
+    # handler 结束:
+    #   - 按排队顺序, 启动有空闲名额的请求
+    #
+    def release(self, key, task=None):
+        self.active -= 1
+        if key is not None:
+            self.route_active[key] -= 1
+
+        queue = self.queue
+        index = 0
+        while index < len(queue) and not (self.limit and
+                                          self.active >= self.limit):
+            key, start = queue[index]
+            if self.has_capacity(key):
+                del queue[index]
+                self.run(key, start)
+            else:
+                index += 1
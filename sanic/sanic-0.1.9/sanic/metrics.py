@@ -0,0 +1,194 @@
+from bisect import bisect_left
+from os import getpid
+from time import perf_counter, time
+
+#
+# 延迟直方图的桶上限(秒):
+#   - 固定的 1-2-5 对数分桶, 100us ~ 10s, 超过 10s 的请求落入最后一个桶
+#   - 桶固定, 记录时只需 bisect 定位并计数, 不保存原始样本
+#
+LATENCY_BUCKETS = (0.0001, 0.0002, 0.0005,
+                   0.001, 0.002, 0.005,
+                   0.01, 0.02, 0.05,
+                   0.1, 0.2, 0.5,
+                   1, 2, 5, 10)
+
+#
+# 请求处理的各阶段:
+#   - request_middleware: 请求中间件
+#   - routing: router.get() 路由查找
+#   - handler: handler 执行
+#   - response: 响应中间件, 以及异常时的错误处理
+#   - write: 写出响应(流式响应包括整个写出过程)
+#
+PHASES = ('request_middleware', 'routing', 'handler', 'response', 'write')
+
+#
+# 未匹配到路由(404, 405, 中间件直接返回响应)的请求, 统一记录在此名下
+#
+UNMATCHED = '<unmatched>'
+
+
+###############################################################
+#             单个路由的统计
+#
+# 说明:
+#   - count: 已完成的请求数
+#   - in_flight: 正在处理的请求数
+#   - errors: 状态码 >= 500 的响应数
+#   - cancelled: 未产生响应即被取消的请求数(超时, 连接断开)
+#   - buckets: 延迟直方图, 与 LATENCY_BUCKETS 一一对应, 多一个溢出桶
+#   - phases: 各阶段累计耗时, 与 PHASES 一一对应
+#
+###############################################################
+class RouteStats:
+    __slots__ = ('uri', 'count', 'in_flight', 'errors', 'cancelled',
+                 'total', 'max', 'buckets', 'phases')
+
+    def __init__(self, uri):
+        self.uri = uri
+        self.count = 0
+        self.in_flight = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.phases = [0.0] * len(PHASES)
+
+    #
+    # 延迟分位数:
+    #   - 返回分位数所在桶的上限, 溢出桶返回最大延迟
+    #
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'in_flight': self.in_flight,
+            'errors': self.errors,
+            'cancelled': self.cancelled,
+            'mean': self.total / count,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'histogram': list(self.buckets),
+            'phases': {phase: total / count
+                       for phase, total in zip(PHASES, self.phases)},
+        }
+
+
+###############################################################
+#             请求统计
+#
+# 说明:
+#   - 由 Sanic.handle_request() 在各阶段之间打点, 请求结束时调用 record()
+#   - 每个 worker 进程各自统计, 事件循环单线程, 无需加锁
+#       - 多进程时, snapshot() 只包含当前 worker 的数据, 以 pid 区分
+#   - 按请求匹配到的路由(见 Router.match())统计, 以路由的 URL 模板区分
+#       - 同一 handler 注册在多个 URL 上时, 各 URL 分别统计
+#   - 启用方式见 sanic.sanic.Sanic.enable_metrics()
+#
+###############################################################
+class Metrics:
+    timer = staticmethod(perf_counter)
+
+    def __init__(self, router):
+        self.router = router
+        self.routes = {}                      # {路由 uri: RouteStats}
+        self.unmatched = RouteStats(UNMATCHED)
+        self.requests = 0                     # 已完成的请求数
+        self.in_flight = 0                    # 正在处理的请求数
+        self.started = time()
+
+    #
+    # 请求已匹配到路由:
+    #   - route: sanic.router.Route, 未匹配到时为 None, 不单独统计
+    #   - 返回该路由的统计, 请求结束时交给 record()
+    #
+    def enter(self, route):
+        if route is None:
+            return None
+        try:
+            stats = self.routes[route.uri]
+        except KeyError:
+            stats = self.routes[route.uri] = RouteStats(route.uri)
+        stats.in_flight += 1
+        return stats
+
+    #
+    # 记录一个已结束的请求:
+    #   - stats: enter() 的返回值, 未匹配到 handler 时为 None
+    #   - response: 未产生响应(被取消)时为 None
+    #   - started ~ responded: 请求开始, 及前 4 个阶段结束的时间点, 见 PHASES
+    #
+    def record(self, stats, response, started, middleware_done, routed,
+               handled, responded):
+        now = self.timer()
+        self.requests += 1
+        self.in_flight -= 1
+        if stats is None:
+            stats = self.unmatched
+        else:
+            stats.in_flight -= 1
+
+        elapsed = now - started
+        stats.count += 1
+        stats.total += elapsed
+        if elapsed > stats.max:
+            stats.max = elapsed
+        stats.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+        if response is None:
+            stats.cancelled += 1
+        elif response.status >= 500:
+            stats.errors += 1
+
+        phases = stats.phases
+        phases[0] += middleware_done - started
+        phases[1] += routed - middleware_done
+        phases[2] += handled - routed
+        phases[3] += responded - handled
+        phases[4] += now - responded
+
+    #
+    # 拉取统计数据:
+    #   - 返回可直接序列化为 JSON 的字典
+    #
+    def snapshot(self):
+        routes = {stats.uri: stats.snapshot()
+                  for stats in self.routes.values()}
+        if self.unmatched.count or self.unmatched.in_flight:
+            routes[UNMATCHED] = self.unmatched.snapshot()
+        return {
+            'pid': getpid(),
+            'uptime': time() - self.started,
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'buckets': list(LATENCY_BUCKETS),
+            'phases': list(PHASES),
+            'routes': routes,
+        }
+
+    #
+    # 清空统计, 正在处理的请求数保留
+    #
+    def reset(self):
+        for stats in self.routes.values():
+            in_flight = stats.in_flight
+            stats.__init__(stats.uri)
+            stats.in_flight = in_flight
+        self.unmatched = RouteStats(UNMATCHED)
+        self.requests = 0
+        self.started = time()
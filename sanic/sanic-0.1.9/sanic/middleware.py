@@ -0,0 +1,44 @@
+from inspect import isawaitable, iscoroutinefunction
+
+from .response import HTTPResponse
+
+
+##################################################################################
+#                              中间件与 handler 调用编译
+#
+# 说明:
+#   - 服务启动时, 区分每个中间件/handler 是协程函数还是普通函数
+#       - 协程函数: 直接 await, 不再逐个调用 isawaitable()
+#       - 普通函数: 返回值为空或为 HTTPResponse 时, 不再检查
+#           - 只有返回其他对象时, 才检查是否可 await(兼容返回协程的普通函数)
+#   - 中间件列表编译为 (中间件, 是否为协程函数) 元组, 在 handle_request() 中直接遍历
+#       - 不为每个请求额外创建协程, 没有中间件时遍历空元组
+#   - 由 sanic.Sanic.compile_dispatch() 调用
+#
+##################################################################################
+
+#
+# 普通函数的非空返回值:
+#   - HTTPResponse: 直接使用
+#   - 其他可 await 对象: 需要 await
+#
+def needs_await(result):
+    return not isinstance(result, HTTPResponse) and isawaitable(result)
+
+
+#
+# 编译中间件调用链:
+#   - 返回 ((中间件, 是否为协程函数), ...)
+#
+def compile_middleware(middlewares):
+    return tuple((middleware, iscoroutinefunction(middleware))
+                 for middleware in middlewares)
+
+
+#
+# 编译 handler:
+#   - 返回是否为协程函数
+#   - 类视图等可调用对象, 按普通函数处理
+#
+def compile_handler(handler):
+    return iscoroutinefunction(handler)
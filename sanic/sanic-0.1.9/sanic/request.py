@@ -1,14 +1,17 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+from asyncio import Queue
 from cgi import parse_header
 from collections import namedtuple
 from http.cookies import SimpleCookie
 from httptools import parse_url
+from multidict import CIMultiDict
+from tempfile import TemporaryFile
 from urllib.parse import parse_qs
-from ujson import loads as json_loads
 from sanic.exceptions import InvalidUsage
 
 from .log import log
+from .response import JSON
 
 #
 # 如果 media 文件类型未知, 默认配置如下类型
@@ -56,6 +59,78 @@ class RequestParameters(dict):
         return self.super.get(name, default)
 
 
+##################################################################################
+#                              延迟解析的 HTTP 头
+#
+# 说明:
+#   - 保存 httptools 回调得到的原始 (bytes, bytes) 列表, 不做解码
+#   - 首次访问时, 才解码并构建大小写不敏感的 CIMultiDict, 之后的访问都交给它
+#       - 同时补上 Remote-Addr 头, 与非延迟模式一致
+#   - handler 不读取 HTTP 头时, 省去每个请求的解码与字典构建
+#   - Config.REQUEST_LAZY_HEADERS = True 时启用, 见 HttpProtocol.on_headers_complete()
+#
+##################################################################################
+class LazyHeaders:
+    """
+    Case-insensitive multi-dict of request headers, decoded on first access
+    """
+    __slots__ = ('_raw', '_transport', '_headers')
+
+    def __init__(self, raw, transport=None):
+        self._raw = raw                # [(bytes, bytes), ...]
+        self._transport = transport    # 用于补上 Remote-Addr 头
+        self._headers = None           # 解码后的 CIMultiDict
+
+    #
+    # 解码并构建 CIMultiDict, 只执行一次
+    #
+    def decode(self):
+        headers = self._headers
+        if headers is None:
+            items = [(name.decode(), value.decode('utf-8'))
+                     for name, value in self._raw]
+            if self._transport is not None:
+                remote_addr = self._transport.get_extra_info('peername')
+                if remote_addr:
+                    items.append(('Remote-Addr', '%s:%s' % remote_addr[:2]))
+            headers = self._headers = CIMultiDict(items)
+            self._raw = self._transport = None
+        return headers
+
+    def get(self, key, default=None):
+        return self.decode().get(key, default)
+
+    def __getitem__(self, key):
+        return self.decode()[key]
+
+    def __setitem__(self, key, value):
+        self.decode()[key] = value
+
+    def __delitem__(self, key):
+        del self.decode()[key]
+
+    def __contains__(self, key):
+        return key in self.decode()
+
+    def __iter__(self):
+        return iter(self.decode())
+
+    def __len__(self):
+        return len(self.decode())
+
+    def __eq__(self, other):
+        return self.decode() == other
+
+    def __repr__(self):
+        return '<LazyHeaders({!r})>'.format(self.decode())
+
+    #
+    # 其他 CIMultiDict 接口: getall(), getone(), items() 等
+    #
+    def __getattr__(self, name):
+        return getattr(self.decode(), name)
+
+
 ##################################################################################
 #                              Request 类: HTTP 请求
 #
@@ -76,39 +151,46 @@ class Request(dict):
     """
     __slots__ = (
         'url', 'headers', 'version', 'method', '_cookies',
-        'query_string', 'body',
+        'query_string', 'body', 'stream', 'transport', '_ip',
         'parsed_json', 'parsed_args', 'parsed_form', 'parsed_files',
+        'route_match', 'json_loads',
     )
 
-    def __init__(self, url_bytes, headers, version, method):
+    def __init__(self, url_bytes, headers, version, method, transport=None):
         # TODO: Content-Encoding detection
         url_parsed = parse_url(url_bytes)             # URL 解析
         self.url = url_parsed.path.decode('utf-8')    # URL 信息
         self.headers = headers                        # HTTP 头
         self.version = version                        # HTTP 协议版本
         self.method = method                          # HTTP 方法类型
+        self.transport = transport                    # 连接, 用于获取客户端地址
+        self._ip = None
         self.query_string = None
         if url_parsed.query:
             self.query_string = url_parsed.query.decode('utf-8')  # 查询字符串
 
         # Init but do not inhale
         self.body = None
+        self.stream = None                 # 流式请求体, 仅 stream=True 的路由使用
         self.parsed_json = None            # HTTP 内容(json 格式)
         self.parsed_form = None            # HTTP 内容(form 格式)
         self.parsed_files = None           # HTTP 内容(文件 格式)
         self.parsed_args = None            # HTTP 参数
         self._cookies = None               # cookie 内容
+        self.route_match = None            # 路由查找结果, 见 sanic.router.Router.match()
+        self.json_loads = None             # 所属应用的反序列化函数, 见 Sanic.handle_request()
 
     #
     # 解析 json 格式数据:
     #   - HTTP POST 请求提交
     #   - 常见于 ajax 请求
+    #   - 反序列化函数: 所属应用的 loads, 默认见 sanic.response.JSON, 直接解析 bytes, 不先解码为 str
     #
     @property
     def json(self):
         if not self.parsed_json:
             try:
-                self.parsed_json = json_loads(self.body)  # 解析body内容
+                self.parsed_json = (self.json_loads or JSON.loads)(self.body)  # 解析body内容
             except Exception:
                 raise InvalidUsage("Failed when parsing body as json")
 
@@ -140,7 +222,6 @@ class Request(dict):
                     self.parsed_form = RequestParameters(
                         parse_qs(self.body.decode('utf-8')))
                 elif content_type == 'multipart/form-data':  # 表单数据格式2:
-                    # TODO: Stream this instead of reading to/from memory
                     boundary = parameters['boundary'].encode('utf-8')
 
                     #
@@ -183,6 +264,18 @@ class Request(dict):
 
         return self.parsed_args
 
+    #
+    # 客户端 IP 地址:
+    #   - 首次访问时, 才从连接获取
+    #   - 无法获取(如 UNIX socket)时, 返回 None
+    #
+    @property
+    def ip(self):
+        if self._ip is None and self.transport is not None:
+            peername = self.transport.get_extra_info('peername')
+            self._ip = peername[0] if peername else ''
+        return self._ip or None
+
     #
     # 通过 HTTP 请求头, 提取 cookie
     #
@@ -203,71 +296,302 @@ class Request(dict):
         return self._cookies
 
 
+##################################################################################
+#                              流式请求体
+#
+# 说明:
+#   - 用于 stream=True 的路由, 请求头解析完成后, 即开始执行 handler
+#   - handler 通过 request.stream 逐块读取请求体, 无需等待整个请求体到达
+#   - 两种读取方式:
+#       - chunk = await request.stream.read()    # 读完返回 None
+#       - async for chunk in request.stream: ...
+#   - 背压(backpressure):
+#       - 未读取的数据块超过 buffer_size 时, 暂停读取 socket(pause_reading)
+#       - handler 读取后, 恢复读取 socket(resume_reading)
+#
+##################################################################################
+class RequestStream:
+    """
+    Async iterator over the chunks of a request body
+    """
+    __slots__ = ('_queue', '_transport', '_buffer_size', '_paused', '_eof')
+
+    def __init__(self, transport, buffer_size=100):
+        self._queue = Queue()
+        self._transport = transport
+        self._buffer_size = buffer_size
+        self._paused = False
+        self._eof = False
+
+    #
+    # 写入数据块:
+    #   - 由 sanic.server.HttpProtocol.on_body() 调用
+    #
+    def feed_data(self, data):
+        self._queue.put_nowait(data)
+        if not self._paused and self._queue.qsize() >= self._buffer_size:
+            self._paused = True
+            self._transport.pause_reading()     # 暂停读取 socket
+
+    #
+    # 请求体结束:
+    #   - 由 sanic.server.HttpProtocol.on_message_complete() 调用
+    #
+    def feed_eof(self):
+        self._eof = True
+        self._queue.put_nowait(None)
+
+    #
+    # 请求体是否已全部到达
+    #
+    def at_eof(self):
+        return self._eof
+
+    #
+    # 读取一个数据块, 请求体结束时返回 None
+    #
+    async def read(self):
+        chunk = await self._queue.get()
+        if chunk is None:
+            self._queue.put_nowait(None)        # 保持结束状态, 重复读取仍返回 None
+        elif self._paused and self._queue.qsize() < self._buffer_size:
+            self._paused = False
+            self._transport.resume_reading()    # 恢复读取 socket
+        return chunk
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = await self.read()
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
+
+
 File = namedtuple('File', ['type', 'body', 'name'])  # 文件类型
 
 
 #
-# HTTP POST 请求, form 表单提交处理
-#   - 解析含有多个部分的表单:
-#   - 针对文件类型数据, 作处理
+# 文件数据超过此大小(字节), 写入临时文件, 不再保存在内存中
+#
+MULTIPART_SPOOL_SIZE = 1024 * 1024
+
+
+##################################################################################
+#                              multipart/form-data 增量解析器
 #
-def parse_multipart_form(body, boundary):
+# 说明:
+#   - 状态机实现, 可以逐块喂入数据(feed), 无需整个请求体在内存中
+#       - preamble: 第一个分隔符之前的内容, 丢弃
+#       - boundary: 分隔符之后, '--' 表示结束, 否则是下一部分的头
+#       - headers:  部分的头, 以空行结束
+#       - body:     部分的内容, 直到下一个分隔符
+#       - done:     结束
+#   - 通过 memoryview 切片写出数据, 避免中间拷贝
+#   - 文件部分超过 spool_size 时, 转存到临时文件
+#       - 此时 File.body 为已 seek(0) 的文件对象, 否则为 bytes
+#
+##################################################################################
+class MultipartParser:
     """
-    Parses a request body and returns fields and files
-    :param body: Bytes request body
-    :param boundary: Bytes multipart boundary
-    :return: fields (RequestParameters), files (RequestParameters)
+    Incremental multipart/form-data parser
+    Usage:
+        parser = MultipartParser(boundary)
+        async for chunk in request.stream:
+            parser.feed(chunk)
+        fields, files = parser.close()
     """
-    files = RequestParameters()     # 文件
-    fields = RequestParameters()    # 文件域
+    __slots__ = (
+        'fields', 'files', 'spool_size',
+        '_delimiter', '_buffer', '_state',
+        '_field_name', '_file_name', '_file_type', '_data', '_spool',
+    )
 
-    form_parts = body.split(boundary)
+    def __init__(self, boundary, spool_size=MULTIPART_SPOOL_SIZE):
+        self.fields = RequestParameters()    # 表单字段
+        self.files = RequestParameters()     # 文件
+        self.spool_size = spool_size
+
+        # 首个分隔符前面没有换行, 补上, 使所有分隔符格式一致
+        self._delimiter = b'\r\n--' + boundary
+        self._buffer = bytearray(b'\r\n')
+        self._state = 'preamble'
+        self._field_name = None
+        self._file_name = None
+        self._file_type = None
+        self._data = None      # 当前部分的内容(bytearray)
+        self._spool = None     # 当前部分的临时文件
 
-    # 遍历
-    for form_part in form_parts[1:-1]:
-        file_name = None  # 文件名
-        file_type = None  # 文件类型
-        field_name = None  # 文件域
-        line_index = 2
-        line_end_index = 0
+    #
+    # 喂入一块数据, 尽可能多地解析
+    #
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        delimiter = self._delimiter
+        pos = 0
+
+        while self._state != 'done':
+            if self._state == 'preamble':
+                index = buffer.find(delimiter, pos)
+                if index == -1:
+                    pos = max(pos, len(buffer) - len(delimiter) + 1)
+                    break
+                pos = index + len(delimiter)
+                self._state = 'boundary'
+
+            elif self._state == 'boundary':
+                index = buffer.find(b'\r\n', pos)
+                if buffer[pos:pos + 2] == b'--':
+                    self._state = 'done'
+                elif index == -1:
+                    break
+                else:
+                    pos = index            # 保留换行, 无头部时可直接匹配空行
+                    self._state = 'headers'
+
+            elif self._state == 'headers':
+                index = buffer.find(b'\r\n\r\n', pos)
+                if index == -1:
+                    break
+                self._start_part(bytes(buffer[pos + 2:index]))
+                pos = index + 4
+                self._state = 'body'
+
+            else:    # body
+                index = buffer.find(delimiter, pos)
+                if index == -1:
+                    # 末尾可能是不完整的分隔符, 保留
+                    end = max(pos, len(buffer) - len(delimiter) + 1)
+                    self._write(buffer, pos, end)
+                    pos = end
+                    break
+                self._write(buffer, pos, index)
+                self._end_part()
+                pos = index + len(delimiter)
+                self._state = 'boundary'
+
+        if self._state == 'done':
+            del buffer[:]          # 结束分隔符之后的内容, 丢弃
+        else:
+            del buffer[:pos]
 
-        while not line_end_index == -1:
-            line_end_index = form_part.find(b'\r\n', line_index)  # 换行分割
-            form_line = form_part[line_index:line_end_index].decode('utf-8')
-            line_index = line_end_index + 2
+    #
+    # 解析结束, 返回 (表单字段, 文件)
+    #   - 未完整的部分, 丢弃
+    #
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        self._buffer = bytearray()
+        self._state = 'done'
+        return self.fields, self.files
 
-            if not form_line:
-                break
+    #
+    # 解析部分的头:
+    #   - Content-Disposition: 字段名, 文件名
+    #   - Content-Type: 文件类型
+    #
+    def _start_part(self, header_block):
+        self._field_name = None
+        self._file_name = None
+        self._file_type = None
+        self._data = bytearray()
 
+        for form_line in header_block.decode('utf-8').split('\r\n'):
+            if not form_line:
+                continue
             colon_index = form_line.index(':')
-            form_header_field = form_line[0:colon_index]
+            form_header_field = form_line[0:colon_index].strip().lower()
             form_header_value, form_parameters = parse_header(
-                form_line[colon_index + 2:])
+                form_line[colon_index + 1:].strip())
 
-            if form_header_field == 'Content-Disposition':
+            if form_header_field == 'content-disposition':
                 if 'filename' in form_parameters:
-                    file_name = form_parameters['filename']
-                field_name = form_parameters.get('name')
-            elif form_header_field == 'Content-Type':
-                file_type = form_header_value
-
-        post_data = form_part[line_index:-4]  # POST提交数据
+                    self._file_name = form_parameters['filename']
+                self._field_name = form_parameters.get('name')
+            elif form_header_field == 'content-type':
+                self._file_type = form_header_value
 
-        #
-        # 判断是否是文件类型数据:
-        #
-        if file_name or file_type:
-            file = File(type=file_type, name=file_name, body=post_data)  # 创建文件
+    #
+    # 写出部分内容 buffer[start:end]:
+    #   - 文件部分超过 spool_size, 转存到临时文件
+    #
+    def _write(self, buffer, start, end):
+        if start >= end:
+            return
+        with memoryview(buffer) as view, view[start:end] as chunk:
+            if self._spool is not None:
+                self._spool.write(chunk)
+            else:
+                self._data += chunk
+                if ((self._file_name or self._file_type) and
+                        len(self._data) > self.spool_size):
+                    self._spool = TemporaryFile()
+                    self._spool.write(self._data)
+                    self._data = None
 
-            if field_name in files:
-                files[field_name].append(file)
+    #
+    # 部分结束, 保存到表单字段或文件
+    #
+    def _end_part(self):
+        field_name = self._field_name
+        if self._file_name or self._file_type:
+            if self._spool is not None:
+                body = self._spool
+                body.seek(0)
+                self._spool = None
+            else:
+                body = bytes(self._data)
+            file = File(type=self._file_type, name=self._file_name, body=body)  # 创建文件
+            if field_name in self.files:
+                self.files[field_name].append(file)
             else:
-                files[field_name] = [file]
+                self.files[field_name] = [file]
         else:
-            value = post_data.decode('utf-8')  # 非文件类型数据
-            if field_name in fields:
-                fields[field_name].append(value)
+            value = self._data.decode('utf-8')  # 非文件类型数据
+            if field_name in self.fields:
+                self.fields[field_name].append(value)
             else:
-                fields[field_name] = [value]
+                self.fields[field_name] = [value]
+        self._data = None
+
+
+#
+# HTTP POST 请求, form 表单提交处理
+#   - 解析含有多个部分的表单:
+#   - 针对文件类型数据, 作处理
+#   - 内部使用 MultipartParser, 一次喂入全部请求体
+#
+def parse_multipart_form(body, boundary, spool_size=MULTIPART_SPOOL_SIZE):
+    """
+    Parses a request body and returns fields and files
+    :param body: Bytes request body
+    :param boundary: Bytes multipart boundary
+    :param spool_size: file parts larger than this are spooled to disk
+    :return: fields (RequestParameters), files (RequestParameters)
+    """
+    parser = MultipartParser(boundary, spool_size)
+    parser.feed(body)
+    return parser.close()
+
 
-    return fields, files
+#
+# 流式解析 multipart/form-data 请求体:
+#   - 用于 stream=True 的路由, 边接收边解析
+#
+async def parse_multipart_stream(stream, boundary,
+                                 spool_size=MULTIPART_SPOOL_SIZE):
+    """
+    Parses a streamed request body and returns fields and files
+    :param stream: RequestStream of the request
+    :param boundary: Bytes multipart boundary
+    :param spool_size: file parts larger than this are spooled to disk
+    :return: fields (RequestParameters), files (RequestParameters)
+    """
+    parser = MultipartParser(boundary, spool_size)
+    async for chunk in stream:
+        parser.feed(chunk)
+    return parser.close()
@@ -1,16 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from aiofiles import open as open_async    # Python3.5 标准库, 异步打开文件, file() 方法实现中引用
+from aiofiles.os import stat                # 异步获取文件信息, file_stream() 方法实现中引用
+from contextvars import ContextVar
 from mimetypes import guess_type
 from os import path
 
-from ujson import dumps as json_dumps
+from ujson import dumps as json_dumps, loads as json_loads
 
 from .cookies import CookieJar    # 相对路径导包
 
 #
 # 常用状态码:
 #   - 用于优化查询速度
+#   - 响应输出已改用 STATUS_LINES 预编码缓存, 此处保留以兼容
 #
 COMMON_STATUS_CODES = {
     200: b'OK',
@@ -83,6 +86,83 @@ ALL_STATUS_CODES = {
 }
 
 
+##################################################################################
+#                              HTTP 头预编码缓存
+#
+# 说明:
+#   - 每个响应都要输出的状态行, Content-Type, Connection 头, 只编码一次
+#   - STATUS_LINES: {HTTP 版本: {状态码: 状态行}}
+#       - 导入时预先生成 HTTP/1.0, HTTP/1.1 的全部状态行
+#   - CONTENT_TYPE_HEADERS: {内容格式: Content-Type 头}, 首次使用时生成
+#   - KEEP_ALIVE_HEADERS: {超时时间: Connection + Keep-Alive 头}, 首次使用时生成
+#   - 缓存数目有上限, 避免不常见的值无限增长
+#
+##################################################################################
+HEADER_CACHE_SIZE = 256
+
+STATUS_LINES = {
+    version: {
+        status: b'HTTP/%b %d %b\r\n' % (version.encode(), status, text)
+        for status, text in ALL_STATUS_CODES.items()
+    }
+    for version in ('1.0', '1.1')
+}
+
+CONTENT_TYPE_HEADERS = {}
+KEEP_ALIVE_HEADERS = {}
+
+
+#
+# 生成状态行, 并写入缓存
+#
+def get_status_line(version, status):
+    status_line = b'HTTP/%b %d %b\r\n' % (
+        version.encode(), status, ALL_STATUS_CODES.get(status, b''))
+    lines = STATUS_LINES.get(version)
+    if lines is None and len(STATUS_LINES) < HEADER_CACHE_SIZE:
+        lines = STATUS_LINES[version] = {}
+    if lines is not None and len(lines) < HEADER_CACHE_SIZE:
+        lines[status] = status_line
+    return status_line
+
+
+#
+# 生成 Content-Type 头, 并写入缓存
+#
+def get_content_type_header(content_type):
+    header = b'Content-Type: %b\r\n' % content_type.encode()
+    if len(CONTENT_TYPE_HEADERS) < HEADER_CACHE_SIZE:
+        CONTENT_TYPE_HEADERS[content_type] = header
+    return header
+
+
+#
+# 生成长连接 Connection + Keep-Alive 头, 并写入缓存
+#
+def get_keep_alive_header(keep_alive_timeout):
+    header = b'Connection: keep-alive\r\n'
+    if keep_alive_timeout:
+        header += b'Keep-Alive: timeout=%d\r\n' % keep_alive_timeout
+    if len(KEEP_ALIVE_HEADERS) < HEADER_CACHE_SIZE:
+        KEEP_ALIVE_HEADERS[keep_alive_timeout] = header
+    return header
+
+
+#
+# 序列化 HTTP 头:
+#   - 返回 bytes, 每行以 \r\n 结尾
+#   - 对每次都返回相同 HTTP 头的 handler, 可以预先序列化一次,
+#     通过 header_bytes 参数传入响应, 避免每次编码:
+#       CORS_HEADERS = serialize_headers({'Access-Control-Allow-Origin': '*'})
+#       return json(data, header_bytes=CORS_HEADERS)
+#
+def serialize_headers(headers):
+    return b''.join(
+        b'%b: %b\r\n' % (name.encode(), value.encode('utf-8'))
+        for name, value in headers.items()
+    )
+
+
 ##################################################################################
 #                              HTTP 响应类(辅助类)
 #
@@ -102,11 +182,13 @@ ALL_STATUS_CODES = {
 #
 ##################################################################################
 class HTTPResponse:
-    __slots__ = ('body', 'status', 'content_type', 'headers', '_cookies')
+    __slots__ = ('body', 'status', 'content_type', 'headers', 'header_bytes',
+                 '_cookies')
 
     def __init__(self, body=None, status=200, headers=None,
-                 content_type='text/plain', body_bytes=b''):
+                 content_type='text/plain', body_bytes=b'', header_bytes=b''):
         self.content_type = content_type
+        self.header_bytes = header_bytes       # 预先序列化的 HTTP 头, 见 serialize_headers()
 
         if body is not None:
             try:
@@ -130,40 +212,61 @@ class HTTPResponse:
     #       - HTTP body 部分
     #
     def output(self, version="1.1", keep_alive=False, keep_alive_timeout=None):
+        return self.get_headers(
+            version, keep_alive, keep_alive_timeout,
+            len(self.body)) + self.body    # HTTP 响应内容部分
+
+    #
+    # 返回 HTTP 响应的 head 部分与 body 部分, 不拼接:
+    #   - 用于 transport.writelines(), 大响应体不必为了加上 HTTP 头而复制一次
+    #   - 注意调用处: sanic.server.HttpProtocol.write_response()
+    #
+    def output_parts(self, version="1.1", keep_alive=False,
+                     keep_alive_timeout=None):
+        return (self.get_headers(version, keep_alive, keep_alive_timeout,
+                                 len(self.body)),
+                self.body)
+
+    #
+    # 返回 HTTP 响应的 head 部分(含结尾空行)
+    #   - content_length: HTTP 内容长度
+    #       - None: 长度未知, 不输出 Content-Length, 见 StreamingHTTPResponse
+    #
+    def get_headers(self, version, keep_alive, keep_alive_timeout,
+                    content_length):
         # This is all returned in a kind-of funky way
         # We tried to make this as fast as possible in pure python
-        timeout_header = b''
-        if keep_alive and keep_alive_timeout:
-            timeout_header = b'Keep-Alive: timeout=%d\r\n' % keep_alive_timeout
+        try:
+            status_line = STATUS_LINES[version][self.status]    # 预编码的状态行
+        except KeyError:
+            status_line = get_status_line(version, self.status)
+
+        content_type = CONTENT_TYPE_HEADERS.get(self.content_type)
+        if content_type is None:
+            content_type = get_content_type_header(self.content_type)
+
+        if not keep_alive:
+            connection = b'Connection: close\r\n'
+        else:
+            connection = KEEP_ALIVE_HEADERS.get(keep_alive_timeout)
+            if connection is None:
+                connection = get_keep_alive_header(keep_alive_timeout)
 
         headers = b''
         if self.headers:
-            headers = b''.join(
-                b'%b: %b\r\n' % (name.encode(), value.encode('utf-8'))
-                for name, value in self.headers.items()
-            )
-
-        # Try to pull from the common codes first
-        # Speeds up response rate 6% over pulling from all
-        status = COMMON_STATUS_CODES.get(self.status)    # 加快HTTP状态码查询速度.
-        if not status:
-            status = ALL_STATUS_CODES.get(self.status)
-
-        return (b'HTTP/%b %d %b\r\n'
-                b'Content-Type: %b\r\n'
-                b'Content-Length: %d\r\n'
-                b'Connection: %b\r\n'
-                b'%b%b\r\n'
-                b'%b') % (
-            version.encode(),              # HTTP 协议版本号
-            self.status,                   # HTTP 状态码编号
-            status,                        # HTTP 状态码信息
-            self.content_type.encode(),    # HTTP 内容格式
-            len(self.body),                # HTTP 内容长度
-            b'keep-alive' if keep_alive else b'close',    # HTTP 连接状态
-            timeout_header,
+            headers = serialize_headers(self.headers)
+
+        length = b''
+        if content_length is not None:
+            length = b'Content-Length: %d\r\n' % content_length
+
+        return b'%b%b%b%b%b%b\r\n' % (
+            status_line,                   # HTTP 状态行: 版本号, 状态码, 状态信息
+            content_type,                  # HTTP 内容格式
+            length,                        # HTTP 内容长度
+            connection,                    # HTTP 连接状态
             headers,
-            self.body                      # HTTP 响应内容部分
+            self.header_bytes,             # 预先序列化的 HTTP 头
         )
 
     #
@@ -176,6 +279,171 @@ class HTTPResponse:
         return self._cookies
 
 
+##################################################################################
+#                              文件流式响应
+#
+# 说明:
+#   - 先写出 HTTP head 部分, 再把文件内容直接写到 transport
+#   - 文件内容不经过 HTTPResponse.body, 不在内存中整体驻留
+#   - 写出方式:
+#       - loop.sendfile(): 内部使用 os.sendfile(), 零拷贝
+#           - 每次最多写出 sendfile_chunk_size 字节, 每部分写完刷新超时(protocol.drain())
+#           - 超时只在一部分迟迟写不完时触发, 慢客户端下载大文件不会超时
+#       - 事件循环或 transport 不支持 sendfile 时, 按块读取文件并写出
+#           - 每写一块, 等待 transport 写缓冲区排空(流量控制)
+#           - 注意: 默认的事件循环 uvloop 不支持 loop.sendfile()(NotImplementedError),
+#             默认配置下总是按块写出; 零拷贝需要使用 asyncio 事件循环, 如 app.run(loop=asyncio.new_event_loop())
+#           - 测试用的 MemoryTransport 同样按块写出
+#   - offset/count: 只写出文件的一部分, 用于 Range 请求
+#   - 文件比已写出的 Content-Length 短(如 StaticCache 缓存的大小已过期): 抛出 ConnectionError,
+#     由 HttpProtocol.stream_response() 断开连接, 客户端不会把后续响应当作本响应体
+#   - 由 sanic.server.HttpProtocol.write_response() 调用 stream()
+#
+##################################################################################
+class StreamingFileResponse(HTTPResponse):
+    __slots__ = ('location', 'offset', 'count', 'chunk_size',
+                 'sendfile_chunk_size')
+
+    def __init__(self, location, status=200, headers=None,
+                 content_type='text/plain', offset=0, count=0,
+                 chunk_size=65536, sendfile_chunk_size=1048576):
+        super().__init__(status=status, headers=headers,
+                         content_type=content_type)
+        self.location = location       # 文件路径
+        self.offset = offset           # 起始位置
+        self.count = count             # 写出的字节数
+        self.chunk_size = chunk_size   # 按块读取时, 每块大小
+        self.sendfile_chunk_size = sendfile_chunk_size   # loop.sendfile() 每次写出的大小
+
+    def output(self, version="1.1", keep_alive=False, keep_alive_timeout=None):
+        return self.get_headers(
+            version, keep_alive, keep_alive_timeout, self.count)
+
+    #
+    # 写出 HTTP 响应:
+    #   - protocol: sanic.server.HttpProtocol
+    #
+    async def stream(self, protocol, version="1.1", keep_alive=False,
+                     keep_alive_timeout=None):
+        transport = protocol.transport
+        transport.write(self.output(version, keep_alive, keep_alive_timeout))
+        if not self.count:
+            return
+
+        # 异步打开文件, sendfile 与按块写出共用
+        async with open_async(self.location, mode='rb') as _file:
+            offset = self.offset
+            remaining = self.count
+            try:
+                while remaining > 0 and not transport.is_closing():
+                    sent = await protocol.loop.sendfile(
+                        transport, _file.raw, offset,
+                        min(self.sendfile_chunk_size, remaining))  # 零拷贝
+                    if not sent:
+                        raise ConnectionError('file truncated')
+                    offset += sent
+                    remaining -= sent
+                    await protocol.drain()      # 刷新超时
+                return
+            except (AttributeError, NotImplementedError, RuntimeError):
+                if remaining != self.count:
+                    raise
+                # 事件循环或 transport 不支持 sendfile, 按块写出
+
+            await _file.seek(self.offset)
+            while remaining > 0 and not transport.is_closing():
+                chunk = await _file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    raise ConnectionError('file truncated')
+                remaining -= len(chunk)
+                transport.write(chunk)
+                await protocol.drain()      # 流量控制: 等待写缓冲区排空
+
+
+##################################################################################
+#                              分块流式响应
+#
+# 说明:
+#   - 响应体长度未知, 由 handler 提供的 streaming_fn 逐块写出
+#       - streaming_fn(response): 协程, 调用 await response.write(data) 写出数据
+#   - HTTP/1.1: 使用分块传输(Transfer-Encoding: chunked), 以空块结束
+#   - HTTP/1.0: 不支持分块传输, 直接写出数据, 写完后关闭连接
+#   - 每写一块, 等待 transport 写缓冲区排空(流量控制), 慢客户端不会导致内存无限增长
+#   - 由 sanic.server.HttpProtocol.write_response() 调用 stream()
+#
+##################################################################################
+class StreamingHTTPResponse(HTTPResponse):
+    __slots__ = ('streaming_fn', 'protocol', 'chunked')
+
+    def __init__(self, streaming_fn, status=200, headers=None,
+                 content_type='text/plain'):
+        super().__init__(status=status, headers=headers,
+                         content_type=content_type)
+        self.streaming_fn = streaming_fn    # 写出响应体的协程
+        self.protocol = None                # sanic.server.HttpProtocol, 写出时设置
+        self.chunked = True                 # 是否分块传输
+
+    def output(self, version="1.1", keep_alive=False, keep_alive_timeout=None):
+        return self.get_headers(
+            version, keep_alive, keep_alive_timeout, None)
+
+    #
+    # 写出一块数据:
+    #   - data: str 或 bytes, 空数据直接忽略(空块表示传输结束)
+    #
+    async def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not data:
+            return
+
+        transport = self.protocol.transport
+        if transport.is_closing():
+            raise ConnectionError('Connection closed')
+        if self.chunked:
+            transport.write(b'%x\r\n%b\r\n' % (len(data), data))
+        else:
+            transport.write(data)
+        await self.protocol.drain()         # 流量控制: 等待写缓冲区排空
+
+    #
+    # 写出 HTTP 响应:
+    #   - protocol: sanic.server.HttpProtocol
+    #   - 注意: HTTP/1.0 不分块, 只能以关闭连接表示响应结束, keep_alive 由调用处置为 False
+    #
+    async def stream(self, protocol, version="1.1", keep_alive=False,
+                     keep_alive_timeout=None):
+        self.protocol = protocol
+        self.chunked = version != '1.0'
+        if self.chunked:
+            self.header_bytes += b'Transfer-Encoding: chunked\r\n'
+        protocol.transport.write(
+            self.output(version, keep_alive, keep_alive_timeout))
+        await self.streaming_fn(self)
+        if self.chunked:
+            protocol.transport.write(b'0\r\n\r\n')     # 空块, 传输结束
+
+
+#
+# JSON 序列化与反序列化:
+#   - 默认使用 ujson
+#   - 可替换为其他实现, 如 orjson(dumps 返回 bytes, 更快)
+#       - Sanic(dumps=..., loads=...) 设置, 只作用于该应用, 同一进程中的其他应用不受影响
+#       - dumps: 见 json(), loads: 见 sanic.request.Request.json
+#
+class JSON:
+    dumps = staticmethod(json_dumps)
+    loads = staticmethod(json_loads)
+
+
+#
+# 当前请求所属应用的 dumps:
+#   - 由 Sanic.handle_request() 在每个请求开始时设置, 未设置时为 None
+#   - 每个请求在独立的任务中处理, 任务之间互不影响
+#
+current_json_dumps = ContextVar('current_json_dumps', default=None)
+
+
 ##################################################################################
 #                              HTTP 响应模块对外接口:
 #
@@ -186,28 +454,38 @@ class HTTPResponse:
 #       - html(): 返回 html 格式的 HTTP 响应
 #       - file(): 返回文件格式的 HTTP 响应
 #           - 此接口, 通过异步方式实现.
+#       - stream(): 返回分块流式 HTTP 响应
 #
 ##################################################################################
 #
 # 返回 json 格式的 HTTP 响应
 #   - 应用场景: API 数据接口
 #   - 根据 content_type 字段类型, 区分
+#   - dumps: 序列化函数, 默认为当前请求所属应用的 dumps, 其次为 JSON.dumps, 见 JSON
+#       - 返回 bytes 时(如 orjson.dumps), 直接作为响应体, 不再经过 str -> bytes 编码
 #
-def json(body, status=200, headers=None):
+def json(body, status=200, headers=None, header_bytes=b'', dumps=None):
     # 返回 json 格式
     #   - 注意 content_type 类型
-    return HTTPResponse(json_dumps(body), headers=headers, status=status,
-                        content_type="application/json")
+    body = (dumps or current_json_dumps.get() or JSON.dumps)(body)
+    if type(body) is bytes:
+        return HTTPResponse(body_bytes=body, headers=headers, status=status,
+                            content_type="application/json",
+                            header_bytes=header_bytes)
+    return HTTPResponse(body, headers=headers, status=status,
+                        content_type="application/json",
+                        header_bytes=header_bytes)
 
 
 #
 # 返回 text 格式的 HTTP 响应
 #   - 根据 content_type 字段类型, 区分
 #
-def text(body, status=200, headers=None):
+def text(body, status=200, headers=None, header_bytes=b''):
     # 返回文本格式
     return HTTPResponse(body, status=status, headers=headers,
-                        content_type="text/plain; charset=utf-8")
+                        content_type="text/plain; charset=utf-8",
+                        header_bytes=header_bytes)
 
 
 #
@@ -215,10 +493,11 @@ def text(body, status=200, headers=None):
 #   - 应用场景: 场景的 GET 请求返回页面
 #   - 根据 content_type 字段类型, 区分
 #
-def html(body, status=200, headers=None):
+def html(body, status=200, headers=None, header_bytes=b''):
     # 返回 HTML 格式
     return HTTPResponse(body, status=status, headers=headers,
-                        content_type="text/html; charset=utf-8")
+                        content_type="text/html; charset=utf-8",
+                        header_bytes=header_bytes)
 
 
 #
@@ -243,3 +522,42 @@ async def file(location, mime_type=None, headers=None):
                         headers=headers,
                         content_type=mime_type,
                         body_bytes=out_stream)
+
+
+#
+# 返回文件流式响应
+#   - 应用场景: 大文件下载, 静态文件
+#   - 不读取文件内容, 由 StreamingFileResponse.stream() 写出
+#   - _range: (start, end), 闭区间, 返回文件的一部分(206 Partial Content)
+#
+async def file_stream(location, mime_type=None, headers=None, _range=None):
+    filename = path.split(location)[-1]
+    mime_type = mime_type or guess_type(filename)[0] or 'text/plain'
+
+    stats = await stat(location)    # 异步获取文件大小
+    headers = headers or {}
+    if _range:
+        start, end = _range
+        headers['Content-Range'] = 'bytes {}-{}/{}'.format(
+            start, end, stats.st_size)
+        return StreamingFileResponse(location, status=206, headers=headers,
+                                     content_type=mime_type,
+                                     offset=start, count=end - start + 1)
+
+    return StreamingFileResponse(location, status=200, headers=headers,
+                                 content_type=mime_type,
+                                 count=stats.st_size)
+
+
+#
+# 返回分块流式 HTTP 响应
+#   - 应用场景: 大数据导出, 不必在内存中保存完整的响应体
+#   - streaming_fn: 协程, 参数为响应对象, 通过 await response.write(data) 写出数据
+#       async def streaming_fn(response):
+#           for row in rows:
+#               await response.write(row)
+#
+def stream(streaming_fn, status=200, headers=None,
+           content_type="text/plain; charset=utf-8"):
+    return StreamingHTTPResponse(streaming_fn, status=status, headers=headers,
+                                 content_type=content_type)
@@ -2,11 +2,9 @@ import re
 
 #
 # 高阶数据类型:
-#   - defaultdict
 #   - namedtuple: 具名元组, 特征: 元组内元素 field, 可被命名
 #
-from collections import defaultdict, namedtuple    # 注意: 数据类型
-from functools import lru_cache                    # LRU缓存装饰器
+from collections import namedtuple, OrderedDict    # 注意: 数据类型
 
 from .config import Config
 from .exceptions import NotFound, InvalidUsage
@@ -18,8 +16,12 @@ from .exceptions import NotFound, InvalidUsage
 #       - Route.methods = xxx
 #       - Route.pattern = xxx
 #       - Route.parameters = xxx
+#       - Route.uri = xxx
+#       - Route.stream = xxx        流式 handler, 见 HttpProtocol.is_stream_handler()
+#       - Route.concurrency_limit = xxx     路由并发上限, 见 ConcurrencyLimiter
 #
-Route = namedtuple('Route', ['handler', 'methods', 'pattern', 'parameters'])
+Route = namedtuple('Route', ['handler', 'methods', 'pattern', 'parameters',
+                             'uri', 'stream', 'concurrency_limit'])
 
 #
 # 参数元组:
@@ -29,6 +31,12 @@ Route = namedtuple('Route', ['handler', 'methods', 'pattern', 'parameters'])
 #
 Parameter = namedtuple('Parameter', ['name', 'cast'])
 
+#
+# 路由缓存统计元组:
+#
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions',
+                                     'maxsize', 'currsize'])
+
 
 #
 # 正则表达式:
@@ -42,10 +50,6 @@ REGEX_TYPES = {
 }
 
 
-def url_hash(url):
-    return url.count('/')
-
-
 #
 # 异常: 路由已存在
 #
@@ -53,6 +57,102 @@ class RouteExists(Exception):
     pass
 
 
+###############################################################
+#             路由树节点(按 URL 分段的 radix/trie 树)
+#
+# 说明:
+#   - 一个节点, 对应 URL 中的一段(以 '/' 分割)
+#   - static: 静态分段子节点, dict 查找, O(1)
+#       - 如: /user/list 中的 'user', 'list'
+#   - dynamic: 带参数分段的有序边列表, 按注册顺序逐个尝试
+#       - 如: /user/<id:int> 中的 '<id:int>'
+#       - 每条边: (分段正则字符串, 编译后的正则, 子节点)
+#       - 相同正则的分段共享同一条边(参数名可以不同)
+#   - route: 路由终点, 若 URL 恰好在此节点结束, 返回该路由
+#
+###############################################################
+class RouteNode:
+    __slots__ = ('static', 'dynamic', 'route')
+
+    def __init__(self):
+        self.static = {}       # 静态分段: {分段: 子节点}
+        self.dynamic = []      # 参数分段: [(正则字符串, 正则, 子节点), ...]
+        self.route = None      # 路由终点
+
+    #
+    # 插入一条路由:
+    #   - segments: 路由 URL 的分段列表
+    #       - 静态分段: str
+    #       - 参数分段: (正则字符串, 编译后的正则)
+    #
+    def insert(self, segments, route):
+        node = self
+        for segment in segments:
+            if isinstance(segment, str):
+                child = node.static.get(segment)
+                if child is None:
+                    child = node.static[segment] = RouteNode()
+            else:
+                pattern_string, pattern = segment
+                for edge_pattern, _, edge_child in node.dynamic:
+                    if edge_pattern == pattern_string:
+                        child = edge_child
+                        break
+                else:
+                    child = RouteNode()
+                    node.dynamic.append((pattern_string, pattern, child))
+            node = child
+        if node.route is None:     # 与原实现一致: 先注册的路由优先
+            node.route = route
+
+    #
+    # 查找路由:
+    #   - 先匹配静态分段, 再按注册顺序匹配参数分段
+    #   - 分支匹配失败时回溯, 尝试下一条边
+    #   - values: 收集各参数分段匹配出的参数值(按 URL 顺序)
+    #   - 返回: 路由 或 None
+    #
+    def find(self, segments, index, values):
+        if index == len(segments):
+            return self.route
+
+        segment = segments[index]
+        child = self.static.get(segment)
+        if child is not None:
+            route = child.find(segments, index + 1, values)
+            if route is not None:
+                return route
+
+        for _, pattern, child in self.dynamic:
+            match = pattern.match(segment)
+            if match:
+                groups = match.groups()
+                values.extend(groups)
+                route = child.find(segments, index + 1, values)
+                if route is not None:
+                    return route
+                del values[len(values) - len(groups):]    # 回溯
+        return None
+
+
+###############################################################
+#             单个路由的缓存
+#
+# 说明:
+#   - 按路由模板(如 /user/<id:int>)划分的 LRU 缓存
+#   - entries: {URL: 参数字典}, 有序字典, 尾部为最近使用
+#   - maxsize: 该路由最多缓存的 URL 数目
+#
+###############################################################
+class RouteCache:
+    __slots__ = ('route', 'maxsize', 'entries')
+
+    def __init__(self, route, maxsize):
+        self.route = route
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+
 ###############################################################
 #             路由管理器
 #
@@ -82,20 +182,36 @@ class Router:
     always be a string, independent of the type.
     """
     routes_static = None             # 静态路由集
-    routes_dynamic = None            # 动态路由集
+    routes_dynamic = None            # 动态路由集(路由树)
     routes_always_check = None       # 检查路由列表
 
-    def __init__(self):
+    def __init__(self, cache_size=None):
         self.routes_all = {}                         # 全部路由集
         self.routes_static = {}                      # 静态路由集
-        self.routes_dynamic = defaultdict(list)      # 动态路由集
+        self.routes_dynamic = RouteNode()            # 动态路由集, 按分段组织的路由树
         self.routes_always_check = []
 
+        #
+        # 路由缓存:
+        #   - 只缓存动态路由的命中结果, 不缓存 404
+        #   - route_caches: {路由模板: RouteCache}, 每个路由独立限额
+        #   - _cache: {URL: RouteCache}, 全局 LRU 顺序, 总数不超过 cache_size
+        #
+        if cache_size is None:
+            cache_size = Config.ROUTER_CACHE_SIZE
+        self.cache_size = cache_size
+        self.route_caches = {}
+        self._cache = OrderedDict()
+        self.cache_hits = 0                          # 缓存命中次数
+        self.cache_misses = 0                        # 缓存未命中次数
+        self.cache_evictions = 0                     # 缓存淘汰次数
+
     #
     # 添加一个处理器 到 路由列表
     #   - 根据路由类型, 添加到对应路由集
     #
-    def add(self, uri, methods, handler):
+    def add(self, uri, methods, handler, cache_size=None, stream=False,
+            concurrency_limit=None):
         """
         Adds a handler to the route list
         :param uri: Path to match
@@ -103,6 +219,12 @@ class Router:
         If none are provided, any method is allowed
         :param handler: Request handler function.
         When executed, it should provide a response object.
+        :param cache_size: Number of URLs of this route to cache,
+        `None` for Config.ROUTER_ROUTE_CACHE_SIZE, 0 to disable
+        :param stream: if `True`, the handler runs as soon as the headers
+        arrive and reads the body from request.stream
+        :param concurrency_limit: handlers of this route run at once,
+        `None` for no limit
         :return: Nothing
         """
         if uri in self.routes_all:    # 路由已存在
@@ -142,29 +264,109 @@ class Router:
 
             return '({})'.format(pattern)
 
+        #
+        # 分段参数:
+        #   - 仅生成正则, 参数已在 add_parameter() 中记录
+        #
+        def add_segment_parameter(match):
+            name = match.group(1)
+            pattern = 'string'
+            if ':' in name:
+                name, pattern = name.split(':', 1)
+            _, pattern = REGEX_TYPES.get(pattern, (str, pattern))
+            return '({})'.format(pattern)
+
         pattern_string = re.sub(r'<(.+?)>', add_parameter, uri)
         pattern = re.compile(r'^{}$'.format(pattern_string))
 
+        #
+        # 路由树分段:
+        #   - 不含参数的分段, 按原字符串存储
+        #   - 含参数的分段, 单独编译为该分段的正则
+        #
+        segments = []
+        if parameters and not properties['unhashable']:
+            for segment in uri.split('/'):
+                if '<' in segment:
+                    segment_string = re.sub(
+                        r'<(.+?)>', add_segment_parameter, segment)
+                    segments.append((segment_string, re.compile(
+                        r'^{}$'.format(segment_string))))
+                else:
+                    segments.append(segment)
+
         #
         # 路由项:
         #
         route = Route(
             handler=handler, methods=methods, pattern=pattern,
-            parameters=parameters)
+            parameters=parameters, uri=uri, stream=stream,
+            concurrency_limit=concurrency_limit)
 
         #
         # 添加路由到对应字典:
         #
         self.routes_all[uri] = route
+        if parameters:
+            if cache_size is None:
+                cache_size = Config.ROUTER_ROUTE_CACHE_SIZE
+            if cache_size:
+                self.route_caches[uri] = RouteCache(route, cache_size)
+
         if properties['unhashable']:
             self.routes_always_check.append(route)
         elif parameters:
-            self.routes_dynamic[url_hash(uri)].append(route)     # 动态路由
+            self.routes_dynamic.insert(segments, route)          # 动态路由, 插入路由树
         else:
             self.routes_static[uri] = route                      # 静态路由
 
+    #
+    # 查找请求对应的路由:
+    #   - 静态路由: 直接查字典, 无需缓存
+    #   - 动态路由: 先查路由缓存, 未命中再查路由树, 并写入对应路由的缓存
+    #   - 404 不缓存, 返回 (None, None)
+    #   - 结果保存在 request.route_match, 同一请求只查找一次:
+    #       - HttpProtocol 判断流式 handler, 并发限制时已查找过, handle_request() 直接复用
+    #       - 缓存命中/未命中计数, 每个请求只计一次
+    #
+    def match(self, request):
+        """
+        Gets the route matching the URL of the request, once per request
+        :param request: Request object
+        :return: route, keyword arguments; `None, None` if no route matches
+        """
+        match = request.route_match
+        if match is not None:
+            return match
+
+        url = request.url
+        route = self.routes_static.get(url)       # 查找静态路由集
+        if route:
+            match = route, {}
+        else:
+            cache = self._cache.get(url)
+            if cache is not None:                 # 缓存命中
+                self.cache_hits += 1
+                self._cache.move_to_end(url)
+                cache.entries.move_to_end(url)
+                match = cache.route, cache.entries[url]
+            else:                                 # 缓存未命中
+                self.cache_misses += 1
+                try:
+                    route, kwargs = self._get(url)    # 调用如下子函数
+                except NotFound:
+                    match = None, None
+                else:
+                    self._cache_store(url, route, kwargs)
+                    match = route, kwargs
+
+        request.route_match = match
+        return match
+
     #
     # 从请求中提取对应的 handler.
+    #   - 路由不存在: 404
+    #   - method 不匹配: 405, 在缓存命中之后判断
     #
     def get(self, request):
         """
@@ -173,21 +375,74 @@ class Router:
         :param request: Request object
         :return: handler, arguments, keyword arguments
         """
-        return self._get(request.url, request.method)    # 调用如下子函数
+        route, kwargs = self.match(request)
+        if route is None:
+            raise NotFound('Requested URL {} not found'.format(request.url))
+
+        #
+        # 路由匹配成功, 继续处理:
+        #   - method 不匹配, 抛出异常
+        #
+        if route.methods and request.method not in route.methods:
+            raise InvalidUsage(
+                'Method {} not allowed for URL {}'.format(
+                    request.method, request.url), status_code=405)
+
+        return route.handler, [], kwargs
+
+    #
+    # 写入路由缓存:
+    #   - 单个路由缓存已满: 淘汰该路由最久未使用的 URL
+    #   - 全局缓存已满: 淘汰全局最久未使用的 URL
+    #   - 同一路由的高基数 URL(如 /user/<id>), 只会挤占自己的缓存
+    #
+    def _cache_store(self, url, route, kwargs):
+        cache = self.route_caches.get(route.uri)
+        if cache is None or not self.cache_size:      # 该路由禁用缓存
+            return
+
+        if len(cache.entries) >= cache.maxsize:
+            evicted, _ = cache.entries.popitem(last=False)
+            del self._cache[evicted]
+            self.cache_evictions += 1
+        elif len(self._cache) >= self.cache_size:
+            evicted, evicted_cache = self._cache.popitem(last=False)
+            del evicted_cache.entries[evicted]
+            self.cache_evictions += 1
+
+        cache.entries[url] = kwargs
+        self._cache[url] = cache
+
+    #
+    # 路由缓存统计:
+    #   - 与 functools.lru_cache 的 cache_info() 类似
+    #
+    def cache_info(self):
+        return CacheInfo(self.cache_hits, self.cache_misses,
+                         self.cache_evictions, self.cache_size,
+                         len(self._cache))
+
+    #
+    # 清空路由缓存, 并复位统计计数
+    #
+    def cache_clear(self):
+        self._cache.clear()
+        for cache in self.route_caches.values():
+            cache.entries.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
 
     #
-    # 缓存路由:
-    #   - 返回[路由处理器, 参数数组, 参数字典]
-    #   - 添加到缓存中
+    # 路由匹配:
+    #   - 返回[路由, 参数字典]
     #
-    @lru_cache(maxsize=Config.ROUTER_CACHE_SIZE)
-    def _get(self, url, method):
+    def _get(self, url):
         """
-        Gets a request handler based on the URL of the request, or raises an
-        error.  Internal method for caching.
+        Gets a route based on the URL of the request, or raises an error.
+        Internal method, results are cached by get()
         :param url: Request URL
-        :param method: Request method
-        :return: handler, arguments, keyword arguments
+        :return: route, keyword arguments
         """
 
         #
@@ -202,34 +457,23 @@ class Router:
         #
         # Check against known static routes
         route = self.routes_static.get(url)       # 查找静态路由集
+        values = []
 
-        if route:
-            match = route.pattern.match(url)      # 匹配成功
-        else:
-            # Move on to testing all regex routes
-            for route in self.routes_dynamic[url_hash(url)]:  # 查找动态路由集
+        if not route:
+            # Walk the route tree segment by segment
+            route = self.routes_dynamic.find(url.split('/'), 0, values)   # 查找路由树
+
+        if not route:
+            # Lastly, check against all regex routes that cannot be hashed
+            for route in self.routes_always_check:
                 match = route.pattern.match(url)
-                if match:
+                if match:     # 匹配成功, 返回
+                    values = match.groups()
                     break
             else:
-                # Lastly, check against all regex routes that cannot be hashed
-                for route in self.routes_always_check:
-                    match = route.pattern.match(url)
-                    if match:     # 匹配成功, 返回
-                        break
-                else:
-                    raise NotFound('Requested URL {} not found'.format(url))   # 路由匹配失败, 抛出异常
-
-        #
-        # 路由匹配成功, 继续处理:
-        #   - method 不匹配, 抛出异常
-        #
-        if route.methods and method not in route.methods:
-            raise InvalidUsage(
-                'Method {} not allowed for URL {}'.format(
-                    method, url), status_code=405)
+                raise NotFound('Requested URL {} not found'.format(url))   # 路由匹配失败, 抛出异常
 
         kwargs = {p.name: p.cast(value)
                   for value, p
-                  in zip(match.groups(1), route.parameters)}
-        return route.handler, [], kwargs
+                  in zip(values, route.parameters)}
+        return route, kwargs
@@ -2,9 +2,6 @@ from asyncio import get_event_loop    # 关键
 from collections import deque
 from functools import partial
 from inspect import isawaitable, stack, getmodulename
-from multiprocessing import Process, Event     # 关键
-from signal import signal, SIGTERM, SIGINT     # 关键
-from time import sleep
 from traceback import format_exc
 
 
@@ -12,12 +9,16 @@ from traceback import format_exc
 #           框架自带模块
 #
 #########################################
+from .compression import Compressor
 from .config import Config
 from .exceptions import Handler
 from .log import log, logging
-from .response import HTTPResponse
+from .metrics import Metrics
+from .middleware import compile_middleware, compile_handler, needs_await
+from .response import HTTPResponse, current_json_dumps, json
 from .router import Router                          # 路由装饰器实现的关键依赖
 from .server import serve
+from .supervisor import Supervisor                  # 多进程 worker 管理
 from .static import register as static_register     # 异步实现, 文件服务器
 from .exceptions import ServerError
 
@@ -31,7 +32,8 @@ from .exceptions import ServerError
 #
 #########################################
 class Sanic:
-    def __init__(self, name=None, router=None, error_handler=None):
+    def __init__(self, name=None, router=None, error_handler=None,
+                 dumps=None, loads=None):
         if name is None:
             frame_records = stack()[1]
             name = getmodulename(frame_records[1])
@@ -41,10 +43,26 @@ class Sanic:
         self.config = Config()                                # 默认配置项
         self.request_middleware = deque()                     # 请求中间件
         self.response_middleware = deque()                    # 响应中间件
+        self._dispatch_compiled = False                       # 中间件与 handler 调用是否已编译
+        self._request_middleware_chain = ()                   # 编译后的请求中间件调用链
+        self._response_middleware_chain = ()                  # 编译后的响应中间件调用链
+        self._handler_coroutine = {}                          # handler: 是否为协程函数
         self.blueprints = {}                                  # 蓝图
         self._blueprint_order = []
         self.loop = None
         self.debug = None
+        self.is_request_stream = False                        # 是否注册了流式 handler
+        self.metrics = None                                   # 请求统计, 见 enable_metrics()
+        self.compressor = None                                # 响应压缩, 见 Config.COMPRESS_RESPONSES
+
+        #
+        # JSON 序列化与反序列化:
+        #   - 替换本应用中 sanic.response.json() 与 request.json 使用的默认实现
+        #   - 如 orjson: dumps 返回 bytes, 响应体不再重新编码
+        #   - 只作用于本应用, 见 handle_request()
+        #
+        self.json_dumps = dumps
+        self.json_loads = loads
 
         # Register alternative method names
         self.go_fast = self.run
@@ -59,11 +77,18 @@ class Sanic:
     #   - 此装饰器实现, 依赖: sanic.router.Router() 类定义的接口
     #
     # Decorator
-    def route(self, uri, methods=None):
+    def route(self, uri, methods=None, cache_size=None, stream=False,
+              concurrency_limit=None):
         """
         Decorates a function to be registered as a route
         :param uri: path of the URL
         :param methods: list or tuple of methods allowed
+        :param cache_size: number of URLs of this route the router caches,
+        0 to disable
+        :param stream: if `True`, the handler runs as soon as the headers
+        arrive and reads the body from request.stream
+        :param concurrency_limit: handlers of this route run at once in each
+        worker, further requests queue or get a 503
         :return: decorated function
         """
 
@@ -72,8 +97,13 @@ class Sanic:
         if not uri.startswith('/'):
             uri = '/' + uri
 
+        if stream:
+            self.is_request_stream = True
+
         def response(handler):
-            self.router.add(uri=uri, methods=methods, handler=handler)    # 路由添加, 依赖: sanic.router.Router()
+            self.router.add(uri=uri, methods=methods, handler=handler,
+                            cache_size=cache_size, stream=stream,
+                            concurrency_limit=concurrency_limit)    # 路由添加, 依赖: sanic.router.Router()
             return handler
 
         return response
@@ -81,7 +111,8 @@ class Sanic:
     #
     # 路由添加:
     #
-    def add_route(self, handler, uri, methods=None):
+    def add_route(self, handler, uri, methods=None, cache_size=None,
+                  stream=False, concurrency_limit=None):
         """
         A helper method to register class instance or
         functions as a handler to the application url
@@ -89,9 +120,17 @@ class Sanic:
         :param handler: function or class instance
         :param uri: path of the URL
         :param methods: list or tuple of methods allowed
+        :param cache_size: number of URLs of this route the router caches,
+        0 to disable
+        :param stream: if `True`, the handler reads the body from
+        request.stream
+        :param concurrency_limit: handlers of this route run at once in each
+        worker
         :return: function or class instance
         """
-        self.route(uri=uri, methods=methods)(handler)      # 调用上面的 路由装饰器
+        self.route(uri=uri, methods=methods, cache_size=cache_size,
+                   stream=stream,
+                   concurrency_limit=concurrency_limit)(handler)      # 调用上面的 路由装饰器
         return handler
 
     #
@@ -128,6 +167,7 @@ class Sanic:
                 self.request_middleware.append(middleware)
             if attach_to == 'response':
                 self.response_middleware.appendleft(middleware)
+            self._dispatch_compiled = False    # 中间件变化, 重新编译
             return middleware
 
         # Detect which way this was called, @middleware or @middleware('AT')
@@ -144,14 +184,16 @@ class Sanic:
     #
     # Static Files
     def static(self, uri, file_or_directory, pattern='.+',
-               use_modified_since=True):
+               use_modified_since=True, precompressed=False):
         """
         Registers a root to serve files from.  The input can either be a file
         or a directory.  See
+        :param precompressed: serve `.br`/`.gz` siblings of the requested
+        file to clients accepting those encodings
         """
         # 异步实现:
         static_register(self, uri, file_or_directory, pattern,
-                        use_modified_since)
+                        use_modified_since, precompressed)
 
     #
     # 蓝图:
@@ -184,6 +226,32 @@ class Sanic:
                     "version 1.0.  Please use the blueprint method instead")
         return self.blueprint(*args, **kwargs)
 
+    #
+    # 请求统计:
+    #   - 按路由统计请求数, 正在处理的请求数, 延迟直方图, 各阶段耗时
+    #   - 拉取接口: app.metrics.snapshot()
+    #   - uri: 注册一个返回统计数据(JSON)的路由
+    #   - 多进程时, 每个 worker 各自统计, 接口返回处理该请求的 worker 的数据
+    #
+    def enable_metrics(self, uri='/metrics'):
+        """
+        Enables per-route request counts, in-flight gauges and latency
+        histograms
+        :param uri: path of the URL serving the metrics as JSON,
+        `None` to only use the pull API (app.metrics.snapshot())
+        :return: sanic.metrics.Metrics object
+        """
+        if self.metrics is None:
+            self.metrics = Metrics(self.router)
+        if uri:
+            metrics = self.metrics
+
+            def metrics_endpoint(request):
+                return json(metrics.snapshot())
+
+            self.route(uri, methods=['GET'])(metrics_endpoint)
+        return self.metrics
+
     # -------------------------------------------------------------------- #
     # Request Handling
     # -------------------------------------------------------------------- #
@@ -191,6 +259,52 @@ class Sanic:
     def converted_response_type(self, response):
         pass
 
+    #
+    # 编译中间件与 handler 调用:
+    #   - 服务启动时调用, 注册中间件后首次处理请求时也会重新编译
+    #   - 见 sanic.middleware
+    #
+    def compile_dispatch(self):
+        self._request_middleware_chain = compile_middleware(
+            self.request_middleware)
+        self._response_middleware_chain = compile_middleware(
+            self.response_middleware)
+        self._handler_coroutine = {}
+        for route in self.router.routes_all.values():
+            self.is_coroutine_handler(route.handler)
+
+        self.compressor = None
+        if self.config.COMPRESS_RESPONSES:
+            self.compressor = Compressor(
+                min_size=self.config.COMPRESS_MIN_SIZE,
+                thread_size=self.config.COMPRESS_THREAD_SIZE,
+                gzip_level=self.config.COMPRESS_GZIP_LEVEL,
+                brotli_quality=self.config.COMPRESS_BROTLI_QUALITY)
+        self._dispatch_compiled = True
+
+    #
+    # 路由并发上限: {路由 uri: 上限}, 见 route() 的 concurrency_limit 参数
+    #
+    def route_concurrency_limits(self):
+        limits = {}
+        for route in self.router.routes_all.values():
+            if route.concurrency_limit:
+                limits[route.uri] = route.concurrency_limit
+        return limits
+
+    #
+    # handler 是否为协程函数, 未编译时编译
+    #
+    def is_coroutine_handler(self, handler):
+        try:
+            return self._handler_coroutine[handler]
+        except KeyError:
+            is_coroutine = self._handler_coroutine[handler] = \
+                compile_handler(handler)
+            return is_coroutine
+        except TypeError:    # handler 不可哈希, 不缓存
+            return compile_handler(handler)
+
     #
     # 异步实现: 请求处理
     #   - 核心方法.
@@ -208,83 +322,168 @@ class Sanic:
         response as the only argument
         :return: Nothing
         """
+        #
+        # 本应用的 JSON 序列化与反序列化:
+        #   - dumps: 请求任务的上下文变量, handler 调用 json() 时使用
+        #   - loads: 保存在请求上, request.json 使用
+        #
+        current_json_dumps.set(self.json_dumps)
+        request.json_loads = self.json_loads
+
+        #
+        # 请求统计(见 enable_metrics()):
+        #   - 各阶段结束时打点, 请求结束(包括被取消)时记录
+        #   - 未启用时, 每个打点只多一次 None 判断
+        #
+        metrics = self.metrics
+        stats = response = None
+        if metrics is not None:
+            timer = metrics.timer
+            metrics.in_flight += 1
+            started = middleware_done = routed = handled = timer()
+            responded = None
+
         try:
-            # -------------------------------------------- #
-            # Request Middleware    (请求中间件)
-            # -------------------------------------------- #
-
-            response = False
-            # The if improves speed.  I don't know why
-            if self.request_middleware:
-                # 遍历 请求中间件列表, 逐个处理
-                for middleware in self.request_middleware:
-                    response = middleware(request)  # 中间件处理
+            try:
+                if not self._dispatch_compiled:
+                    self.compile_dispatch()
 
-                    # 判断是否是异步返回:
-                    if isawaitable(response):
+                # -------------------------------------------- #
+                # Request Middleware    (请求中间件)
+                #   - 编译后的调用链: 协程函数直接 await, 普通函数只检查非空返回值
+                # -------------------------------------------- #
+
+                for middleware, is_coroutine in self._request_middleware_chain:
+                    response = middleware(request)  # 中间件处理
+                    if is_coroutine:
                         response = await response   # 异步返回
+                    elif response and needs_await(response):
+                        response = await response
                     if response:
                         break
 
-            #
-            # 无中间件处理结果
-            #
-            # No middleware results
-            if not response:
+                if metrics is not None:
+                    middleware_done = routed = handled = timer()
+
+                #
+                # 无中间件处理结果
+                #
+                # No middleware results
+                if not response:
+                    # -------------------------------------------- #
+                    # Execute Handler
+                    # -------------------------------------------- #
+
+                    # Fetch handler from router
+                    handler, args, kwargs = self.router.get(request)
+                    if metrics is not None:
+                        match = request.route_match     # 见 Router.match()
+                        stats = metrics.enter(match and match[0])
+                        routed = handled = timer()
+                    if handler is None:
+                        raise ServerError(
+                            ("'None' was returned while requesting a "
+                             "handler from the router"))
+
+                    # Run response handler
+                    try:
+                        is_coroutine = self._handler_coroutine[handler]
+                    except (KeyError, TypeError):
+                        is_coroutine = self.is_coroutine_handler(handler)
+                    response = handler(request, *args, **kwargs)
+                    if is_coroutine:
+                        response = await response       # 异步返回
+                    elif response and needs_await(response):
+                        response = await response
+
+                    if metrics is not None:
+                        handled = timer()
+
                 # -------------------------------------------- #
-                # Execute Handler
+                # Response Middleware    (响应中间件)
                 # -------------------------------------------- #
 
-                # Fetch handler from router
-                handler, args, kwargs = self.router.get(request)
-                if handler is None:
-                    raise ServerError(
-                        ("'None' was returned while requesting a "
-                         "handler from the router"))
-
-                # Run response handler
-                response = handler(request, *args, **kwargs)
-                if isawaitable(response):
-                    response = await response       # 异步返回
-
-            # -------------------------------------------- #
-            # Response Middleware    (响应中间件)
-            # -------------------------------------------- #
-
-            if self.response_middleware:
-                # 遍历 响应中间件列表
-                for middleware in self.response_middleware:
+                for middleware, is_coroutine in self._response_middleware_chain:
                     _response = middleware(request, response)
-                    if isawaitable(_response):
+                    if is_coroutine:
                         _response = await _response     # 异步返回
+                    elif _response and needs_await(_response):
+                        _response = await _response
                     if _response:
                         response = _response
                         break
 
-        except Exception as e:
-            # -------------------------------------------- #
-            # Response Generation Failed (响应生成失败)
-            # -------------------------------------------- #
+                # -------------------------------------------- #
+                # Compression    (响应压缩)
+                #   - 大响应体在线程池中压缩, 此时返回协程
+                # -------------------------------------------- #
+
+                if self.compressor is not None:
+                    compressed = self.compressor.compress_response(
+                        request, response)
+                    if compressed is not None:
+                        await compressed
 
-            try:
-                response = self.error_handler.response(request, e)    # 异常处理部分
-                if isawaitable(response):
-                    response = await response   # 异步返回: 异常
             except Exception as e:
-                if self.debug:
-                    response = HTTPResponse(
-                        "Error while handling error: {}\nStack: {}".format(
-                            e, format_exc()))
-                else:
-                    response = HTTPResponse(
-                        "An error occured while handling an error")
+                # -------------------------------------------- #
+                # Response Generation Failed (响应生成失败)
+                # -------------------------------------------- #
 
-        response_callback(response)    # 回调函数处理
+                try:
+                    response = self.error_handler.response(request, e)    # 异常处理部分
+                    if isawaitable(response):
+                        response = await response   # 异步返回: 异常
+                except Exception as e:
+                    if self.debug:
+                        response = HTTPResponse(
+                            "Error while handling error: {}\nStack: {}".format(
+                                e, format_exc()))
+                    else:
+                        response = HTTPResponse(
+                            "An error occured while handling an error")
+
+            if metrics is not None:
+                responded = timer()
+
+            # 流式响应, 回调返回协程, 等待写出完成
+            written = response_callback(response)    # 回调函数处理
+            if isawaitable(written):
+                await written
+        finally:
+            if metrics is not None:
+                if responded is None:    # 被取消, 未产生响应
+                    response = None
+                metrics.record(stats, response, started, middleware_done,
+                               routed, handled, responded or timer())
 
     # -------------------------------------------------------------------- #
     # Execution
     # -------------------------------------------------------------------- #
 
+    #
+    # HTTP 协议参数:
+    #   - serve() 与 sanic.utils.SanicTestClient 共用, 见 sanic.server.protocol_factory()
+    #
+    def protocol_settings(self):
+        return {
+            'request_handler': self.handle_request,    # 请求处理, 注意参数: response_callback
+            'error_handler': self.error_handler,       # 错误处理
+            'request_timeout': self.config.REQUEST_TIMEOUT,
+            'keep_alive_timeout': self.config.KEEP_ALIVE_TIMEOUT,
+            'request_max_size': self.config.REQUEST_MAX_SIZE,
+            'request_buffer_queue_size': self.config.REQUEST_BUFFER_QUEUE_SIZE,
+            'response_writelines_size': self.config.RESPONSE_WRITELINES_SIZE,
+            'request_pipeline_concurrency': self.config.REQUEST_PIPELINE_CONCURRENCY,
+            'lazy_headers': self.config.REQUEST_LAZY_HEADERS,
+            'concurrency_limit': self.config.CONCURRENCY_LIMIT,
+            'concurrency_queue_size': self.config.CONCURRENCY_QUEUE_SIZE,
+            'route_concurrency_limits': self.route_concurrency_limits(),
+            'retry_after': self.config.CONCURRENCY_RETRY_AFTER,
+            'max_loop_lag': self.config.MAX_LOOP_LAG,
+            'router': self.router,                     # 路由, 用于识别流式 handler
+            'is_request_stream': self.is_request_stream,
+        }
+
     # -------------------------------------------------------------------- #
     #                     框架启动入口:
     #   - 单进程: 协程实现
@@ -316,18 +515,16 @@ class Sanic:
         self.error_handler.debug = True
         self.debug = debug
         self.loop = loop      # 事件处理器
+        self.compile_dispatch()    # 编译中间件与 handler 调用
 
         server_settings = {
             'host': host,
             'port': port,
             'sock': sock,
             'debug': debug,
-            'request_handler': self.handle_request,    # 请求处理, 注意参数: response_callback
-            'error_handler': self.error_handler,       # 错误处理
-            'request_timeout': self.config.REQUEST_TIMEOUT,
-            'request_max_size': self.config.REQUEST_MAX_SIZE,
             'loop': loop
         }
+        server_settings.update(self.protocol_settings())
 
         # -------------------------------------------- #
         # Register start/stop events
@@ -368,7 +565,10 @@ class Sanic:
             else:
                 log.info('Spinning up {} workers...'.format(workers))
 
-                self.serve_multiple(server_settings, workers)     # 多进程+协程serve()实现
+                self.serve_multiple(
+                    server_settings, workers,
+                    graceful_timeout=self.config.GRACEFUL_SHUTDOWN_TIMEOUT,
+                    cpu_affinity=self.config.WORKER_CPU_AFFINITY)     # 多进程+协程serve()实现
 
         except Exception as e:
             log.exception(
@@ -389,44 +589,26 @@ class Sanic:
     # 多实例启动服务器:
     #   - 多进程+协程
     #   - 内部调用依然是: serve()
+    #   - worker 的启动, 重启, 停止, 见 sanic.supervisor.Supervisor
     #
     @staticmethod
-    def serve_multiple(server_settings, workers, stop_event=None):
+    def serve_multiple(server_settings, workers, stop_event=None,
+                       graceful_timeout=15, cpu_affinity=False,
+                       reuse_port=False):
         """
         Starts multiple server processes simultaneously.  Stops on interrupt
         and terminate signals, and drains connections when complete.
+        Crashed workers are restarted, SIGHUP restarts all workers one by one.
         :param server_settings: kw arguments to be passed to the serve function
         :param workers: number of workers to launch
         :param stop_event: if provided, is used as a stop signal
+        :param graceful_timeout: seconds a worker may spend draining
+        connections before it is killed
+        :param cpu_affinity: pin each worker to one CPU
+        :param reuse_port: bind in every worker with SO_REUSEPORT instead of
+        sharing one listening socket
         :return:
         """
-        server_settings['reuse_port'] = True
-
-        # Create a stop event to be triggered by a signal
-        if not stop_event:
-            stop_event = Event()
-        signal(SIGINT, lambda s, f: stop_event.set())
-        signal(SIGTERM, lambda s, f: stop_event.set())
-
-        #
-        # 多进程启动:
-        #
-        processes = []
-        for _ in range(workers):
-            process = Process(target=serve, kwargs=server_settings)    # 创建一个进程, 注意内部依然是 serve() 协程实现
-            process.start()   # 进程启动
-            processes.append(process)
-
-        # Infinitely wait for the stop event
-        try:
-            while not stop_event.is_set():
-                sleep(0.3)
-        except:
-            pass
-
-        log.info('Spinning down workers...')
-        for process in processes:
-            process.terminate()      # 多进程
-
-        for process in processes:
-            process.join()           # 多进程
+        Supervisor(server_settings, workers, stop_event=stop_event,
+                   graceful_timeout=graceful_timeout,
+                   cpu_affinity=cpu_affinity, reuse_port=reuse_port).run()
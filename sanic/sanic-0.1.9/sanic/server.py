@@ -1,9 +1,10 @@
 import asyncio                    # python3 自带异步 IO 框架
+from collections import deque
 from functools import partial
 from inspect import isawaitable     # python3 支持异步 await
 from multidict import CIMultiDict
 from signal import SIGINT, SIGTERM
-from time import time
+from math import ceil
 
 #
 # httptools:
@@ -33,15 +34,116 @@ except ImportError:
     async_loop = asyncio            # 若未安装, 使用默认的 asyncio
 
 from .log import log
-from .request import Request
-from .exceptions import RequestTimeout, PayloadTooLarge, InvalidUsage
+from .request import Request, RequestStream, LazyHeaders
+from .response import StreamingFileResponse, StreamingHTTPResponse
+from .exceptions import (RequestTimeout, PayloadTooLarge, InvalidUsage,
+                         ServiceUnavailable)
+from .limiter import ConcurrencyLimiter
 
 
 class Signal:
     stopped = False
 
 
-current_time = None
+##################################################################################
+#                              时间轮
+#
+# 说明:
+#   - 所有连接共用一个时间轮, 管理请求超时与长连接空闲超时
+#       - 事件循环中只有一个周期性的 tick, 而不是每个连接一个 call_later 句柄
+#       - 添加, 刷新, 取消超时: 只是在槽位集合间移动连接, O(1)
+#   - 每个 tick 推进一格, 只检查当前槽位中到期的连接
+#       - 超时大于一圈的连接, 留在槽位中等下一圈
+#   - 精度: 超时在 timeout 到 timeout + resolution 秒之间触发
+#   - 连接对象需提供: _timer_slot, _timer_deadline 字段, connection_timeout() 方法
+#   - lag: 最近一次 tick 比预定时间晚了多少秒, 即事件循环延迟, 见 ConcurrencyLimiter
+#
+##################################################################################
+class TimerWheel:
+    __slots__ = ('loop', 'resolution', 'slots', 'tick_count', 'lag',
+                 '_next_tick', '_handle')
+
+    def __init__(self, loop, size=64, resolution=1):
+        self.loop = loop
+        self.resolution = resolution                # 每格时长(秒)
+        self.slots = [set() for n in range(size)]   # 槽位: 连接集合
+        self.tick_count = 0                         # 已推进的格数
+        self.lag = 0                                # 事件循环延迟(秒)
+        self._next_tick = None                      # 下一个 tick 的时间
+        self._handle = None
+
+    def start(self):
+        self._next_tick = self.loop.time() + self.resolution
+        self._handle = self.loop.call_at(self._next_tick, self.tick)
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    #
+    # 添加或刷新超时:
+    #   - 多加一格, 保证不早于 timeout 秒触发
+    #
+    def add(self, protocol, timeout):
+        slot = protocol._timer_slot
+        if slot is not None:
+            slot.discard(protocol)
+        deadline = self.tick_count + ceil(timeout / self.resolution) + 1
+        slot = self.slots[deadline % len(self.slots)]
+        slot.add(protocol)
+        protocol._timer_slot = slot
+        protocol._timer_deadline = deadline
+
+    #
+    # 取消超时
+    #
+    def remove(self, protocol):
+        slot = protocol._timer_slot
+        if slot is not None:
+            slot.discard(protocol)
+            protocol._timer_slot = None
+
+    #
+    # 推进一格, 触发到期连接的 connection_timeout()
+    #   - 按固定时间点调度, 避免 call_later 累积误差
+    #   - 先安排下一格, 再触发超时: 某个连接出错不影响时间轮继续运行
+    #
+    def tick(self):
+        self.lag = max(self.loop.time() - self._next_tick, 0)
+        self.tick_count += 1
+        self._next_tick += self.resolution
+        self._handle = self.loop.call_at(self._next_tick, self.tick)
+
+        slot = self.slots[self.tick_count % len(self.slots)]
+        if slot:
+            expired = [protocol for protocol in slot
+                       if protocol._timer_deadline <= self.tick_count]
+            for protocol in expired:
+                slot.discard(protocol)
+                protocol._timer_slot = None
+                try:
+                    protocol.connection_timeout()
+                except Exception:
+                    log.exception('Connection timeout handling failed')
+
+
+#
+# 流水线请求:
+#   - HTTP/1.1 流水线(pipelining): 客户端不等待响应, 在同一连接上连续发送多个请求
+#   - 每个解析完成的请求对应一个 PipelineEntry, 按请求顺序排队
+#   - handler 可以并发执行, 但响应必须按请求顺序写出:
+#       - 排在最前面的请求, 直接写出响应
+#       - 其他请求, 等待前面的响应写完(waiter)
+#
+class PipelineEntry:
+    __slots__ = ('request', 'keep_alive', 'task', 'waiter')
+
+    def __init__(self, request, keep_alive):
+        self.request = request
+        self.keep_alive = keep_alive     # 解析时记录, 写响应时 parser 可能已在解析下一个请求
+        self.task = None                 # handler 任务
+        self.waiter = None               # 等待轮到本请求写出响应的 future
 
 
 #
@@ -52,31 +154,60 @@ class HttpProtocol(asyncio.Protocol):
         # event loop, connection
         'loop', 'transport', 'connections', 'signal',
         # request params
-        'parser', 'request', 'url', 'headers',
+        'parser', 'request', 'url', 'headers', '_body_chunks',
         # request config
-        'request_handler', 'request_timeout', 'request_max_size',
+        'request_handler', 'error_handler', 'request_timeout',
+        'request_max_size', 'router', 'is_request_stream',
+        'request_buffer_queue_size', 'response_writelines_size',
+        'request_pipeline_concurrency', 'keep_alive_timeout', 'lazy_headers',
+        'limiter',
         # connection management
-        '_total_request_size', '_timeout_handler', '_last_communication_time')
+        '_total_request_size', 'timer_wheel', '_timer_slot', '_timer_deadline',
+        '_idle', '_streaming',
+        # pipelining
+        '_entries', '_waiting', '_reading_paused', '_parse_failed',
+        # flow control
+        '_writing_paused', '_drain_waiter')
 
     def __init__(self, *, loop, request_handler, error_handler,
                  signal=Signal(), connections={}, request_timeout=60,
-                 request_max_size=None):
+                 request_max_size=None, router=None, is_request_stream=False,
+                 request_buffer_queue_size=100, response_writelines_size=65536,
+                 request_pipeline_concurrency=8, keep_alive_timeout=5,
+                 timer_wheel=None, lazy_headers=False, limiter=None):
         self.loop = loop
         self.transport = None
-        self.request = None              # 请求
+        self.request = None              # 正在解析的请求
         self.parser = None
         self.url = None
         self.headers = None              # 请求头
+        self._body_chunks = []           # 请求体数据块, 请求结束时一次性拼接
         self.signal = signal
         self.connections = connections
         self.request_handler = request_handler     # 请求处理器
         self.error_handler = error_handler         # 出错处理器
         self.request_timeout = request_timeout
         self.request_max_size = request_max_size
+        self.router = router                       # 路由, 用于判断是否为流式 handler
+        self.is_request_stream = is_request_stream  # 是否注册了流式 handler
+        self.request_buffer_queue_size = request_buffer_queue_size
+        self.response_writelines_size = response_writelines_size
+        self.request_pipeline_concurrency = request_pipeline_concurrency
+        self.keep_alive_timeout = keep_alive_timeout
+        self.lazy_headers = lazy_headers           # 是否延迟解析 HTTP 头
+        self.limiter = limiter                     # 共用的并发限制, 见 ConcurrencyLimiter
         self._total_request_size = 0
-        self._timeout_handler = None
-        self._last_request_time = None
-        self._request_handler_task = None
+        self.timer_wheel = timer_wheel   # 共用的时间轮, 管理超时
+        self._timer_slot = None          # 所在的时间轮槽位
+        self._timer_deadline = None      # 超时的 tick 数
+        self._idle = False               # 长连接空闲: 上一个响应已写出, 下一个请求未开始
+        self._streaming = False          # 流式响应写出中: HTTP 头已写出, 响应体未写完
+        self._entries = deque()          # 已解析, 尚未写出响应的请求, 按请求顺序
+        self._waiting = deque()          # 其中 handler 尚未执行的请求
+        self._reading_paused = False     # 排队请求过多, 已暂停读取 socket
+        self._parse_failed = False       # 请求出错(400/413), 不再解析后续数据
+        self._writing_paused = False     # transport 写缓冲区已满
+        self._drain_waiter = None        # 等待写缓冲区排空的 future
 
     # -------------------------------------------- #
     # Connection
@@ -84,53 +215,86 @@ class HttpProtocol(asyncio.Protocol):
 
     def connection_made(self, transport):
         self.connections.add(self)
-        self._timeout_handler = self.loop.call_later(
-            self.request_timeout, self.connection_timeout)
+        self.timer_wheel.add(self, self.request_timeout)
         self.transport = transport
-        self._last_request_time = current_time
 
     def connection_lost(self, exc):
         self.connections.discard(self)
-        self._timeout_handler.cancel()
+        self.timer_wheel.remove(self)
+        self.resume_writing()          # 唤醒等待写出的流式响应
+        # 写出中的流式响应: loop.sendfile() 在连接断开后不会返回, 取消之
+        if self._streaming:
+            task = self._entries[0].task
+            if task is not None and not task.done():
+                task.cancel()
+        for entry in self._entries:
+            # 等待写出的响应, 已无法写出
+            if entry.waiter is not None:
+                entry.waiter.cancel()
+            # 流式请求体未读完, 连接已断开, handler 不会再收到数据
+            stream = entry.request.stream if entry.request else None
+            if stream and not stream.at_eof() and entry.task:
+                entry.task.cancel()
+        self._entries.clear()
+        self._waiting.clear()
         self.cleanup()
 
+    #
+    # 超时, 由时间轮调用:
+    #   - 长连接空闲超时: 直接关闭连接
+    #   - 流式响应写出超时: 超过 request_timeout 秒没有写出进展(见 drain())
+    #       - HTTP 头已写出, 不能再返回 408, 直接断开连接
+    #   - 请求超时: 取消 handler, 返回 408
+    #
     def connection_timeout(self):
-        # Check if
-        time_elapsed = current_time - self._last_request_time
-        if time_elapsed < self.request_timeout:
-            time_left = self.request_timeout - time_elapsed
-            self._timeout_handler = \
-                self.loop.call_later(time_left, self.connection_timeout)
-        else:
-            if self._request_handler_task:
-                self._request_handler_task.cancel()
-            exception = RequestTimeout('Request Timeout')
-            self.write_error(exception)
+        if self._idle:
+            self.transport.close()
+            return
+        if self._streaming:
+            log.error('Writing response timed out, connection aborted')
+            self.transport.abort()
+            return
+
+        for entry in self._entries:
+            if entry.task:
+                entry.task.cancel()
+        exception = RequestTimeout('Request Timeout')
+        self.write_error(exception)
 
     # -------------------------------------------- #
     # Parsing
     # -------------------------------------------- #
 
     def data_received(self, data):
+        if self._parse_failed:         # 出错响应已排队, 之后的数据忽略
+            return
+
         # Check for the request itself getting too large and exceeding
         # memory limits
         self._total_request_size += len(data)
         if self._total_request_size > self.request_max_size:
             exception = PayloadTooLarge('Payload Too Large')
-            self.write_error(exception)
+            self.queue_error(exception)
+            return
 
         # Create parser if this is the first time we're receiving data
+        #   - 同一连接上的多个请求, 共用一个 parser
         if self.parser is None:
-            assert self.request is None
-            self.headers = []
             self.parser = HttpRequestParser(self)
 
         # Parse request chunk or close connection
         try:
             self.parser.feed_data(data)
         except HttpParserError:
-            exception = InvalidUsage('Bad Request')
-            self.write_error(exception)
+            if not self._parse_failed:  # 回调中已排队出错响应, 见 on_header()
+                exception = InvalidUsage('Bad Request')
+                self.queue_error(exception)
+
+    def on_message_begin(self):
+        self.headers = []
+        if self._idle:                 # 长连接上的下一个请求开始, 改用请求超时
+            self._idle = False
+            self.timer_wheel.add(self, self.request_timeout)
 
     def on_url(self, url):
         self.url = url
@@ -138,47 +302,187 @@ class HttpProtocol(asyncio.Protocol):
     #
     # HTTP 请求: 补全 head 信息
     #   -  更新 headers 字段
+    #   - 延迟解析模式: 保存原始 bytes, 不解码
+    #   - 请求体过大: 出错响应排队, 抛出异常中止解析
     #
     def on_header(self, name, value):
         if name == b'Content-Length' and int(value) > self.request_max_size:
             exception = PayloadTooLarge('Payload Too Large')
-            self.write_error(exception)
+            self.queue_error(exception)
+            raise exception
 
-        self.headers.append((name.decode(), value.decode('utf-8')))
+        if self.lazy_headers:
+            self.headers.append((name, value))
+        else:
+            self.headers.append((name.decode(), value.decode('utf-8')))
 
     #
     # HTTP 请求: 写入 head 信息
+    #   - 延迟解析模式: 首次访问 HTTP 头时, 才解码并补上 Remote-Addr, 见 LazyHeaders
     #
     def on_headers_complete(self):
-        remote_addr = self.transport.get_extra_info('peername')
-        if remote_addr:
-            self.headers.append(('Remote-Addr', '%s:%s' % remote_addr))
+        if self.lazy_headers:
+            headers = LazyHeaders(self.headers, self.transport)
+        else:
+            remote_addr = self.transport.get_extra_info('peername')
+            if remote_addr:
+                self.headers.append(('Remote-Addr', '%s:%s' % remote_addr))
+            headers = CIMultiDict(self.headers)
 
         #
         # 构建 HTTP 请求
         #
         self.request = Request(
             url_bytes=self.url,
-            headers=CIMultiDict(self.headers),
+            headers=headers,
             version=self.parser.get_http_version(),
-            method=self.parser.get_method().decode()
+            method=self.parser.get_method().decode(),
+            transport=self.transport
         )
 
+        #
+        # 流式 handler:
+        #   - 不等待请求体, 立即执行 handler, 不受并发数限制
+        #   - 请求体数据块, 经 request.stream 交给 handler
+        #
+        if self.is_request_stream and self.is_stream_handler():
+            self.request.stream = RequestStream(
+                self.transport, self.request_buffer_queue_size)
+            entry = PipelineEntry(self.request, self.parser.should_keep_alive())
+            self._entries.append(entry)
+            self.execute_request_handler(entry)
+
+    #
+    # 判断请求对应的 handler 是否为流式 handler
+    #   - 路由不存在等异常, 留给 handle_request() 处理
+    #   - 流式标记属于路由(Route.stream), 同一函数可以注册为不同选项的多个路由
+    #
+    def is_stream_handler(self):
+        route = self.get_route(self.request)
+        return route is not None and route.stream
+
+    #
+    # 请求对应的路由, 路由不存在或 method 不匹配时为 None
+    #   - 查找结果保存在请求上, handle_request() 不再重复查找, 见 Router.match()
+    #
+    def get_route(self, request):
+        try:
+            route = self.router.match(request)[0]
+        except Exception:
+            return None
+        if route is None or (route.methods and
+                             request.method not in route.methods):
+            return None
+        return route
+
     #
     # HTTP 请求: 写入 body 部分
+    #   - 流式: 交给 request.stream
+    #   - 非流式: 先收集数据块, 请求结束时一次性拼接, 避免反复拷贝
     #
     def on_body(self, body):
-        if self.request.body:
-            self.request.body += body
+        if self.request.stream:
+            self.request.stream.feed_data(body)
         else:
-            self.request.body = body
+            self._body_chunks.append(body)
 
+    #
+    # HTTP 请求: 解析完成
+    #   - 请求排队, 复位解析状态, parser 继续解析同一连接上的下一个请求
+    #   - 注意: should_keep_alive() 只在解析回调中有效, 必须在此处记录
+    #
     def on_message_complete(self):
-        #
-        # 任务创建:
-        #
-        self._request_handler_task = self.loop.create_task(
-            self.request_handler(self.request, self.write_response))
+        if self.request.stream:
+            self.request.stream.feed_eof()     # 流式 handler 已在执行
+        else:
+            if self._body_chunks:
+                self.request.body = b''.join(self._body_chunks)
+            entry = PipelineEntry(self.request, self.parser.should_keep_alive())
+            self._entries.append(entry)
+            self._waiting.append(entry)
+            self.start_request_handlers()
+        self.cleanup()
+
+    #
+    # 执行排队的请求:
+    #   - 同一连接上, 同时执行的 handler 不超过 request_pipeline_concurrency
+    #   - 排队未执行的请求过多时, 暂停读取 socket, 避免内存无限增长
+    #   - 排队的出错响应(见 queue_error())不占用 handler 并发数, 读取不再恢复
+    #
+    def start_request_handlers(self):
+        waiting = self._waiting
+        running = len(self._entries) - len(waiting)
+        if self._parse_failed and self._entries:
+            running -= 1
+        while waiting and running < self.request_pipeline_concurrency:
+            self.execute_request_handler(waiting.popleft())
+            running += 1
+
+        if len(waiting) >= self.request_pipeline_concurrency:
+            if not self._reading_paused:
+                self._reading_paused = True
+                self.transport.pause_reading()
+        elif self._reading_paused and not self._parse_failed:
+            self._reading_paused = False
+            self.transport.resume_reading()
+
+    #
+    # 任务创建:
+    #   - 响应回调绑定请求, 用于按请求顺序写出响应
+    #   - 启用并发限制时, 交给 limiter 决定立即执行, 排队, 或拒绝(503)
+    #
+    def execute_request_handler(self, entry):
+        limiter = self.limiter
+        if limiter is None:
+            entry.task = self.loop.create_task(
+                self.request_handler(
+                    entry.request, partial(self.write_response, entry)))
+            return
+
+        key = None
+        if limiter.route_limits:
+            route = self.get_route(entry.request)
+            if route is not None and route.concurrency_limit:
+                key = route.uri
+        if not limiter.submit(key, partial(self.run_request_handler, entry)):
+            self.reject_request(entry)
+
+    #
+    # 由 limiter 启动 handler:
+    #   - 排队期间连接已断开, 不再执行, 返回 None
+    #
+    def run_request_handler(self, entry):
+        if self.transport.is_closing():
+            return None
+        entry.task = self.loop.create_task(
+            self.request_handler(
+                entry.request, partial(self.write_response, entry)))
+        return entry.task
+
+    #
+    # 过载, 拒绝请求:
+    #   - 不执行 handler, 直接按请求顺序写出 503 响应, 连接保持
+    #   - 错误处理可以自定义 ServiceUnavailable 的响应
+    #
+    def reject_request(self, entry):
+        exception = ServiceUnavailable('Service Unavailable')
+        response = self.error_handler.response(entry.request, exception)
+        if isawaitable(response):
+            self.loop.create_task(self.write_rejection(entry, response))
+            return
+        response.headers.setdefault(
+            'Retry-After', str(self.limiter.retry_after))
+        written = self.write_response(entry, response)
+        if isawaitable(written):
+            self.loop.create_task(written)
+
+    async def write_rejection(self, entry, response):
+        response = await response
+        response.headers.setdefault(
+            'Retry-After', str(self.limiter.retry_after))
+        written = self.write_response(entry, response)
+        if isawaitable(written):
+            await written
 
     # -------------------------------------------- #
     # Responding
@@ -190,55 +494,208 @@ class HttpProtocol(asyncio.Protocol):
     #   - 写出 HTTP 响应
     #   - 长连接, 更新连接时间
     #
-    def write_response(self, response):
+    def write_response(self, entry, response):
+        if not self._entries:          # 连接已断开, 响应无法写出
+            return
+
+        #
+        # 前面的请求尚未响应: 返回协程, 由 Sanic.handle_request() 等待轮到本请求
+        #
+        if self._entries[0] is not entry:
+            return self.write_response_in_order(entry, response)
+
+        #
+        # 流式响应: 返回协程, 由 Sanic.handle_request() 等待写出完成
+        #
+        if isinstance(response, (StreamingFileResponse, StreamingHTTPResponse)):
+            return self.stream_response(entry, response)
+
         try:
-            keep_alive = self.parser.should_keep_alive() and not self.signal.stopped
+            keep_alive = self.get_keep_alive(entry)
+            version = entry.request.version if entry.request else '1.1'
             #
-            # 输出 HTTP 响应
+            # 输出 HTTP 响应:
+            #   - 大响应体: HTTP 头与响应体分开交给 writelines(), 避免拼接时整体复制一次
+            #   - 小响应体: 拼接后一次写出
             #
-            self.transport.write(
-                response.output(  # HTTP Response, 写一个响应
-                    self.request.version, keep_alive, self.request_timeout))
-
-            if not keep_alive:             # 非长连接, 关闭
-                self.transport.close()
+            if (self.response_writelines_size and
+                    len(response.body) >= self.response_writelines_size):
+                self.transport.writelines(
+                    response.output_parts(
+                        version, keep_alive, self.keep_alive_timeout))
             else:
-                # Record that we received data
-                self._last_request_time = current_time
-                self.cleanup()
+                self.transport.write(
+                    response.output(  # HTTP Response, 写一个响应
+                        version, keep_alive, self.keep_alive_timeout))
+            self.finish_response(keep_alive)
+        except Exception as e:
+            self.bail_out("Writing response failed, connection closed {}".format(e))
+
+    #
+    # HTTP 响应: 等待前面的响应写完, 再写出
+    #   - 连接断开时, waiter 被取消
+    #
+    async def write_response_in_order(self, entry, response):
+        entry.waiter = self.loop.create_future()
+        await entry.waiter
+        written = self.write_response(entry, response)
+        if isawaitable(written):
+            await written
+
+    #
+    # HTTP 响应: 流式响应
+    #   - 响应对象自行写出内容, 见 StreamingFileResponse.stream(), StreamingHTTPResponse.stream()
+    #   - HTTP/1.0 不支持分块传输, 分块流式响应只能以关闭连接结束
+    #   - 写出期间, 请求超时改为写出进展超时: 每写出一部分刷新一次, 见 drain()
+    #
+    async def stream_response(self, entry, response):
+        self._streaming = True
+        self.timer_wheel.add(self, self.request_timeout)
+        try:
+            keep_alive = self.get_keep_alive(entry)
+            version = entry.request.version
+            if isinstance(response, StreamingHTTPResponse) and version == '1.0':
+                keep_alive = False
+            await response.stream(
+                self, version, keep_alive, self.keep_alive_timeout)
+            self.finish_response(keep_alive)
         except Exception as e:
             self.bail_out("Writing response failed, connection closed {}".format(e))
+        finally:
+            self._streaming = False
+
+    #
+    # 请求是否保持长连接
+    #
+    def get_keep_alive(self, entry):
+        keep_alive = entry.keep_alive and not self.signal.stopped
+        # 流式请求体尚未接收完就已响应, 无法复用连接
+        stream = entry.request.stream if entry.request else None
+        if stream and not stream.at_eof():
+            keep_alive = False
+        return keep_alive
+
+    #
+    # 响应写出之后:
+    #   - 非长连接, 关闭
+    #   - 长连接, 刷新超时, 唤醒下一个等待写出的响应, 执行排队的请求
+    #       - 没有未完成的请求: 进入空闲状态, 改用长连接超时
+    #
+    def finish_response(self, keep_alive):
+        if not keep_alive:             # 非长连接, 关闭
+            self.transport.close()
+            return
+
+        self._entries.popleft()
+        if self._entries or self.headers is not None:
+            self.timer_wheel.add(self, self.request_timeout)
+        else:
+            self._idle = True
+            self.timer_wheel.add(self, self.keep_alive_timeout)
+        if self._entries:
+            waiter = self._entries[0].waiter
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
+        self.start_request_handlers()
+
+    # -------------------------------------------- #
+    # Flow control
+    #   - 写缓冲区超过高水位时, transport 调用 pause_writing()
+    #   - 写缓冲区低于低水位时, transport 调用 resume_writing()
+    # -------------------------------------------- #
+
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+        waiter = self._drain_waiter
+        if waiter is not None:
+            self._drain_waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    #
+    # 等待写缓冲区排空:
+    #   - 流式写出时, 每写一块调用一次, 避免慢客户端导致内存无限增长
+    #   - 写出仍有进展, 刷新超时: 超时只在 request_timeout 秒内没有进展时触发
+    #
+    async def drain(self):
+        self.timer_wheel.add(self, self.request_timeout)
+        if not self._writing_paused or self.transport.is_closing():
+            return
+        waiter = self._drain_waiter
+        if waiter is None:
+            waiter = self._drain_waiter = self.loop.create_future()
+        await waiter
+
+    #
+    # 请求出错(400/413), 不再解析同一连接上的后续数据:
+    #   - 没有未写出的响应: 直接写出出错响应, 关闭连接
+    #   - 流水线上还有未写出的响应: 出错响应作为最后一个请求排队, 前面的响应写完后再写出, 然后关闭连接
+    #       - 请求尚未解析完整时, request 为 None
+    #
+    def queue_error(self, exception):
+        self._parse_failed = True
+        if not self._entries:
+            self.write_error(exception)
+            return
+
+        if not self._reading_paused:
+            self._reading_paused = True
+            self.transport.pause_reading()
+        entry = PipelineEntry(self.request, False)
+        self._entries.append(entry)
+        entry.task = self.loop.create_task(self.write_error_in_order(entry, exception))
+
+    async def write_error_in_order(self, entry, exception):
+        response = self.error_handler.response(entry.request, exception)
+        if isawaitable(response):
+            response = await response
+        written = self.write_response(entry, response)
+        if isawaitable(written):
+            await written
 
     #
     # HTTP 响应: 出错响应
+    #   - 流式响应的 HTTP 头已写出, 不能再写出另一个响应, 直接断开连接
     #
     def write_error(self, exception):
+        if self._streaming:
+            self.transport.abort()
+            return
         try:
             response = self.error_handler.response(self.request, exception)    # 出错响应处理
             version = self.request.version if self.request else '1.1'          # HTTP 协议版本
             self.transport.write(response.output(version))                     # HTTP Response, 写一个响应
             self.transport.close()
         except Exception as e:
-            self.bail_out("Writing error failed, connection closed {}".format(e))
+            self.bail_out("Writing error failed, connection closed {}".format(e),
+                          write_error=False)
 
     #
     # 异常记录:
+    #   - 写出响应失败: 尝试写出 500 响应
+    #   - 写出出错响应本身失败: 不再重试, 直接断开连接, 避免与 write_error() 相互递归
     #
-    def bail_out(self, message):
-        exception = ServerError(message)
-        self.write_error(exception)
+    def bail_out(self, message, write_error=True):
         log.error(message)
+        if write_error:
+            exception = ServerError(message)
+            self.write_error(exception)
+        else:
+            self.transport.abort()
 
     #
     # 清理:
-    #   - 将字段复位为空
+    #   - 将请求解析状态复位为空
+    #   - parser 保留, 继续解析同一连接上的下一个请求
     #
     def cleanup(self):
-        self.parser = None
         self.request = None
         self.url = None
         self.headers = None
-        self._request_handler_task = None
+        self._body_chunks = []
         self._total_request_size = 0
 
     def close_if_idle(self):
@@ -246,29 +703,12 @@ class HttpProtocol(asyncio.Protocol):
         Close the connection if a request is not being sent or received
         :return: boolean - True if closed, false if staying open
         """
-        if not self.parser:
+        if self.headers is None and not self._entries:
             self.transport.close()
             return True
         return False
 
 
-#
-# 更新当前时间:
-#   - 更新全局变量值
-#   - 长连接中, 更新请求超时时间.
-#
-def update_current_time(loop):
-    """
-    Caches the current time, since it is needed
-    at the end of every keep-alive request to update the request timeout time
-    :param loop:
-    :return:
-    """
-    global current_time
-    current_time = time()
-    loop.call_later(1, partial(update_current_time, loop))
-
-
 #
 # 触发事件集:
 #
@@ -286,6 +726,50 @@ def trigger_events(events, loop):
                 loop.run_until_complete(result)
 
 
+#
+# HTTP 协议工厂:
+#   - 返回创建 HttpProtocol 的函数, 每个连接调用一次
+#   - 同一 worker 的连接共用: connections, signal, timer_wheel, 并发限制
+#   - serve() 与 sanic.utils.SanicTestClient 共用
+#
+def protocol_factory(loop, connections, signal, timer_wheel, request_handler,
+                     error_handler, request_timeout=60, request_max_size=None,
+                     router=None, is_request_stream=False,
+                     request_buffer_queue_size=100,
+                     response_writelines_size=65536,
+                     request_pipeline_concurrency=8, keep_alive_timeout=5,
+                     lazy_headers=False, concurrency_limit=0,
+                     concurrency_queue_size=100, route_concurrency_limits=None,
+                     retry_after=1, max_loop_lag=0):
+    # 并发限制与过载保护: 未配置时不创建, 请求直接执行
+    limiter = None
+    if concurrency_limit or route_concurrency_limits or max_loop_lag:
+        limiter = ConcurrencyLimiter(
+            limit=concurrency_limit, queue_size=concurrency_queue_size,
+            route_limits=route_concurrency_limits, retry_after=retry_after,
+            max_lag=max_loop_lag, timer_wheel=timer_wheel)
+
+    return partial(
+        HttpProtocol,
+        loop=loop,
+        connections=connections,
+        signal=signal,
+        request_handler=request_handler,
+        error_handler=error_handler,
+        request_timeout=request_timeout,
+        request_max_size=request_max_size,
+        router=router,
+        is_request_stream=is_request_stream,
+        request_buffer_queue_size=request_buffer_queue_size,
+        response_writelines_size=response_writelines_size,
+        request_pipeline_concurrency=request_pipeline_concurrency,
+        keep_alive_timeout=keep_alive_timeout,
+        timer_wheel=timer_wheel,
+        lazy_headers=lazy_headers,
+        limiter=limiter,
+    )
+
+
 #
 # 启动异步 HTTP 服务器:
 #   - 在独立的进程中启动
@@ -293,7 +777,12 @@ def trigger_events(events, loop):
 def serve(host, port, request_handler, error_handler, before_start=None,
           after_start=None, before_stop=None, after_stop=None,
           debug=False, request_timeout=60, sock=None,
-          request_max_size=None, reuse_port=False, loop=None):
+          request_max_size=None, reuse_port=False, loop=None,
+          router=None, is_request_stream=False,
+          request_buffer_queue_size=100, response_writelines_size=65536,
+          request_pipeline_concurrency=8, keep_alive_timeout=5,
+          lazy_headers=False, concurrency_limit=0, concurrency_queue_size=100,
+          route_concurrency_limits=None, retry_after=1, max_loop_lag=0):
     """
     Starts asynchronous HTTP Server on an individual process.
     :param host: Address to host on
@@ -305,10 +794,31 @@ def serve(host, port, request_handler, error_handler, before_start=None,
     received before it is respected. Takes single argumenet `loop`
     :param debug: Enables debug output (slows server)
     :param request_timeout: time in seconds
+    :param keep_alive_timeout: idle time in seconds before a keep-alive
+    connection is closed
     :param sock: Socket for the server to accept connections from
     :param request_max_size: size in bytes, `None` for no limit
     :param reuse_port: `True` for multiple workers
     :param loop: asyncio compatible event loop
+    :param router: Router used to look up stream handlers
+    :param is_request_stream: `True` if any handler streams its request body
+    :param request_buffer_queue_size: unread body chunks allowed before
+    reading from the socket is paused
+    :param response_writelines_size: body size in bytes from which headers
+    and body are written separately, `0` to always join them
+    :param request_pipeline_concurrency: handlers run at once for requests
+    pipelined on one connection
+    :param lazy_headers: keep raw request headers and decode them on first
+    access
+    :param concurrency_limit: handlers run at once in this process,
+    `0` for no limit
+    :param concurrency_queue_size: requests waiting for a handler slot
+    before new ones are rejected with 503
+    :param route_concurrency_limits: {route uri: limit} handlers of one
+    route run at once
+    :param retry_after: seconds sent in the Retry-After header of 503s
+    :param max_loop_lag: event loop lag in seconds above which new requests
+    are rejected with 503, `0` to disable
     :return: Nothing
     """
     loop = loop or async_loop.new_event_loop()      # 关键模块: 事件循环
@@ -326,19 +836,34 @@ def serve(host, port, request_handler, error_handler, before_start=None,
 
     connections = set()    # 连接集
     signal = Signal()
+    # 槽位数覆盖最长超时, 连接不必在槽位中等待多圈
+    timer_wheel = TimerWheel(
+        loop, size=min(ceil(max(request_timeout, keep_alive_timeout)) + 2, 1024))
 
     #
     # 构建 server 参数:
     #
-    server = partial(
-        HttpProtocol,
+    server = protocol_factory(
         loop=loop,
         connections=connections,
         signal=signal,
+        timer_wheel=timer_wheel,
         request_handler=request_handler,
         error_handler=error_handler,
         request_timeout=request_timeout,
         request_max_size=request_max_size,
+        router=router,
+        is_request_stream=is_request_stream,
+        request_buffer_queue_size=request_buffer_queue_size,
+        response_writelines_size=response_writelines_size,
+        request_pipeline_concurrency=request_pipeline_concurrency,
+        keep_alive_timeout=keep_alive_timeout,
+        lazy_headers=lazy_headers,
+        concurrency_limit=concurrency_limit,
+        concurrency_queue_size=concurrency_queue_size,
+        route_concurrency_limits=route_concurrency_limits,
+        retry_after=retry_after,
+        max_loop_lag=max_loop_lag,
     )
 
     # 服务器协程创建:
@@ -350,9 +875,8 @@ def serve(host, port, request_handler, error_handler, before_start=None,
         sock=sock
     )
 
-    # Instead of pulling time at the end of every request,
-    # pull it once per minute
-    loop.call_soon(partial(update_current_time, loop))
+    # 时间轮: 所有连接共用一个周期性 tick 管理超时
+    timer_wheel.start()
 
     try:
         http_server = loop.run_until_complete(server_coroutine)     # 启动协程
@@ -380,6 +904,11 @@ def serve(host, port, request_handler, error_handler, before_start=None,
     finally:
         log.info("Stop requested, draining connections...")
 
+        # 处理连接期间, 重复的停止信号不再打断 run_until_complete()
+        for _signal in (SIGINT, SIGTERM):
+            loop.add_signal_handler(
+                _signal, log.info, "Already draining connections")
+
         # Run the on_stop function if provided
         #
         # before_stop 清理钩子:
@@ -405,4 +934,5 @@ def serve(host, port, request_handler, error_handler, before_start=None,
         #
         trigger_events(after_stop, loop)
 
+        timer_wheel.stop()
         loop.close()
@@ -1,13 +1,198 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+from aiofiles import open as open_async
 from aiofiles.os import stat
+from collections import OrderedDict
+from mimetypes import guess_type
 from os import path
 from re import sub
-from time import strftime, gmtime
+from stat import S_ISREG
+from time import strftime, gmtime, monotonic
 from urllib.parse import unquote
 
-from .exceptions import FileNotFound, InvalidUsage
-from .response import file, HTTPResponse
+from .compression import SUFFIXES, accepted_encodings, is_compressible
+from .exceptions import FileNotFound, InvalidUsage, ContentRangeError
+from .response import HTTPResponse, StreamingFileResponse
+
+
+#
+# 解析 Range 请求头:
+#   - 只支持单个字节范围, 如: bytes=0-99, bytes=100-, bytes=-100
+#   - 格式不支持或无效时, 返回 None, 忽略 Range, 返回整个文件
+#   - 范围超出文件大小时, 抛出 ContentRangeError (416)
+#   - 返回: (start, end), 闭区间
+#
+def parse_range(range_header, size):
+    unit, _, byte_range = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in byte_range:
+        return None
+
+    start, sep, end = byte_range.strip().partition('-')
+    try:
+        start = int(start) if start else None
+        end = int(end) if end else None
+    except ValueError:
+        return None
+    if not sep or (start is None and end is None):
+        return None
+
+    if start is None:           # bytes=-100, 最后 100 字节
+        if end == 0 or size == 0:
+            raise ContentRangeError('Requested Range Not Satisfiable')
+        return max(size - end, 0), size - 1
+
+    if end is None:             # bytes=100-, 从 100 字节到结尾
+        end = size - 1
+    elif end < start:
+        return None
+    if start >= size:
+        raise ContentRangeError('Requested Range Not Satisfiable')
+    return start, min(end, size - 1)
+
+
+##################################################################################
+#                              静态文件信息缓存
+#
+# 说明:
+#   - 缓存文件的元信息: 大小, 修改时间, 预先计算的 Last-Modified/ETag 头, mime 类型
+#   - 失效策略: 基于 mtime
+#       - 距离上次检查超过 check_interval 秒, 重新 stat() 文件
+#       - mtime 或大小变化, 更新元信息, 丢弃已缓存的文件内容
+#       - check_interval 秒内的请求, 不产生任何文件系统调用
+#   - 可选的小文件内容缓存:
+#       - content_size: 内容缓存总字节数上限, 0 表示不缓存内容
+#       - content_file_size: 单个文件不超过此大小才缓存
+#       - 超出总字节数时, 按 LRU 淘汰
+#       - 压缩后的内容同样缓存, 每个文件每种压缩格式只压缩一次
+#   - 不存在的文件同样缓存 check_interval 秒, 用于查找预压缩文件(.gz/.br)
+#
+##################################################################################
+class StaticFileInfo:
+    __slots__ = ('size', 'mtime', 'last_modified', 'etag', 'mime_type',
+                 'checked')
+
+    def __init__(self, stats, mime_type, checked):
+        self.size = stats.st_size
+        self.mtime = stats.st_mtime
+        self.last_modified = strftime('%a, %d %b %Y %H:%M:%S GMT',
+                                      gmtime(stats.st_mtime))
+        self.etag = '"{:x}-{:x}"'.format(int(stats.st_mtime), stats.st_size)
+        self.mime_type = mime_type
+        self.checked = checked      # 上次 stat() 的时间
+
+
+#
+# 不存在的文件缓存上限, 超过时清空, 防止任意 URL 撑大缓存
+#
+MISSING_CACHE_SIZE = 1024
+
+
+class StaticCache:
+    def __init__(self, check_interval=1, content_size=0,
+                 content_file_size=65536):
+        self.check_interval = check_interval
+        self.content_size = content_size
+        self.content_file_size = content_file_size
+        self.files = {}                  # {文件路径: StaticFileInfo}
+        self.contents = OrderedDict()    # {文件路径 或 (文件路径, 压缩格式): 文件内容}, LRU 顺序
+        self.contents_size = 0           # 已缓存内容的总字节数
+        self.missing = {}                # {不存在的文件路径: 检查时间}
+
+    #
+    # 获取文件信息:
+    #   - 文件不存在或不是普通文件, 抛出 OSError
+    #
+    async def get(self, file_path):
+        now = monotonic()
+        info = self.files.get(file_path)
+        if info is not None and now - info.checked < self.check_interval:
+            return info
+        checked = self.missing.get(file_path)
+        if checked is not None and now - checked < self.check_interval:
+            raise FileNotFoundError(file_path)
+
+        try:
+            stats = await stat(file_path)       # 异步获取文件信息
+            if not S_ISREG(stats.st_mode):
+                raise IsADirectoryError(file_path)
+        except OSError:
+            self.invalidate(file_path)
+            if len(self.missing) >= MISSING_CACHE_SIZE:
+                self.missing.clear()
+            self.missing[file_path] = now
+            raise
+        self.missing.pop(file_path, None)
+
+        if (info is not None and info.mtime == stats.st_mtime and
+                info.size == stats.st_size):
+            info.checked = now                  # 文件未变化
+            return info
+
+        self.invalidate(file_path)              # 文件已变化
+        mime_type = guess_type(file_path)[0] or 'text/plain'
+        info = self.files[file_path] = StaticFileInfo(stats, mime_type, now)
+        return info
+
+    #
+    # 获取文件内容:
+    #   - 只缓存小文件, 不缓存时返回 None
+    #
+    async def get_content(self, file_path, info):
+        content = self.contents.get(file_path)
+        if content is not None:
+            self.contents.move_to_end(file_path)
+            return content
+
+        if not self.content_size or info.size > self.content_file_size:
+            return None
+
+        async with open_async(file_path, mode='rb') as _file:
+            content = await _file.read()    # 异步读文件
+        if len(content) != info.size:       # 读取期间文件被修改
+            return None
+        return self.store(file_path, content)
+
+    #
+    # 获取压缩后的文件内容:
+    #   - 首次请求时压缩并缓存, 之后直接返回
+    #   - 只处理可以缓存内容的小文件, 不缓存时返回 None
+    #
+    async def get_compressed(self, file_path, info, encoding, compressor):
+        key = (file_path, encoding)
+        content = self.contents.get(key)
+        if content is not None:
+            self.contents.move_to_end(key)
+            return content
+
+        content = await self.get_content(file_path, info)
+        if content is None:
+            return None
+        content = await compressor.compress_bytes(content, encoding)
+        if self.files.get(file_path) is not info:    # 压缩期间文件已变化
+            return None
+        return self.store(key, content)
+
+    #
+    # 缓存内容, 超出总字节数时按 LRU 淘汰
+    #
+    def store(self, key, content):
+        self.contents[key] = content
+        self.contents_size += len(content)
+        while self.contents_size > self.content_size:
+            _, evicted = self.contents.popitem(last=False)
+            self.contents_size -= len(evicted)
+        return self.contents.get(key)
+
+    #
+    # 清除文件的缓存
+    #
+    def invalidate(self, file_path):
+        self.files.pop(file_path, None)
+        for key in (file_path,) + tuple(
+                (file_path, encoding) for encoding in SUFFIXES):
+            content = self.contents.pop(key, None)
+            if content is not None:
+                self.contents_size -= len(content)
 
 
 ##################################################################################
@@ -16,13 +201,14 @@ from .response import file, HTTPResponse
 #   - 注册静态资源处理函数
 #   - 通过添加一个路由, 并注册一个处理器实现
 #   - 内部是 异步实现, 代码值得深入阅读
-#   - 依赖: response.file() 异步方法
+#   - 依赖: StaticCache 缓存文件信息, response.StreamingFileResponse 写出文件
+#   - 压缩(按 Accept-Encoding 协商, 不处理 Range 请求):
+#       - precompressed: 优先返回同目录下预压缩的 .br/.gz 文件
+#       - 启用 Config.COMPRESS_RESPONSES 且内容可缓存的小文件: 压缩一次后缓存
 #
 ##################################################################################
-def register(app, uri, file_or_directory, pattern, use_modified_since):
-    # TODO: Though sanic is not a file server, I feel like we should at least
-    #       make a good effort here.  Modified-since is nice, but we could
-    #       also look into etags, expires, and caching
+def register(app, uri, file_or_directory, pattern, use_modified_since,
+             precompressed=False):
     """
     Registers a static directory handler with Sanic by adding a route to the
     router and registering a handler.
@@ -30,8 +216,11 @@ def register(app, uri, file_or_directory, pattern, use_modified_since):
     :param file_or_directory: File or directory path to serve from
     :param uri: URL to serve from
     :param pattern: regular expression used to match files in the URL
-    :param use_modified_since: If true, send file modified time, and return
-                     not modified if the browser's matches the server's
+    :param use_modified_since: If true, send file modified time and ETag,
+                     and return not modified if the browser's matches the
+                     server's
+    :param precompressed: If true, serve `.br`/`.gz` siblings of the file
+                     to clients accepting those encodings
     """
 
     # If we're not trying to match a file directly,
@@ -39,6 +228,49 @@ def register(app, uri, file_or_directory, pattern, use_modified_since):
     if not path.isfile(file_or_directory):
         uri += '<file_uri:' + pattern + '>'
 
+    cache = StaticCache(
+        check_interval=app.config.STATIC_CACHE_CHECK_INTERVAL,
+        content_size=app.config.STATIC_CONTENT_CACHE_SIZE,
+        content_file_size=app.config.STATIC_CONTENT_CACHE_FILE_SIZE)
+
+    #
+    # 压缩的响应:
+    #   - 客户端不接受压缩, 或没有可用的压缩内容时, 返回 None
+    #   - 压缩内容与原文件不同, 使用弱 ETag
+    #
+    async def _compressed_response(request, file_path, info, headers):
+        encodings = accepted_encodings(request.headers['Accept-Encoding'])
+        if not encodings:
+            return None
+        if 'ETag' in headers:
+            headers['ETag'] = 'W/' + info.etag
+
+        if precompressed:
+            for encoding in encodings:
+                compressed_path = file_path + SUFFIXES[encoding]
+                try:
+                    compressed_info = await cache.get(compressed_path)
+                except OSError:
+                    continue
+                headers['Content-Encoding'] = encoding
+                return StreamingFileResponse(compressed_path, headers=headers,
+                                             content_type=info.mime_type,
+                                             count=compressed_info.size)
+
+        compressor = app.compressor
+        if compressor is not None and info.size >= compressor.min_size:
+            content = await cache.get_compressed(
+                file_path, info, encodings[0], compressor)
+            if content is not None:
+                headers['Content-Encoding'] = encodings[0]
+                return HTTPResponse(headers=headers,
+                                    content_type=info.mime_type,
+                                    body_bytes=content)
+
+        if 'ETag' in headers:
+            headers['ETag'] = info.etag
+        return None
+
     #
     # 异步处理:
     #   - 异步返回文件
@@ -61,19 +293,70 @@ def register(app, uri, file_or_directory, pattern, use_modified_since):
         # match filenames which got encoded (filenames with spaces etc)
         file_path = unquote(file_path)     # 解析文件路径
         try:
-            headers = {}
+            info = await cache.get(file_path)   # 文件信息, 优先从缓存读取
+            headers = {'Accept-Ranges': 'bytes'}
+            validator = None
+
             # Check if the client has been sent this file before
             # and it has not been modified since
             if use_modified_since:
-                stats = await stat(file_path)       # 异步判定
+                headers['Last-Modified'] = info.last_modified
+                headers['ETag'] = info.etag
+                if_none_match = request.headers.get('If-None-Match')
+                if if_none_match is not None:
+                    if if_none_match in (info.etag, 'W/' + info.etag, '*'):
+                        return HTTPResponse(status=304, headers=headers)
+                elif request.headers.get(
+                        'If-Modified-Since') == info.last_modified:
+                    return HTTPResponse(status=304, headers=headers)
+                validator = (info.etag, info.last_modified)
+
+            #
+            # Range 请求:
+            #   - If-Range 与 ETag/Last-Modified 不一致时, 忽略 Range, 返回整个文件
+            #
+            _range = None
+            range_header = request.headers.get('Range')
+            if_range = request.headers.get('If-Range')
+            if range_header and (
+                    not if_range or (validator and if_range in validator)):
+                try:
+                    _range = parse_range(range_header, info.size)
+                except ContentRangeError:
+                    headers['Content-Range'] = 'bytes */{}'.format(info.size)
+                    return HTTPResponse(status=416, headers=headers)
+
+            #
+            # 压缩: 可压缩的文件类型, 响应内容随 Accept-Encoding 变化
+            #
+            if (precompressed or app.compressor is not None) and \
+                    is_compressible(info.mime_type):
+                headers['Vary'] = 'Accept-Encoding'
+                if not _range and 'Accept-Encoding' in request.headers:
+                    response = await _compressed_response(
+                        request, file_path, info, headers)
+                    if response is not None:
+                        return response
+
+            status, offset, count = 200, 0, info.size
+            if _range:
+                start, end = _range
+                headers['Content-Range'] = 'bytes {}-{}/{}'.format(
+                    start, end, info.size)
+                status, offset, count = 206, start, end - start + 1
 
-                modified_since = strftime('%a, %d %b %Y %H:%M:%S GMT',
-                                          gmtime(stats.st_mtime))
-                if request.headers.get('If-Modified-Since') == modified_since:
-                    return HTTPResponse(status=304)
-                headers['Last-Modified'] = modified_since
+            # 小文件: 从内容缓存返回
+            content = await cache.get_content(file_path, info)
+            if content is not None:
+                return HTTPResponse(status=status, headers=headers,
+                                    content_type=info.mime_type,
+                                    body_bytes=content[offset:offset + count])
 
-            return await file(file_path, headers=headers)     # 异步返回文件, 注意 file() 是异步实现.
+            # 文件内容由 StreamingFileResponse 直接写出
+            return StreamingFileResponse(file_path, status=status,
+                                         headers=headers,
+                                         content_type=info.mime_type,
+                                         offset=offset, count=count)
         except:
             raise FileNotFound('File not found',
                                path=file_or_directory,
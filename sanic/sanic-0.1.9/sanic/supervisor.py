@@ -0,0 +1,251 @@
+import os
+import socket
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from signal import (signal, set_wakeup_fd, SIGINT, SIGTERM, SIGHUP, SIGKILL,
+                    SIG_IGN)
+from time import monotonic, sleep
+
+from .log import log
+from .server import serve
+
+
+#
+# worker 进程入口:
+#   - 绑定 CPU 后, 启动 serve()
+#   - SIGHUP 只用于通知主进程滚动重启, worker 忽略
+#
+def run_worker(server_settings, cpu=None):
+    signal(SIGHUP, SIG_IGN)
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    serve(**server_settings)
+
+
+##################################################################################
+#                              多进程 worker 管理
+#
+# 说明:
+#   - pre-fork 模型:
+#       - 主进程绑定一次监听 socket, fork 出的 worker 共用此 socket
+#       - 不依赖 SO_REUSEPORT 的内核负载均衡(容器, 旧内核)
+#       - reuse_port=True 时, 改为每个 worker 各自绑定端口
+#   - 主进程等待 worker 退出或信号, 不轮询:
+#       - worker 异常退出: 重新启动, 启动后立即崩溃的 worker 延迟重启
+#       - SIGHUP: 滚动重启, 新 worker 就绪后再停止旧 worker, 服务不中断
+#       - SIGINT/SIGTERM: 通知 worker 停止, worker 处理完连接后退出
+#           - 超过 graceful_timeout 仍未退出的 worker, 强制结束
+#   - cpu_affinity=True: worker 依次绑定到可用的 CPU
+#
+##################################################################################
+class Supervisor:
+    RESTART_INTERVAL = 1       # worker 启动后不足此秒数即退出, 延迟重启, 避免反复崩溃
+    STOP_EVENT_INTERVAL = 0.1  # 使用 stop_event 时, 检查间隔
+
+    def __init__(self, server_settings, workers, stop_event=None,
+                 graceful_timeout=15, cpu_affinity=False, reuse_port=False):
+        self.server_settings = dict(server_settings)
+        self.workers = workers
+        self.stop_event = stop_event
+        self.graceful_timeout = graceful_timeout
+        self.reuse_port = reuse_port
+        self.cpus = None
+        if cpu_affinity and hasattr(os, 'sched_setaffinity'):
+            self.cpus = sorted(os.sched_getaffinity(0))
+
+        self.context = get_context('fork')       # pre-fork: worker 继承主进程的 socket
+        self.processes = [None] * workers        # 按槽位保存 worker 进程
+        self.ready_events = [None] * workers     # worker 启动完成通知
+        self.started = [0] * workers             # worker 启动时间
+        self.sock = None                         # 主进程绑定的监听 socket
+        self._stopping = False
+        self._reloading = False
+        self._wakeup = None                      # 信号唤醒管道
+        self._old_wakeup_fd = None
+        self._old_handlers = {}
+
+    def run(self):
+        """
+        Starts the workers and supervises them until a stop signal is
+        received, then drains and stops them.
+        :return: Nothing
+        """
+        self.bind()
+        self.install_signals()
+        try:
+            for index in range(self.workers):
+                self.spawn(index)
+
+            while not self.is_stopping():
+                self.wait()
+                if self.is_stopping():
+                    break
+                if self._reloading:
+                    self._reloading = False
+                    self.rolling_restart()
+                self.restart_exited()
+        finally:
+            log.info('Spinning down workers...')
+            self.stop_workers([process for process in self.processes
+                               if process is not None])
+            self.restore_signals()
+            if self.sock is not None:
+                self.sock.close()
+
+    #
+    # 绑定监听 socket:
+    #   - 已传入 sock, 直接共用
+    #   - reuse_port: 每个 worker 自行绑定
+    #
+    def bind(self):
+        settings = self.server_settings
+        if self.reuse_port:
+            settings['reuse_port'] = True
+            return
+        if settings.get('sock') is not None:
+            return
+
+        family, type_, proto, _, address = socket.getaddrinfo(
+            settings['host'], settings['port'], type=socket.SOCK_STREAM,
+            flags=socket.AI_PASSIVE)[0]
+        self.sock = socket.socket(family, type_, proto)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(address)
+        self.sock.listen(100)
+        settings.update(sock=self.sock, host=None, port=None)
+
+    #
+    # 启动一个 worker, 放入指定槽位
+    #
+    def spawn(self, index):
+        ready = self.context.Event()
+        settings = dict(self.server_settings)
+        after_start = settings.get('after_start') or []
+        if not isinstance(after_start, list):
+            after_start = [after_start]
+        settings['after_start'] = after_start + [lambda loop: ready.set()]
+
+        cpu = None
+        if self.cpus:
+            cpu = self.cpus[index % len(self.cpus)]
+
+        process = self.context.Process(
+            target=run_worker, args=(settings, cpu))
+        process.start()
+        self.processes[index] = process
+        self.ready_events[index] = ready
+        self.started[index] = monotonic()
+        log.info('Started worker {} (pid {})'.format(index, process.pid))
+        return process
+
+    #
+    # 等待 worker 退出, 或收到信号
+    #
+    def wait(self):
+        handles = [process.sentinel for process in self.processes
+                   if process is not None]
+        handles.append(self._wakeup[0])
+        timeout = self.STOP_EVENT_INTERVAL if self.stop_event else None
+        wait(handles, timeout)
+        try:
+            os.read(self._wakeup[0], 512)      # 清空唤醒管道
+        except BlockingIOError:
+            pass
+
+    def is_stopping(self):
+        if self.stop_event is not None and self.stop_event.is_set():
+            self._stopping = True
+        return self._stopping
+
+    #
+    # 重启异常退出的 worker
+    #
+    def restart_exited(self):
+        for index, process in enumerate(self.processes):
+            if process is None or process.is_alive():
+                continue
+            process.join()
+            log.error('Worker {} (pid {}) exited with code {}, restarting'.format(
+                index, process.pid, process.exitcode))
+            delay = self.started[index] + self.RESTART_INTERVAL - monotonic()
+            if delay > 0:
+                sleep(delay)
+            if self.is_stopping():
+                self.processes[index] = None
+                return
+            self.spawn(index)
+
+    #
+    # 滚动重启:
+    #   - 逐个替换 worker, 新 worker 就绪后, 再停止旧 worker
+    #   - 新 worker 启动失败, 保留旧 worker, 停止重启
+    #
+    def rolling_restart(self):
+        log.info('Restarting workers...')
+        for index in range(self.workers):
+            old, old_ready = self.processes[index], self.ready_events[index]
+            new = self.spawn(index)
+            deadline = monotonic() + self.graceful_timeout
+            ready = self.ready_events[index]
+            while not ready.wait(self.STOP_EVENT_INTERVAL):
+                if (not new.is_alive() or self.is_stopping() or
+                        monotonic() > deadline):
+                    break
+
+            if not ready.is_set():
+                log.error('Worker {} (pid {}) failed to start, '
+                          'keeping the old worker'.format(index, new.pid))
+                self.stop_workers([new])
+                self.processes[index] = old
+                self.ready_events[index] = old_ready
+                return
+            if old is not None:
+                self.stop_workers([old])
+
+    #
+    # 停止 worker:
+    #   - SIGTERM: worker 停止接受新连接, 处理完已有连接后退出
+    #   - 超过 graceful_timeout, SIGKILL 强制结束
+    #
+    def stop_workers(self, processes):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = monotonic() + self.graceful_timeout
+        for process in processes:
+            process.join(max(0, deadline - monotonic()))
+            if process.is_alive():
+                log.warning('Worker (pid {}) did not stop in {}s, '
+                            'killing'.format(process.pid, self.graceful_timeout))
+                os.kill(process.pid, SIGKILL)
+                process.join()
+
+    # -------------------------------------------- #
+    # Signals
+    #   - 信号处理函数只设置标志
+    #   - 信号到达时写唤醒管道, 使 wait() 立即返回
+    # -------------------------------------------- #
+
+    def install_signals(self):
+        self._wakeup = os.pipe()
+        for fd in self._wakeup:
+            os.set_blocking(fd, False)
+        self._old_wakeup_fd = set_wakeup_fd(self._wakeup[1])
+        for _signal, handler in ((SIGINT, self.handle_stop),
+                                 (SIGTERM, self.handle_stop),
+                                 (SIGHUP, self.handle_reload)):
+            self._old_handlers[_signal] = signal(_signal, handler)
+
+    def restore_signals(self):
+        for _signal, handler in self._old_handlers.items():
+            signal(_signal, handler)
+        set_wakeup_fd(self._old_wakeup_fd)
+        for fd in self._wakeup:
+            os.close(fd)
+
+    def handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def handle_reload(self, signum, frame):
+        self._reloading = True
@@ -1,5 +1,13 @@
+import asyncio
+from json import dumps as json_dumps, loads as json_loads
+from urllib.parse import urlencode
+
 import aiohttp                     # aiohttp.ClientSession() 使用
+from httptools import HttpResponseParser
+from multidict import CIMultiDict
+
 from sanic.log import log
+from sanic.server import Signal, TimerWheel, protocol_factory, async_loop
 
 HOST = '127.0.0.1'    # 默认 HOST
 PORT = 42101          # 默认 端口
@@ -91,3 +99,214 @@ def sanic_endpoint_test(app, method='get', uri='/', gather_request=True,
         except:
             raise ValueError(
                 "Request object expected, got ({})".format(results))
+
+
+#############################################
+#             内存传输层
+#
+# 说明:
+#   - 替代 socket transport, 交给 HttpProtocol 使用
+#   - write()/writelines(): 写出的数据保存在 data 中
+#   - close(): 与真实连接一样, 下一轮事件循环调用 connection_lost()
+#   - closed: 连接关闭后完成的 future
+#
+#############################################
+class MemoryTransport(asyncio.Transport):
+    def __init__(self, loop, protocol, peername=('127.0.0.1', 42102)):
+        super().__init__()
+        self.loop = loop
+        self.protocol = protocol
+        self.peername = peername
+        self.data = bytearray()          # 写出的全部数据
+        self.closed = loop.create_future()
+        self._closing = False
+
+    def get_extra_info(self, name, default=None):
+        if name == 'peername':
+            return self.peername
+        return default
+
+    def write(self, data):
+        if self._closing:
+            raise RuntimeError('Transport is closed')
+        self.data += data
+
+    def writelines(self, list_of_data):
+        for data in list_of_data:
+            self.write(data)
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        self.loop.call_soon(self._connection_lost)
+
+    def _connection_lost(self):
+        self.protocol.connection_lost(None)
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def pause_reading(self):
+        pass
+
+    def resume_reading(self):
+        pass
+
+
+#############################################
+#             内存测试响应
+#
+# 说明:
+#   - 由 httptools 解析 MemoryTransport 写出的数据
+#   - 接口与 local_request() 返回的 aiohttp 响应相同: status, headers, body, text, json()
+#
+#############################################
+class MemoryResponse:
+    def __init__(self, data):
+        self.status = None
+        self.headers = CIMultiDict()
+        self._header_name = None
+        self._chunks = []
+
+        parser = HttpResponseParser(self)
+        parser.feed_data(bytes(data))
+        self.status = parser.get_status_code()
+        self.version = parser.get_http_version()
+        self.body = b''.join(self._chunks)
+        self.text = self.body.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json_loads(self.text)
+
+    # -------------------------------------------- #
+    # httptools 解析回调
+    # -------------------------------------------- #
+
+    def on_header(self, name, value):
+        self.headers.add(name.decode(), value.decode('utf-8'))
+
+    def on_body(self, body):
+        self._chunks.append(body)
+
+
+#############################################
+#             内存测试客户端
+#
+# 说明:
+#   - 不启动服务器, 不使用 socket
+#   - 每个请求创建一个 HttpProtocol + MemoryTransport, 原始 HTTP 数据直接交给 data_received()
+#       - 请求经过与真实服务器相同的解析, 中间件, 路由, 响应写出流程
+#   - 不执行 before_start 等服务器事件, 不触发超时
+#   - 同一个客户端的请求共用一个事件循环, 多次请求不必重复启动
+#
+#############################################
+class SanicTestClient:
+    def __init__(self, app, loop=None, debug=False):
+        self.app = app
+        self.loop = loop or async_loop.new_event_loop()
+        app.debug = debug
+        app.error_handler.debug = True       # 与 Sanic.run() 一致
+        app.compile_dispatch()
+
+        settings = app.protocol_settings()
+        request_handler = settings['request_handler']
+        self.requests = []                   # 服务端收到的请求对象
+
+        def handle_request(request, response_callback):
+            self.requests.append(request)
+            return request_handler(request, response_callback)
+
+        settings['request_handler'] = handle_request
+        self.protocol = protocol_factory(
+            loop=self.loop, connections=set(), signal=Signal(),
+            timer_wheel=TimerWheel(self.loop), **settings)
+
+    #
+    # 发送原始 HTTP 数据:
+    #   - 返回服务端写出的原始数据, 服务端关闭连接, 或超时后返回
+    #
+    def raw_request(self, data, timeout=5):
+        return self.loop.run_until_complete(
+            self._raw_request(data, timeout))
+
+    async def _raw_request(self, data, timeout):
+        protocol = self.protocol()
+        transport = MemoryTransport(self.loop, protocol)
+        protocol.connection_made(transport)
+        protocol.data_received(data)
+        timeout_handle = self.loop.call_later(timeout, transport.close)
+        try:
+            await transport.closed
+        finally:
+            timeout_handle.cancel()
+        return bytes(transport.data)
+
+    #
+    # 发送一个请求:
+    #   - data: bytes/str 原样发送; dict 按表单编码
+    #   - json: 按 JSON 编码
+    #   - 返回 (服务端请求对象, 响应), 未产生请求对象时, 请求对象为 None
+    #
+    def request(self, method='get', uri='/', headers=None, data=None,
+                json=None, timeout=5):
+        headers = dict(headers or {})
+        if json is not None:
+            data = json_dumps(json)
+            headers.setdefault('Content-Type', 'application/json')
+        elif isinstance(data, dict):
+            data = urlencode(data)
+            headers.setdefault('Content-Type',
+                               'application/x-www-form-urlencoded')
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        data = data or b''
+
+        headers.setdefault('Host', '{}:{}'.format(HOST, PORT))
+        headers.setdefault('Connection', 'close')
+        if data or method.upper() in ('POST', 'PUT', 'PATCH'):
+            headers.setdefault('Content-Length', str(len(data)))
+
+        head = '{} {} HTTP/1.1\r\n{}\r\n'.format(
+            method.upper(), uri, ''.join(
+                '{}: {}\r\n'.format(name, value)
+                for name, value in headers.items()))
+
+        count = len(self.requests)
+        response = MemoryResponse(self.raw_request(
+            head.encode('utf-8') + data, timeout))
+        request = self.requests[-1] if len(self.requests) > count else None
+        return request, response
+
+    def get(self, uri='/', **kwargs):
+        return self.request('get', uri, **kwargs)
+
+    def post(self, uri='/', **kwargs):
+        return self.request('post', uri, **kwargs)
+
+    def close(self):
+        self.loop.close()
+
+
+#############################################
+#             sanic 框架内存端点测试
+#
+# 说明:
+#   - 与 sanic_endpoint_test() 用法相同, 但不启动服务器, 见 SanicTestClient
+#   - 额外参数: headers, data, json
+#
+#############################################
+def sanic_memory_test(app, method='get', uri='/', gather_request=True,
+                      loop=None, debug=False, **request_kwargs):
+    client = SanicTestClient(app, loop=loop, debug=debug)
+    try:
+        request, response = client.request(method, uri, **request_kwargs)
+    finally:
+        if loop is None:
+            client.close()
+
+    if gather_request:
+        return request, response
+    return response
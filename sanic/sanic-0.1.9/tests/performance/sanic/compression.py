@@ -0,0 +1,25 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import timeit
+
+from sanic.compression import ENCODINGS, compress
+
+#
+# 压缩耗时与压缩率:
+#   - 每种格式, 不同大小的 JSON 响应体
+#   - 用于选择 COMPRESS_MIN_SIZE, COMPRESS_THREAD_SIZE, 压缩级别
+#
+for size in (1024, 16384, 262144):
+    body = (b'{"id": 12345, "name": "Gotta go fast", "tags": ["a", "b"]}, '
+            * (size // 61 + 1))[:size]
+    print("Body: {:,} bytes".format(size))
+    for encoding in ENCODINGS:
+        compressed = compress(body, encoding)
+        time = timeit.timeit(lambda: compress(body, encoding), number=100)
+        print("  {:<4} ratio {:.3f}  {:.1f} us/response".format(
+            encoding, len(compressed) / size, time / 100 * 1e6))
@@ -0,0 +1,55 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import json as stdlib_json
+import timeit
+
+import ujson
+
+from sanic.request import Request
+from sanic.response import JSON, json
+
+#
+# JSON 响应与请求解析基准测试:
+#   - 小负载(约 100 字节)与大负载(约 1MB)
+#   - 对比 ujson(默认, 返回 str), orjson(返回 bytes, 不再编码), 标准库 json
+#   - 响应: json(...).output(); 请求: request.json
+#
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SERIALIZERS = [('ujson', ujson.dumps, ujson.loads),
+               ('json', stdlib_json.dumps, stdlib_json.loads)]
+if orjson is not None:
+    SERIALIZERS.insert(1, ('orjson', orjson.dumps, orjson.loads))
+
+SMALL = {'id': 12345, 'name': 'Gotta go fast', 'tags': ['sanic', 'json'],
+         'active': True, 'score': 9.5}
+LARGE = [dict(SMALL, id=n) for n in range(11000)]
+
+
+def parse(body, number):
+    for n in range(number):
+        request = Request(b'/', {}, '1.1', 'POST')
+        request.body = body
+        request.json
+
+
+for label, payload, number in (('100 B', SMALL, 100000), ('1 MB', LARGE, 20)):
+    print("Payload: {} ({:,} bytes)".format(
+        label, len(ujson.dumps(payload))))
+    for name, dumps, loads in SERIALIZERS:
+        JSON.dumps, JSON.loads = dumps, loads
+        body = json(payload).body
+        response_time = min(timeit.repeat(
+            lambda: json(payload).output(), number=number, repeat=5))
+        request_time = min(timeit.repeat(
+            lambda: parse(body, number), number=1, repeat=5))
+        print("  {:<7} response {:>10.2f} us   request.json {:>10.2f} us".format(
+            name, response_time / number * 1e6, request_time / number * 1e6))
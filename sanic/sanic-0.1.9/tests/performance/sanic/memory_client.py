@@ -0,0 +1,39 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import logging
+import timeit
+
+from sanic import Sanic
+from sanic.log import log
+from sanic.response import json
+from sanic.utils import sanic_endpoint_test, sanic_memory_test, SanicTestClient
+
+#
+# 测试工具基准测试:
+#   - sanic_endpoint_test(): 每次启动服务器, 经 socket 发送请求
+#   - sanic_memory_test(): 每次创建事件循环, 不使用 socket
+#   - SanicTestClient: 共用事件循环, 只测请求处理流程本身
+#
+log.setLevel(logging.ERROR)
+
+app = Sanic('test_client')
+
+
+@app.route('/')
+async def handler(request):
+    return json({'test': True})
+
+
+client = SanicTestClient(app)
+for name, run, number in (
+        ('sanic_endpoint_test', lambda: sanic_endpoint_test(app), 50),
+        ('sanic_memory_test', lambda: sanic_memory_test(app), 1000),
+        ('SanicTestClient.get', lambda: client.get('/'), 10000)):
+    time = min(timeit.repeat(run, number=number, repeat=3))
+    print("{:<20} x{:<6,} {:.4f} seconds ({:.1f} us/request)".format(
+        name, number, time, time / number * 1e6))
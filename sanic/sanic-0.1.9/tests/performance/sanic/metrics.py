@@ -0,0 +1,54 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import asyncio
+import timeit
+
+from sanic import Sanic
+from sanic.request import Request
+from sanic.response import json
+
+#
+# 请求统计开销基准测试:
+#   - 不经过网络, 直接调用 handle_request()
+#   - 对比未启用与启用 enable_metrics() 时, 每个请求的耗时
+#
+NUMBER = 50000
+
+
+def build(enabled):
+    app = Sanic('metrics_{}'.format(enabled))
+    if enabled:
+        app.enable_metrics(uri=None)
+
+    @app.route('/')
+    async def handler(request):
+        return json({'test': True})
+
+    return app
+
+
+def responded(response):
+    pass
+
+
+async def run(app, requests):
+    for request in requests:
+        await app.handle_request(request, responded)
+
+
+loop = asyncio.new_event_loop()
+for enabled in (False, True):
+    app = build(enabled)
+    # 请求对象预先创建, 不计入耗时
+    requests = [Request(b'/', {}, '1.1', 'GET') for n in range(NUMBER)]
+    loop.run_until_complete(run(app, requests[:100]))
+    times = timeit.repeat(
+        lambda: loop.run_until_complete(run(app, requests)), number=1, repeat=10)
+    print("Metrics enabled: {}".format(enabled))
+    print("  handle_request x{:,}: {:.4f} seconds ({:.2f} us/request)".format(
+        NUMBER, min(times), min(times) / NUMBER * 1e6))
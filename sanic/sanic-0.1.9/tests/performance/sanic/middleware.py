@@ -0,0 +1,61 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import asyncio
+import timeit
+
+from sanic import Sanic
+from sanic.request import Request
+from sanic.response import json
+
+#
+# Sanic.handle_request() 基准测试:
+#   - 不经过网络, 直接调用 handle_request()
+#   - 对比无中间件, 与 8 个中间件(4 个请求中间件, 4 个响应中间件)时的耗时
+#
+NUMBER = 50000
+
+
+def build(middleware_count):
+    app = Sanic('middleware_{}'.format(middleware_count))
+
+    @app.route('/')
+    async def handler(request):
+        return json({'test': True})
+
+    for n in range(middleware_count // 2):
+        @app.middleware('request')
+        def request_middleware(request):
+            request.get('missing')
+
+        @app.middleware('response')
+        async def response_middleware(request, response):
+            pass
+
+    return app
+
+
+def responded(response):
+    pass
+
+
+async def run(app, requests):
+    for request in requests:
+        await app.handle_request(request, responded)
+
+
+loop = asyncio.new_event_loop()
+for count in (0, 8):
+    app = build(count)
+    # 请求对象预先创建, 不计入耗时
+    requests = [Request(b'/', {}, '1.1', 'GET') for n in range(NUMBER)]
+    loop.run_until_complete(run(app, requests[:100]))    # 预热路由缓存
+    times = timeit.repeat(
+        lambda: loop.run_until_complete(run(app, requests)), number=1, repeat=10)
+    print("Middlewares: {}".format(count))
+    print("  handle_request x{:,}: {:.4f} seconds ({:.2f} us/request)".format(
+        NUMBER, min(times), min(times) / NUMBER * 1e6))
@@ -0,0 +1,69 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import asyncio
+import time
+from multiprocessing import Process
+
+from sanic import Sanic
+from sanic.response import json
+
+#
+# 流水线压测:
+#   - 类似 wrk --pipeline N: 每个连接一次发送 N 个请求, 读完 N 个响应后再发送下一批
+#   - 对比 depth=1(不使用流水线) 与 depth>1 时的吞吐量
+#
+HOST = '127.0.0.1'
+PORT = 42102
+CONNECTIONS = 8
+DURATION = 3
+
+REQUEST = b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n'
+
+
+def run_server():
+    app = Sanic('pipelining')
+
+    @app.route('/')
+    async def handler(request):
+        return json({'test': True})
+
+    app.run(host=HOST, port=PORT)
+
+
+async def client(depth, deadline):
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    batch = REQUEST * depth
+    count = 0
+    while time.time() < deadline:
+        writer.write(batch)
+        for n in range(depth):
+            await reader.readuntil(b'\r\n\r\n')    # HTTP 头
+            await reader.readexactly(13)           # {"test":true}
+        count += depth
+    writer.close()
+    return count
+
+
+async def bench(depth):
+    deadline = time.time() + DURATION
+    counts = await asyncio.gather(
+        *[client(depth, deadline) for n in range(CONNECTIONS)])
+    return sum(counts) / DURATION
+
+
+server = Process(target=run_server)
+server.start()
+time.sleep(1)
+
+loop = asyncio.new_event_loop()
+try:
+    for depth in (1, 4, 16):
+        print("Pipeline depth {}: {:.0f} requests/sec".format(
+            depth, loop.run_until_complete(bench(depth))))
+finally:
+    server.terminate()
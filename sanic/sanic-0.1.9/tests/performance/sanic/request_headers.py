@@ -0,0 +1,68 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import timeit
+
+from sanic.server import HttpProtocol
+
+#
+# 请求头解析基准测试:
+#   - 直接调用 httptools 回调 on_header(), on_headers_complete(), 构建 Request
+#   - 对比立即解码(CIMultiDict)与延迟解析(LazyHeaders)
+#   - 分别测试 handler 不读取 HTTP 头, 与读取一个 HTTP 头的情况
+#
+HEADERS = [
+    (b'Host', b'localhost:8000'),
+    (b'User-Agent', b'wrk/4.1.0 (Linux x86_64)'),
+    (b'Accept', b'application/json'),
+    (b'Accept-Encoding', b'gzip, deflate'),
+    (b'Accept-Language', b'en-US,en;q=0.5'),
+    (b'Connection', b'keep-alive'),
+    (b'Cache-Control', b'no-cache'),
+]
+
+
+class Transport:
+    def get_extra_info(self, name):
+        return ('127.0.0.1', 54321)
+
+
+class Parser:
+    def get_http_version(self):
+        return '1.1'
+
+    def get_method(self):
+        return b'GET'
+
+
+def build(lazy_headers):
+    protocol = HttpProtocol(loop=None, request_handler=None,
+                            error_handler=None, request_max_size=100000,
+                            lazy_headers=lazy_headers)
+    protocol.transport = Transport()
+    protocol.parser = Parser()
+    return protocol
+
+
+def parse(protocol, read_header):
+    protocol.headers = []
+    protocol.url = b'/'
+    for name, value in HEADERS:
+        protocol.on_header(name, value)
+    protocol.on_headers_complete()
+    if read_header:
+        protocol.request.headers.get('Accept')
+
+
+for read_header in (False, True):
+    print("Handler reads a header: {}".format(read_header))
+    for lazy_headers in (False, True):
+        protocol = build(lazy_headers)
+        time = min(timeit.repeat(lambda: parse(protocol, read_header),
+                                 number=100000, repeat=5))
+        print("  {:<8} x100,000: {:.4f} seconds".format(
+            'lazy' if lazy_headers else 'eager', time))
@@ -0,0 +1,36 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import timeit
+
+from sanic.response import json
+
+print(json({"test": True}).output())
+
+#
+# HTTPResponse.output() 基准测试:
+#   - 分别测试 json/text/html 响应, 以及带自定义 HTTP 头的响应
+#   - 响应对象在 setup 中创建, 只计时 output()
+#
+cases = (
+    ('json', 'json({"test": True})', '"1.1", True, 60'),
+    ('text', 'text("Hello, world!")', '"1.1", True, 60'),
+    ('html', 'html("<h1>Hello</h1>")', '"1.1", False'),
+    ('text + headers',
+     'text("OK", headers={"X-Served-By": "sanic", "Cache-Control": "no-cache"})',
+     '"1.1", True, 60'),
+)
+
+for name, response, args in cases:
+    print("Running {} 100,000 times".format(name))
+    setup = 'from sanic.response import json, text, html\n' \
+            'response = {}'.format(response)
+    times = []
+    for n in range(5):
+        times.append(timeit.timeit(
+            'response.output({})'.format(args), setup=setup, number=100000))
+    print("  Best: {:.4f} seconds".format(min(times)))
@@ -0,0 +1,45 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import timeit
+
+from sanic.router import Router
+
+
+#
+# 旧实现: 按 url.count('/') 分桶, 桶内逐个正则匹配
+#
+def bucket_get(buckets, url):
+    for route in buckets.get(url.count('/'), ()):
+        match = route.pattern.match(url)
+        if match:
+            return route
+    return None
+
+
+def build(count):
+    router = Router()
+    for n in range(count):
+        router.add('/api/resource{}/<item_id:int>/<name>'.format(n),
+                   None, lambda request: None)
+
+    buckets = {}
+    for uri, route in router.routes_all.items():
+        buckets.setdefault(uri.count('/'), []).append(route)
+    return router, buckets
+
+
+for count in (10, 100, 1000):
+    router, buckets = build(count)
+    # 最后注册的路由, 旧实现中需要扫描整个桶
+    url = '/api/resource{}/12345/test'.format(count - 1)
+
+    print("Routes: {}".format(count))
+    time = timeit.timeit(lambda: bucket_get(buckets, url), number=10000)
+    print("  Bucket scan x10,000: {:.4f} seconds".format(time))
+    time = timeit.timeit(lambda: router._get(url), number=10000)
+    print("  Route tree  x10,000: {:.4f} seconds".format(time))
@@ -0,0 +1,84 @@
+import sys
+import os
+import inspect
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, currentdir + '/../../../')
+
+import asyncio
+import time
+
+from sanic.server import TimerWheel
+
+#
+# 空闲长连接超时管理基准测试:
+#   - 旧实现: 每个连接一个 loop.call_later 句柄, 刷新时取消再重新创建
+#   - 时间轮: 所有连接共用一个 tick
+#   - 不建立真实连接, 只测试超时的添加, 刷新(每个请求一次)与事件循环中的句柄数
+#
+KEEP_ALIVE_TIMEOUT = 5
+REQUEST_TIMEOUT = 60
+
+
+class Connection:
+    __slots__ = ('_timer_slot', '_timer_deadline', 'handle')
+
+    def __init__(self):
+        self._timer_slot = None
+        self._timer_deadline = None
+        self.handle = None
+
+    def connection_timeout(self):
+        pass
+
+
+def call_later_add(loop, connections):
+    for connection in connections:
+        connection.handle = loop.call_later(
+            KEEP_ALIVE_TIMEOUT, connection.connection_timeout)
+
+
+def call_later_touch(loop, connections):
+    for connection in connections:
+        connection.handle.cancel()
+        connection.handle = loop.call_later(
+            REQUEST_TIMEOUT, connection.connection_timeout)
+
+
+def wheel_add(wheel, connections):
+    for connection in connections:
+        wheel.add(connection, KEEP_ALIVE_TIMEOUT)
+
+
+def wheel_touch(wheel, connections):
+    for connection in connections:
+        wheel.add(connection, REQUEST_TIMEOUT)
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+for count in (10000, 50000):
+    print("Idle connections: {:,}".format(count))
+
+    loop = asyncio.new_event_loop()
+    connections = [Connection() for n in range(count)]
+    add = measure(call_later_add, loop, connections)
+    touch = measure(call_later_touch, loop, connections)
+    print("  call_later: add {:.4f}s, touch {:.4f}s, loop handles {:,}".format(
+        add, touch, len(loop._scheduled)))
+    loop.close()
+
+    loop = asyncio.new_event_loop()
+    wheel = TimerWheel(loop, size=REQUEST_TIMEOUT + 2)
+    wheel.start()
+    connections = [Connection() for n in range(count)]
+    add = measure(wheel_add, wheel, connections)
+    touch = measure(wheel_touch, wheel, connections)
+    print("  timer wheel: add {:.4f}s, touch {:.4f}s, loop handles {:,}".format(
+        add, touch, len(loop._scheduled)))
+    wheel.stop()
+    loop.close()
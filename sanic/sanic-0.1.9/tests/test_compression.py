@@ -0,0 +1,135 @@
+import asyncio
+import gzip
+
+import pytest
+
+from sanic import Sanic
+from sanic.compression import (Compressor, ENCODINGS, accepted_encodings,
+                               brotli)
+from sanic.request import Request
+from sanic.response import HTTPResponse, text
+from sanic.utils import sanic_endpoint_test
+
+BODY = 'Gotta go fast! ' * 100
+
+
+def compression_app(name, **config):
+    app = Sanic(name)
+    app.config.COMPRESS_RESPONSES = True
+    for key, value in config.items():
+        setattr(app.config, key, value)
+
+    @app.route('/')
+    async def handler(request):
+        return text(BODY)
+
+    @app.route('/small')
+    async def small(request):
+        return text('OK')
+
+    return app
+
+
+def test_compress_gzip():
+    app = compression_app('test_compress_gzip')
+
+    request, response = sanic_endpoint_test(
+        app, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert int(response.headers['Content-Length']) < len(BODY)
+    assert response.text == BODY
+
+
+def test_compress_in_thread():
+    app = compression_app('test_compress_in_thread', COMPRESS_THREAD_SIZE=1)
+
+    request, response = sanic_endpoint_test(
+        app, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.text == BODY
+
+
+@pytest.mark.parametrize('uri,accept_encoding', [
+    ('/small', 'gzip'),
+    ('/', 'identity'),
+    ('/', 'gzip;q=0'),
+])
+def test_compress_skipped(uri, accept_encoding):
+    app = compression_app('test_compress_skipped')
+
+    request, response = sanic_endpoint_test(
+        app, uri=uri, headers={'Accept-Encoding': accept_encoding})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.text in (BODY, 'OK')
+
+
+def test_compress_disabled_by_default():
+    app = Sanic('test_compress_disabled_by_default')
+
+    @app.route('/')
+    async def handler(request):
+        return text(BODY)
+
+    request, response = sanic_endpoint_test(
+        app, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert app.compressor is None
+
+
+def test_accepted_encodings():
+    assert accepted_encodings('gzip, deflate') == ('gzip',)
+    assert accepted_encodings('identity') == ()
+    assert accepted_encodings('*') == ENCODINGS
+    assert accepted_encodings('*, gzip;q=0') == tuple(
+        encoding for encoding in ENCODINGS if encoding != 'gzip')
+    if brotli is not None:
+        assert accepted_encodings('gzip, br') == ('br', 'gzip')
+        assert accepted_encodings('gzip;q=1.0, br;q=0.5') == ('gzip', 'br')
+
+
+@pytest.mark.skipif(brotli is None, reason='brotli is not installed')
+def test_compress_response_brotli():
+    request = Request(b'/', {'Accept-Encoding': 'br, gzip'}, '1.1', 'GET')
+    response = HTTPResponse(BODY, headers={'ETag': '"1"'})
+
+    assert Compressor().compress_response(request, response) is None
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.headers['ETag'] == 'W/"1"'
+    assert brotli.decompress(response.body) == BODY.encode()
+
+
+def test_compress_response_offloaded():
+    request = Request(b'/', {'Accept-Encoding': 'gzip'}, '1.1', 'GET')
+    response = HTTPResponse(BODY, headers={'Vary': 'Cookie'})
+    loop = asyncio.new_event_loop()
+
+    compressed = Compressor(thread_size=1000).compress_response(
+        request, response)
+    assert response.headers['Vary'] == 'Cookie, Accept-Encoding'
+    assert 'Content-Encoding' not in response.headers
+    loop.run_until_complete(compressed)
+    loop.close()
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.body) == BODY.encode()
+
+
+def test_compress_response_keeps_shared_headers():
+    request = Request(b'/', {'Accept-Encoding': 'gzip'}, '1.1', 'GET')
+    headers = {'ETag': '"1"'}
+    compressor = Compressor()
+
+    # 同一个 headers 字典用于多个响应, 压缩不修改调用者的字典
+    compressor.compress_response(request, HTTPResponse(BODY, headers=headers))
+    response = HTTPResponse(BODY, headers=headers,
+                            content_type='application/octet-stream')
+    compressor.compress_response(request, response)
+
+    assert headers == {'ETag': '"1"'}
+    assert 'Content-Encoding' not in response.headers
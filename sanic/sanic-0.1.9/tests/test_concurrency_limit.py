@@ -0,0 +1,144 @@
+import asyncio
+
+from sanic import Sanic
+from sanic.limiter import ConcurrencyLimiter
+from sanic.response import text
+from sanic.utils import HOST, PORT
+
+
+#
+# 同时建立多个连接, 每个连接发送一个请求, 返回各连接的响应
+#
+def concurrent_test(app, uris):
+    results = []
+
+    async def _request(uri):
+        reader, writer = await asyncio.open_connection(HOST, PORT)
+        writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\n'
+                     'Connection: close\r\n\r\n'.format(uri).encode())
+        data = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return data
+
+    async def _collect_responses(sanic, loop):
+        try:
+            results.extend(await asyncio.gather(
+                *[_request(uri) for uri in uris]))
+        finally:
+            app.stop()
+
+    app.run(host=HOST, port=PORT, after_start=_collect_responses)
+    return results
+
+
+def test_concurrency_limit_queue_and_reject():
+    app = Sanic('test_concurrency_limit_queue_and_reject')
+    app.config.CONCURRENCY_LIMIT = 1
+    app.config.CONCURRENCY_QUEUE_SIZE = 1
+    running = []
+    peak = []
+
+    @app.route('/')
+    async def handler(request):
+        running.append(request)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.remove(request)
+        return text('OK')
+
+    results = concurrent_test(app, ['/'] * 3)
+
+    statuses = sorted(data.split(b'\r\n', 1)[0] for data in results)
+    assert statuses == [b'HTTP/1.1 200 OK', b'HTTP/1.1 200 OK',
+                        b'HTTP/1.1 503 Service Unavailable']
+    rejected = [data for data in results if b' 503 ' in data][0]
+    assert b'Retry-After: 1\r\n' in rejected
+    assert max(peak) == 1
+
+
+def test_route_concurrency_limit():
+    app = Sanic('test_route_concurrency_limit')
+    app.config.CONCURRENCY_QUEUE_SIZE = 0
+
+    @app.route('/slow', concurrency_limit=1)
+    async def slow(request):
+        await asyncio.sleep(0.05)
+        return text('slow')
+
+    @app.route('/fast')
+    async def fast(request):
+        await asyncio.sleep(0.05)
+        return text('fast')
+
+    results = concurrent_test(app, ['/slow', '/slow', '/fast', '/fast'])
+
+    assert [data.split(b'\r\n', 1)[0] for data in results].count(
+        b'HTTP/1.1 503 Service Unavailable') == 1
+    assert sum(data.endswith(b'\r\n\r\nfast') for data in results) == 2
+    assert sum(data.endswith(b'\r\n\r\nslow') for data in results) == 1
+
+
+def test_route_concurrency_limit_is_per_route():
+    app = Sanic('test_route_concurrency_limit_is_per_route')
+    app.config.CONCURRENCY_QUEUE_SIZE = 0
+
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return text('OK')
+
+    # 同一函数注册为两个路由, 上限只属于 /limited
+    app.add_route(handler, '/limited', concurrency_limit=1)
+    app.add_route(handler, '/unlimited')
+    assert not hasattr(handler, 'concurrency_limit')
+    assert app.route_concurrency_limits() == {'/limited': 1}
+
+    results = concurrent_test(
+        app, ['/limited', '/limited', '/unlimited', '/unlimited'])
+
+    status_lines = [data.split(b'\r\n', 1)[0] for data in results]
+    assert status_lines.count(b'HTTP/1.1 503 Service Unavailable') == 1
+    assert status_lines.count(b'HTTP/1.1 200 OK') == 3
+
+
+def test_concurrency_limiter_release_order():
+    loop = asyncio.new_event_loop()
+    limiter = ConcurrencyLimiter(limit=1, queue_size=2,
+                                 route_limits={'route': 1})
+    tasks = []
+    started = []
+
+    def start(name):
+        started.append(name)
+        tasks.append(loop.create_future())
+        return tasks[-1]
+
+    assert limiter.submit('route', lambda: start('first'))
+    assert limiter.submit(None, lambda: start('second'))
+    assert limiter.submit('route', lambda: start('third'))
+    assert not limiter.submit(None, lambda: start('rejected'))
+    assert started == ['first'] and limiter.rejected == 1
+
+    tasks[0].set_result(None)
+    loop.run_until_complete(asyncio.sleep(0))
+    assert started == ['first', 'second']
+
+    tasks[1].set_result(None)
+    loop.run_until_complete(asyncio.sleep(0))
+    assert started == ['first', 'second', 'third']
+    assert limiter.active == 1 and limiter.route_active['route'] == 1
+    loop.close()
+
+
+def test_concurrency_limiter_loop_lag():
+    class TimerWheel:
+        lag = 0
+
+    timer_wheel = TimerWheel()
+    limiter = ConcurrencyLimiter(max_lag=0.5, timer_wheel=timer_wheel)
+    loop = asyncio.new_event_loop()
+
+    assert limiter.submit(None, loop.create_future)
+    timer_wheel.lag = 1
+    assert not limiter.submit(None, loop.create_future)
+    assert limiter.rejected == 1
+    loop.close()
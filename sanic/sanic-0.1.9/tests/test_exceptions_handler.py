@@ -47,3 +47,45 @@ def test_text_exception__handler():
         exception_handler_app, uri='/random')
     assert response.status == 200
     assert response.text == 'OK'
+
+
+class CustomNotFound(NotFound):
+    pass
+
+
+def test_exception_handler_subclass():
+    app = Sanic('test_exception_handler_subclass')
+
+    @app.route('/')
+    def handler(request):
+        raise CustomNotFound('custom')
+
+    @app.exception(NotFound)
+    def handler_not_found(request, exception):
+        return text('not found: {}'.format(exception), 404)
+
+    request, response = sanic_endpoint_test(app)
+    assert response.status == 404
+    assert response.text == 'not found: custom'
+
+
+def test_exception_handler_lookup_cache():
+    app = Sanic('test_exception_handler_lookup_cache')
+    error_handler = app.error_handler
+
+    def handler_base(request, exception):
+        return text('base')
+
+    def handler_subclass(request, exception):
+        return text('subclass')
+
+    assert error_handler.lookup(CustomNotFound) == error_handler.default
+
+    error_handler.add(Exception, handler_base)
+    assert error_handler.lookup(CustomNotFound) is handler_base
+    assert error_handler.cached_handlers[CustomNotFound] is handler_base
+
+    # 注册新 handler 后, 缓存失效, 按 MRO 取最近的 handler
+    error_handler.add(NotFound, handler_subclass)
+    assert error_handler.lookup(CustomNotFound) is handler_subclass
+    assert error_handler.lookup(ServerError) is handler_base
@@ -0,0 +1,104 @@
+import asyncio
+import os
+
+from sanic import Sanic
+from sanic.exceptions import ServerError
+from sanic.response import json, text, stream
+from sanic.utils import (sanic_endpoint_test, sanic_memory_test,
+                         SanicTestClient)
+
+
+def echo_app(name):
+    app = Sanic(name)
+
+    @app.route('/', methods=['GET', 'POST'])
+    async def handler(request):
+        return json({'args': request.args, 'json': request.json
+                     if request.body else None, 'ip': request.ip})
+
+    @app.route('/form', methods=['POST'])
+    async def form(request):
+        return text(request.form.get('name'))
+
+    @app.route('/error')
+    async def error(request):
+        raise ServerError('Error')
+
+    return app
+
+
+def test_memory_matches_endpoint_test():
+    app = echo_app('test_memory_matches_endpoint_test')
+    request, response = sanic_memory_test(app, uri='/?fast=yes')
+
+    assert response.status == 200
+    assert response.headers['Content-Type'] == 'application/json'
+    assert response.json() == {'args': {'fast': ['yes']}, 'json': None,
+                               'ip': '127.0.0.1'}
+    assert request.args == {'fast': ['yes']}
+
+    _, endpoint_response = sanic_endpoint_test(
+        echo_app('test_memory_matches_endpoint_test'), uri='/?fast=yes')
+    assert endpoint_response.text == response.text
+
+
+def test_memory_post():
+    client = SanicTestClient(echo_app('test_memory_post'))
+
+    request, response = client.post('/', json={'test': True})
+    assert response.json()['json'] == {'test': True}
+    assert request.method == 'POST'
+
+    request, response = client.post('/form', data={'name': 'sanic'})
+    assert response.text == 'sanic'
+
+    request, response = client.get('/error')
+    assert response.status == 500
+    assert response.text == 'Error: Error'
+
+    request, response = client.get('/missing')
+    assert response.status == 404
+    assert request.url == '/missing'
+    client.close()
+
+
+def test_memory_stream_and_static():
+    app = Sanic('test_memory_stream_and_static')
+    static_file = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'static', 'test.file')
+    app.static('/test.file', static_file)
+
+    async def streaming_fn(response):
+        await response.write('foo')
+        await asyncio.sleep(0)
+        await response.write('bar')
+
+    @app.route('/stream')
+    async def handler(request):
+        return stream(streaming_fn)
+
+    client = SanicTestClient(app)
+    request, response = client.get('/stream')
+    assert response.headers['Transfer-Encoding'] == 'chunked'
+    assert response.text == 'foobar'
+
+    request, response = client.get('/test.file')
+    with open(static_file, 'rb') as file:
+        assert response.body == file.read()
+    client.close()
+
+
+def test_memory_raw_request():
+    app = Sanic('test_memory_raw_request')
+
+    @app.route('/')
+    async def handler(request):
+        return text('OK')
+
+    client = SanicTestClient(app)
+    data = client.raw_request(
+        b'GET / HTTP/1.1\r\n\r\n'
+        b'GET / HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert data.count(b'HTTP/1.1 200 OK') == 2
+    assert len(client.requests) == 2
+    client.close()
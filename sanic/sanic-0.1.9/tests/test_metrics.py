@@ -0,0 +1,125 @@
+from json import loads
+
+from sanic import Sanic
+from sanic.exceptions import ServerError
+from sanic.metrics import (LATENCY_BUCKETS, PHASES, UNMATCHED, Metrics,
+                           RouteStats)
+from sanic.response import HTTPResponse, text
+from sanic.router import Router
+from sanic.utils import sanic_endpoint_test
+
+
+def test_metrics_disabled_by_default():
+    app = Sanic('test_metrics_disabled_by_default')
+
+    @app.route('/')
+    async def handler(request):
+        return text('OK')
+
+    request, response = sanic_endpoint_test(app)
+
+    assert response.text == 'OK'
+    assert app.metrics is None
+
+
+def test_metrics_per_route():
+    app = Sanic('test_metrics_per_route')
+    metrics = app.enable_metrics(uri=None)
+
+    @app.route('/user/<user_id:int>')
+    async def user(request, user_id):
+        return text('OK')
+
+    @app.route('/error')
+    async def error(request):
+        raise ServerError('Error')
+
+    for uri in ('/user/1', '/user/2', '/error', '/missing'):
+        sanic_endpoint_test(app, uri=uri)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['requests'] == 4
+    assert snapshot['in_flight'] == 0
+
+    routes = snapshot['routes']
+    assert set(routes) == {'/user/<user_id:int>', '/error', UNMATCHED}
+    assert routes['/user/<user_id:int>']['count'] == 2
+    assert routes['/user/<user_id:int>']['errors'] == 0
+    assert routes['/user/<user_id:int>']['in_flight'] == 0
+    assert sum(routes['/user/<user_id:int>']['histogram']) == 2
+    assert set(routes['/user/<user_id:int>']['phases']) == set(PHASES)
+    assert routes['/error']['errors'] == 1
+    assert routes[UNMATCHED]['count'] == 1
+
+
+def test_metrics_handler_on_several_routes():
+    app = Sanic('test_metrics_handler_on_several_routes')
+    metrics = app.enable_metrics(uri=None)
+
+    async def handler(request):
+        return text('OK')
+
+    # 同一 handler 注册在两个 URL 上, 分别统计
+    app.add_route(handler, '/a')
+    app.add_route(handler, '/b')
+
+    for uri in ('/a', '/b', '/b'):
+        sanic_endpoint_test(app, uri=uri)
+
+    routes = metrics.snapshot()['routes']
+    assert set(routes) == {'/a', '/b'}
+    assert routes['/a']['count'] == 1
+    assert routes['/b']['count'] == 2
+
+
+def test_metrics_in_flight():
+    app = Sanic('test_metrics_in_flight')
+    metrics = app.enable_metrics(uri=None)
+    results = []
+
+    @app.route('/')
+    async def handler(request):
+        results.append((metrics.in_flight,
+                        metrics.snapshot()['routes']['/']['in_flight']))
+        return text('OK')
+
+    sanic_endpoint_test(app)
+
+    assert results == [(1, 1)]
+    assert metrics.in_flight == 0
+
+
+def test_metrics_endpoint():
+    app = Sanic('test_metrics_endpoint')
+    app.enable_metrics()
+
+    @app.route('/')
+    async def handler(request):
+        return text('OK')
+
+    sanic_endpoint_test(app)
+    request, response = sanic_endpoint_test(app, uri='/metrics')
+
+    snapshot = loads(response.text)
+    assert response.status == 200
+    assert snapshot['buckets'] == list(LATENCY_BUCKETS)
+    assert snapshot['routes']['/']['count'] == 1
+
+
+def test_metrics_record_percentile():
+    metrics = Metrics(Router())
+    response = HTTPResponse('OK')
+
+    for elapsed in (0.00005, 0.0003, 0.0003, 20):
+        metrics.timer = lambda: elapsed
+        metrics.in_flight += 1
+        metrics.record(None, response, 0, 0, 0, 0, 0)
+
+    stats = metrics.unmatched
+    assert stats.count == 4
+    assert stats.max == 20
+    assert stats.phases[-1] == sum((0.00005, 0.0003, 0.0003, 20))
+    assert stats.percentile(0.25) == 0.0001
+    assert stats.percentile(0.5) == 0.0005
+    assert stats.percentile(0.99) == 20
+    assert RouteStats('/').percentile(0.5) == 0.0
@@ -126,3 +126,58 @@ def test_middleware_order():
 
     assert response.status == 200
     assert order == [1,2,3,4,5,6]
+
+
+def test_middleware_sync_and_async_chain():
+    app = Sanic('test_middleware_sync_and_async_chain')
+
+    results = []
+
+    async def async_result(value):
+        results.append(value)
+
+    @app.middleware('request')
+    def sync_request(request):
+        results.append('sync request')
+
+    @app.middleware('request')
+    def sync_request_returns_awaitable(request):
+        return async_result('awaitable request')
+
+    @app.middleware('response')
+    async def async_response(request, response):
+        results.append('async response')
+
+    @app.middleware('response')
+    def sync_response(request, response):
+        return async_result('awaitable response')
+
+    async def async_handler(request):
+        return text('OK')
+
+    @app.route('/')
+    def handler(request):
+        return async_handler(request)
+
+    request, response = sanic_endpoint_test(app)
+
+    assert response.text == 'OK'
+    assert results == ['sync request', 'awaitable request',
+                       'awaitable response', 'async response']
+
+
+def test_middleware_added_after_compile():
+    app = Sanic('test_middleware_added_after_compile')
+
+    @app.route('/')
+    async def handler(request):
+        return text('OK')
+
+    app.compile_dispatch()
+
+    @app.middleware('request')
+    def halt_request(request):
+        return text('halted')
+
+    response = sanic_endpoint_test(app, gather_request=False)
+    assert response.text == 'halted'
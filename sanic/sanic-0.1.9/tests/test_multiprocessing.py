@@ -1,5 +1,8 @@
-from multiprocessing import Array, Event, Process
-from time import sleep
+import os
+from multiprocessing import Array, Event, Process, get_context
+from signal import SIGHUP, SIGKILL, SIGTERM
+from time import sleep, time
+from urllib.request import urlopen
 from ujson import loads as json_loads
 
 from sanic import Sanic
@@ -51,3 +54,60 @@ def skip_test_multiprocessing():
         raise ValueError("Expected JSON response but got '{}'".format(response))
 
     assert results.get('test') == True
+
+
+# ------------------------------------------------------------ #
+#  Supervisor
+# ------------------------------------------------------------ #
+
+def get_worker_pid(previous=None, timeout=10):
+    deadline = time() + timeout
+    while time() < deadline:
+        try:
+            url = 'http://{}:{}/'.format(HOST, PORT)
+            with urlopen(url, timeout=1) as response:
+                pid = json_loads(response.read())['pid']
+            if pid != previous:
+                return pid
+        except OSError:
+            pass
+        sleep(0.1)
+    raise AssertionError('No new worker answered')
+
+
+def test_supervisor_restarts_workers():
+    app = Sanic('test_supervisor')
+
+    @app.route('/')
+    async def handler(request):
+        return json({'pid': os.getpid()})
+
+    settings = {
+        'host': HOST,
+        'port': PORT,
+        'request_handler': app.handle_request,
+        'error_handler': app.error_handler,
+        'request_max_size': 100000,
+    }
+    supervisor = get_context('fork').Process(
+        target=app.serve_multiple, args=(settings, 1),
+        kwargs={'graceful_timeout': 2})
+    supervisor.start()
+    try:
+        pid = get_worker_pid()
+
+        # 崩溃的 worker 被重新启动, 监听 socket 由主进程持有
+        os.kill(pid, SIGKILL)
+        pid = get_worker_pid(previous=pid)
+
+        # SIGHUP: 滚动重启
+        os.kill(supervisor.pid, SIGHUP)
+        get_worker_pid(previous=pid)
+
+        os.kill(supervisor.pid, SIGTERM)
+        supervisor.join(10)
+        assert supervisor.exitcode == 0
+    finally:
+        if supervisor.is_alive():
+            supervisor.terminate()
+            supervisor.join()
@@ -0,0 +1,116 @@
+import asyncio
+
+from sanic import Sanic
+from sanic.response import text, stream
+from sanic.utils import HOST, PORT
+
+
+#
+# 在同一连接上一次发送全部请求, 读取到连接关闭为止
+#
+def pipeline_test(app, requests):
+    results = []
+
+    async def _collect_response(sanic, loop):
+        try:
+            reader, writer = await asyncio.open_connection(HOST, PORT)
+            writer.write(b''.join(requests))
+            results.append(await asyncio.wait_for(reader.read(), 5))
+            writer.close()
+        finally:
+            app.stop()
+
+    app.run(host=HOST, port=PORT, after_start=_collect_response)
+    return results[0]
+
+
+def get(uri, close=False):
+    return 'GET {} HTTP/1.1\r\nHost: localhost\r\n{}\r\n'.format(
+        uri, 'Connection: close\r\n' if close else '').encode()
+
+
+def test_pipelined_responses_in_order():
+    app = Sanic('test_pipelined_responses_in_order')
+
+    # 先到的请求处理得更慢, 响应仍须按请求顺序写出
+    @app.route('/<delay:int>')
+    async def handler(request, delay):
+        await asyncio.sleep(delay / 100)
+        return text('delay {}'.format(delay))
+
+    data = pipeline_test(
+        app, [get('/5'), get('/3'), get('/0'), get('/1', close=True)])
+
+    bodies = [part.rsplit(b'\r\n\r\n', 1)[-1]
+              for part in data.split(b'HTTP/1.1 200 OK')[1:]]
+    assert bodies == [b'delay 5', b'delay 3', b'delay 0', b'delay 1']
+    assert data.count(b'Connection: keep-alive') == 3
+    assert data.count(b'Connection: close') == 1
+
+
+def test_pipelined_concurrency():
+    app = Sanic('test_pipelined_concurrency')
+    app.config.REQUEST_PIPELINE_CONCURRENCY = 2
+    running = []
+    peak = []
+
+    @app.route('/')
+    async def handler(request):
+        running.append(request)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(request)
+        return text('OK')
+
+    data = pipeline_test(app, [get('/')] * 5 + [get('/', close=True)])
+    assert data.count(b'HTTP/1.1 200 OK') == 6
+    assert max(peak) == 2
+
+
+def test_pipelined_stream_response():
+    app = Sanic('test_pipelined_stream_response')
+
+    async def streaming_fn(response):
+        await asyncio.sleep(0.01)
+        await response.write('streamed')
+
+    @app.route('/stream')
+    async def stream_handler(request):
+        return stream(streaming_fn)
+
+    @app.route('/text')
+    async def text_handler(request):
+        return text('text')
+
+    data = pipeline_test(app, [get('/stream'), get('/text', close=True)])
+    assert (data.index(b'8\r\nstreamed\r\n0\r\n\r\n') <
+            data.index(b'\r\n\r\ntext'))
+
+
+def test_pipelined_bad_request_after_pending_response():
+    app = Sanic('test_pipelined_bad_request_after_pending_response')
+    app.config.REQUEST_PIPELINE_CONCURRENCY = 1
+
+    @app.route('/slow')
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return text('slow')
+
+    # 出错响应排在前面的响应之后写出, 然后关闭连接
+    data = pipeline_test(app, [get('/slow'), b'not http\r\n\r\n'])
+    assert data.index(b'\r\n\r\nslow') < data.index(b'HTTP/1.1 400 Bad Request')
+    assert data.endswith(b'Error: Bad Request')
+
+
+def test_pipelined_garbage_after_connection_close():
+    app = Sanic('test_pipelined_garbage_after_connection_close')
+
+    @app.route('/')
+    async def handler(request):
+        return text('OK')
+
+    # Connection: close 之后的数据不再处理
+    data = pipeline_test(app, [get('/', close=True), b'not http\r\n\r\n'])
+    assert data.startswith(b'HTTP/1.1 200 OK')
+    assert data.endswith(b'\r\n\r\nOK')
+    assert b'400 Bad Request' not in data
@@ -22,3 +22,93 @@ def test_storage():
     response_json = loads(response.text)
     assert response_json['user'] == 'sanic'
     assert response_json.get('sidekick') is None
+
+
+def test_request_body_chunks_joined():
+    app = Sanic('test_request_body_chunks_joined')
+
+    @app.route('/', methods=['POST'])
+    def handler(request):
+        return json({'size': len(request.body)})
+
+    data = 'a' * 200000
+    request, response = sanic_endpoint_test(app, method='post', data=data)
+
+    assert request.body == data.encode()
+    assert loads(response.text)['size'] == len(data)
+
+
+def test_request_stream():
+    app = Sanic('test_request_stream')
+    app.config.REQUEST_BUFFER_QUEUE_SIZE = 2
+
+    @app.route('/', methods=['POST'], stream=True)
+    async def handler(request):
+        chunks = []
+        async for chunk in request.stream:
+            chunks.append(chunk)
+        body = b''.join(chunks)
+        return json({'size': len(body), 'body': request.body})
+
+    data = 'a' * 200000
+    request, response = sanic_endpoint_test(app, method='post', data=data)
+
+    response_json = loads(response.text)
+    assert response_json['size'] == len(data)
+    assert response_json['body'] is None
+
+
+def test_request_stream_read():
+    app = Sanic('test_request_stream_read')
+
+    @app.route('/', methods=['POST'], stream=True)
+    async def handler(request):
+        size = 0
+        while True:
+            chunk = await request.stream.read()
+            if chunk is None:
+                break
+            size += len(chunk)
+        return json({'size': size})
+
+    @app.route('/buffered', methods=['POST'])
+    def buffered(request):
+        return json({'size': len(request.body)})
+
+    data = 'a' * 1000
+    request, response = sanic_endpoint_test(app, method='post', data=data)
+    assert loads(response.text)['size'] == len(data)
+
+    request, response = sanic_endpoint_test(
+        app, method='post', uri='/buffered', data=data)
+    assert loads(response.text)['size'] == len(data)
+
+
+def test_request_stream_is_per_route():
+    app = Sanic('test_request_stream_is_per_route')
+
+    # One function on a stream and a buffered route
+    async def handler(request):
+        if request.stream is None:
+            return json({'stream': False, 'size': len(request.body)})
+        size = 0
+        async for chunk in request.stream:
+            size += len(chunk)
+        return json({'stream': True, 'size': size})
+
+    app.route('/stream', methods=['POST'], stream=True)(handler)
+    app.route('/buffered', methods=['POST'])(handler)
+
+    # Bound methods cannot carry attributes
+    class Uploads:
+        async def post(self, request):
+            return await handler(request)
+
+    app.add_route(Uploads().post, '/method', methods=['POST'], stream=True)
+
+    data = 'a' * 1000
+    for uri, stream in (('/stream', True), ('/buffered', False),
+                        ('/method', True)):
+        request, response = sanic_endpoint_test(
+            app, method='post', uri=uri, data=data)
+        assert loads(response.text) == {'stream': stream, 'size': len(data)}
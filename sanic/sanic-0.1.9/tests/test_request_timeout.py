@@ -2,7 +2,8 @@ from sanic import Sanic
 import asyncio
 from sanic.response import text
 from sanic.exceptions import RequestTimeout
-from sanic.utils import sanic_endpoint_test
+from sanic.server import HttpProtocol, TimerWheel
+from sanic.utils import sanic_endpoint_test, HOST, PORT
 from sanic.config import Config
 
 Config.REQUEST_TIMEOUT = 1
@@ -38,3 +39,118 @@ def test_default_server_error_request_timeout():
         request_timeout_default_app, uri='/1')
     assert response.status == 408
     assert response.text == 'Error: Request Timeout'
+
+
+keep_alive_timeout_app = Sanic('test_keep_alive_timeout')
+keep_alive_timeout_app.config.KEEP_ALIVE_TIMEOUT = 1
+
+
+@keep_alive_timeout_app.route('/')
+async def handler_3(request):
+    return text('OK')
+
+
+def test_keep_alive_timeout():
+    results = []
+
+    async def _collect_response(sanic, loop):
+        try:
+            reader, writer = await asyncio.open_connection(HOST, PORT)
+            writer.write(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            results.append(await reader.readuntil(b'\r\n\r\nOK'))
+            # 空闲超时后, 连接被关闭, 不返回 408
+            results.append(await asyncio.wait_for(reader.read(), 5))
+            writer.close()
+        finally:
+            keep_alive_timeout_app.stop()
+
+    keep_alive_timeout_app.run(host=HOST, port=PORT,
+                               after_start=_collect_response)
+    assert b'Keep-Alive: timeout=1\r\n' in results[0]
+    assert results[1] == b''
+
+
+class TimerProtocol:
+    def __init__(self):
+        self._timer_slot = None
+        self._timer_deadline = None
+        self.timed_out = False
+
+    def connection_timeout(self):
+        self.timed_out = True
+
+
+def test_timer_wheel():
+    loop = asyncio.new_event_loop()
+    wheel = TimerWheel(loop, size=4, resolution=0.01)
+    short, long, touched, removed = protocols = [
+        TimerProtocol() for n in range(4)]
+    wheel.add(short, 0.01)
+    wheel.add(long, 0.1)          # 超过一圈
+    wheel.add(touched, 0.01)
+    wheel.add(removed, 0.01)
+    wheel.remove(removed)
+    wheel.start()
+
+    loop.run_until_complete(asyncio.sleep(0.005))
+    wheel.add(touched, 0.1)       # 刷新超时
+    loop.run_until_complete(asyncio.sleep(0.05))
+    assert [p.timed_out for p in protocols] == [True, False, False, False]
+
+    loop.run_until_complete(asyncio.sleep(0.15))
+    assert [p.timed_out for p in protocols] == [True, True, True, False]
+    wheel.stop()
+    loop.close()
+
+
+class FailingTimerProtocol(TimerProtocol):
+    def connection_timeout(self):
+        super().connection_timeout()
+        raise RuntimeError('connection_timeout failed')
+
+
+def test_timer_wheel_survives_failing_timeout():
+    loop = asyncio.new_event_loop()
+    wheel = TimerWheel(loop, size=4, resolution=0.01)
+    failing, later = FailingTimerProtocol(), TimerProtocol()
+    wheel.add(failing, 0.01)
+    wheel.add(later, 0.05)
+    wheel.start()
+
+    # 出错的连接不影响时间轮继续运行
+    loop.run_until_complete(asyncio.sleep(0.15))
+    assert failing.timed_out and later.timed_out
+    wheel.stop()
+    loop.close()
+
+
+class BrokenTransport:
+    def __init__(self):
+        self.aborted = False
+
+    def write(self, data):
+        raise RuntimeError('unable to write; sendfile is in progress')
+
+    def close(self):
+        pass
+
+    def abort(self):
+        self.aborted = True
+
+
+class ErrorHandler:
+    def response(self, request, exception):
+        return text('Error: {}'.format(exception), 500)
+
+
+def test_write_error_failure_aborts_connection():
+    loop = asyncio.new_event_loop()
+    protocol = HttpProtocol(loop=loop, request_handler=None,
+                            error_handler=ErrorHandler(),
+                            timer_wheel=TimerWheel(loop))
+    protocol.transport = BrokenTransport()
+
+    # 写出出错响应失败, 不再递归重试, 直接断开连接
+    protocol.write_error(RequestTimeout('Request Timeout'))
+    assert protocol.transport.aborted
+    loop.close()
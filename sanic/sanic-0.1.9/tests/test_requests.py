@@ -1,5 +1,7 @@
 from json import loads as json_loads, dumps as json_dumps
 from sanic import Sanic
+from sanic.request import (
+    MultipartParser, parse_multipart_stream, LazyHeaders)
 from sanic.response import json, text
 from sanic.utils import sanic_endpoint_test
 from sanic.exceptions import ServerError
@@ -92,6 +94,53 @@ def test_query_string():
     assert request.args.get('test2') == 'false'
 
 
+def test_lazy_headers():
+    app = Sanic('test_lazy_headers')
+    app.config.REQUEST_LAZY_HEADERS = True
+
+    @app.route('/')
+    async def handler(request):
+        assert isinstance(request.headers, LazyHeaders)
+        return json({
+            'test': request.headers.get('x-test'),
+            'contains': 'X-TEST' in request.headers,
+            'remote_addr': request.headers['Remote-Addr'],
+            'ip': request.ip,
+        })
+
+    request, response = sanic_endpoint_test(
+        app, headers={'X-Test': 'value'})
+
+    results = json_loads(response.text)
+    assert results['test'] == 'value'
+    assert results['contains'] is True
+    assert results['ip'] == '127.0.0.1'
+    assert results['remote_addr'].startswith('127.0.0.1:')
+
+
+def test_lazy_headers_decoded_once():
+    headers = LazyHeaders([(b'Content-Type', b'text/plain'),
+                           (b'Accept', b'a'), (b'accept', b'b')])
+    assert headers._headers is None
+    assert headers.getall('ACCEPT') == ['a', 'b']
+    decoded = headers._headers
+    assert headers['content-type'] == 'text/plain'
+    assert len(headers) == 3
+    assert headers._headers is decoded
+
+
+def test_request_ip():
+    app = Sanic('test_request_ip')
+
+    @app.route('/')
+    async def handler(request):
+        return text(request.ip)
+
+    request, response = sanic_endpoint_test(app)
+    assert response.text == '127.0.0.1'
+    assert request.headers['Remote-Addr'].startswith('127.0.0.1:')
+
+
 # ------------------------------------------------------------ #
 #  POST
 # ------------------------------------------------------------ #
@@ -145,3 +194,83 @@ def test_post_form_multipart_form_data():
     request, response = sanic_endpoint_test(app, data=payload, headers=headers)
 
     assert request.form.get('test') == 'OK'
+
+
+def test_post_form_multipart_form_data_files():
+    app = Sanic('test_post_form_multipart_form_data_files')
+
+    @app.route('/')
+    async def handler(request):
+        return text('OK')
+
+    payload = '------sanic\r\n' \
+              'Content-Disposition: form-data; name="test"\r\n' \
+              '\r\n' \
+              'OK\r\n' \
+              '------sanic\r\n' \
+              'Content-Disposition: form-data; name="file"; filename="a.txt"\r\n' \
+              'Content-Type: text/plain\r\n' \
+              '\r\n' \
+              'file\r\ncontent\r\n' \
+              '------sanic--\r\n'
+
+    headers = {'content-type': 'multipart/form-data; boundary=----sanic'}
+
+    request, response = sanic_endpoint_test(app, data=payload, headers=headers)
+
+    assert request.form.get('test') == 'OK'
+    file = request.files.get('file')
+    assert file.name == 'a.txt'
+    assert file.type == 'text/plain'
+    assert file.body == b'file\r\ncontent'
+
+
+def test_multipart_parser_chunks():
+    payload = (b'------sanic\r\n'
+               b'Content-Disposition: form-data; name="test"\r\n'
+               b'\r\n'
+               b'OK\r\n'
+               b'------sanic\r\n'
+               b'Content-Disposition: form-data; name="file"; filename="a"\r\n'
+               b'\r\n' +
+               b'x' * 3000 + b'\r\n------sani\r\n'
+               b'------sanic--\r\n')
+
+    for chunk_size in (1, 7, 64, len(payload)):
+        parser = MultipartParser(b'----sanic', spool_size=1024)
+        for index in range(0, len(payload), chunk_size):
+            parser.feed(payload[index:index + chunk_size])
+        fields, files = parser.close()
+
+        assert fields.get('test') == 'OK'
+        # Spooled to a temporary file once above spool_size
+        body = files.get('file').body
+        assert body.read() == b'x' * 3000 + b'\r\n------sani'
+        body.close()
+
+
+def test_post_form_multipart_stream():
+    app = Sanic('test_post_form_multipart_stream')
+
+    results = []
+
+    @app.route('/', methods=['POST'], stream=True)
+    async def handler(request):
+        fields, files = await parse_multipart_stream(
+            request.stream, b'----sanic')
+        results.append((fields, files))
+        return text('OK')
+
+    payload = '------sanic\r\n' \
+              'Content-Disposition: form-data; name="test"\r\n' \
+              '\r\n' \
+              'OK\r\n' \
+              '------sanic--\r\n'
+
+    headers = {'content-type': 'multipart/form-data; boundary=----sanic'}
+
+    request, response = sanic_endpoint_test(
+        app, method='post', data=payload, headers=headers)
+
+    assert response.text == 'OK'
+    assert results[0][0].get('test') == 'OK'
@@ -1,7 +1,11 @@
+import asyncio
 from random import choice
+from json import loads, dumps
 
 from sanic import Sanic
-from sanic.response import HTTPResponse
+from sanic.request import Request
+from sanic.response import (
+    HTTPResponse, JSON, json, text, stream, serialize_headers)
 from sanic.utils import sanic_endpoint_test
 
 
@@ -16,3 +20,139 @@ def test_response_body_not_a_string():
 
     request, response = sanic_endpoint_test(app, uri='/hello')
     assert response.text == str(random_num)
+
+
+def test_response_output_headers():
+    response = text('OK', status=404, headers={'X-Test': 'value'})
+    output = response.output('1.1', True, 30)
+    assert output == (b'HTTP/1.1 404 Not Found\r\n'
+                      b'Content-Type: text/plain; charset=utf-8\r\n'
+                      b'Content-Length: 2\r\n'
+                      b'Connection: keep-alive\r\n'
+                      b'Keep-Alive: timeout=30\r\n'
+                      b'X-Test: value\r\n'
+                      b'\r\nOK')
+
+    output = HTTPResponse(status=599, content_type='x/y').output('1.0')
+    assert output.startswith(b'HTTP/1.0 599 \r\nContent-Type: x/y\r\n')
+    assert b'Connection: close\r\n' in output
+
+
+def test_response_header_bytes():
+    app = Sanic('response_header_bytes')
+    header_bytes = serialize_headers({'X-Served-By': 'sanic'})
+    assert header_bytes == b'X-Served-By: sanic\r\n'
+
+    @app.route('/')
+    async def handler(request):
+        return json({'test': True}, header_bytes=header_bytes)
+
+    request, response = sanic_endpoint_test(app)
+    assert response.headers['X-Served-By'] == 'sanic'
+    assert response.text == '{"test":true}'
+
+
+def test_response_large_body_writelines():
+    app = Sanic('response_large_body_writelines')
+    app.config.RESPONSE_WRITELINES_SIZE = 1024
+    data = {'items': ['x' * 100] * 1000}
+
+    @app.route('/')
+    async def handler(request):
+        return json(data)
+
+    request, response = sanic_endpoint_test(app)
+    assert response.status == 200
+    assert int(response.headers['Content-Length']) > 1024
+    assert loads(response.text) == data
+
+
+def test_response_stream():
+    app = Sanic('response_stream')
+
+    async def streaming_fn(response):
+        for n in range(100):
+            await response.write('line {}\n'.format(n))
+        await response.write(b'')    # 空数据被忽略, 不会提前结束传输
+        await response.write(b'end')
+
+    @app.route('/')
+    async def handler(request):
+        return stream(streaming_fn, headers={'X-Test': 'value'})
+
+    request, response = sanic_endpoint_test(app)
+    assert response.status == 200
+    assert response.headers['Transfer-Encoding'] == 'chunked'
+    assert 'Content-Length' not in response.headers
+    assert response.headers['X-Test'] == 'value'
+    assert response.text == ''.join(
+        'line {}\n'.format(n) for n in range(100)) + 'end'
+
+
+def test_json_bytes_dumps():
+    calls = []
+
+    def dumps_bytes(body):
+        calls.append(body)
+        return dumps(body, separators=(',', ':')).encode()
+
+    response = json({'test': True}, status=201, dumps=dumps_bytes)
+
+    assert calls == [{'test': True}]
+    assert response.body == b'{"test":true}'
+    assert response.status == 201
+    assert response.content_type == 'application/json'
+
+
+def test_app_json_serializer():
+    default_dumps, default_loads = JSON.dumps, JSON.loads
+    custom_app = Sanic('test_app_json_serializer_custom',
+                       dumps=lambda body: dumps(body, indent=1).encode(),
+                       loads=lambda body: {'loaded': loads(body)})
+    default_app = Sanic('test_app_json_serializer_default')
+
+    for app in (custom_app, default_app):
+        @app.route('/', methods=['POST'])
+        async def handler(request):
+            return json(request.json)
+
+    request, response = sanic_endpoint_test(
+        custom_app, method='post', data='{"test": true}')
+    assert request.json == {'loaded': {'test': True}}
+    assert response.text == dumps({'loaded': {'test': True}}, indent=1)
+
+    # 另一个应用仍使用默认实现, 进程级默认值未被修改
+    request, response = sanic_endpoint_test(
+        default_app, method='post', data='{"test": true}')
+    assert request.json == {'test': True}
+    assert response.text == '{"test":true}'
+    assert (JSON.dumps, JSON.loads) == (default_dumps, default_loads)
+
+
+def test_app_json_serializer_interleaved():
+    custom_app = Sanic('test_app_json_serializer_interleaved_custom',
+                       dumps=lambda body: dumps(body, indent=1).encode())
+    default_app = Sanic('test_app_json_serializer_interleaved_default')
+    responses = {}
+
+    for app in (custom_app, default_app):
+        @app.route('/')
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            return json({'test': True})
+
+    async def handle(app):
+        request = Request(b'/', {}, '1.1', 'GET')
+        await app.handle_request(
+            request, lambda response: responses.setdefault(app, response))
+
+    async def handle_both():
+        await asyncio.gather(handle(custom_app), handle(default_app))
+
+    # 两个应用的请求在同一事件循环中交替执行
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(handle_both())
+    loop.close()
+
+    assert responses[custom_app].body == dumps({'test': True}, indent=1).encode()
+    assert responses[default_app].body == b'{"test":true}'
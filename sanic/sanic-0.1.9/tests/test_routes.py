@@ -144,6 +144,77 @@ def test_dynamic_route_unhashable():
     assert response.status == 404
 
 
+def test_dynamic_route_multiple_parameters():
+    app = Sanic('test_dynamic_route_multiple_parameters')
+
+    results = []
+
+    @app.route('/user/<user_id:int>/post/<slug>')
+    async def handler(request, user_id, slug):
+        results.append((user_id, slug))
+        return text('OK')
+
+    request, response = sanic_endpoint_test(app, uri='/user/42/post/hello')
+    assert response.status == 200
+    assert results[0] == (42, 'hello')
+
+    request, response = sanic_endpoint_test(app, uri='/user/42/post/')
+    assert response.status == 404
+
+
+def test_dynamic_route_static_segment_first():
+    app = Sanic('test_dynamic_route_static_segment_first')
+
+    @app.route('/folder/<name>')
+    async def handler1(request, name):
+        return text('OK1')
+
+    @app.route('/folder/latest')
+    async def handler2(request):
+        return text('OK2')
+
+    @app.route('/folder/<name>/files/latest')
+    async def handler3(request, name):
+        return text('OK3')
+
+    request, response = sanic_endpoint_test(app, uri='/folder/latest')
+    assert response.text == 'OK2'
+
+    request, response = sanic_endpoint_test(app, uri='/folder/test')
+    assert response.text == 'OK1'
+
+    request, response = sanic_endpoint_test(
+        app, uri='/folder/latest/files/latest')
+    assert response.text == 'OK3'
+
+
+def test_dynamic_route_backtracking():
+    app = Sanic('test_dynamic_route_backtracking')
+
+    results = []
+
+    @app.route('/folder/<folder_id:int>/info')
+    async def handler1(request, folder_id):
+        results.append(folder_id)
+        return text('OK1')
+
+    @app.route('/folder/<name>/stats')
+    async def handler2(request, name):
+        results.append(name)
+        return text('OK2')
+
+    request, response = sanic_endpoint_test(app, uri='/folder/123/info')
+    assert response.text == 'OK1'
+    assert results[0] == 123
+
+    request, response = sanic_endpoint_test(app, uri='/folder/123/stats')
+    assert response.text == 'OK2'
+    assert results[1] == '123'
+
+    request, response = sanic_endpoint_test(app, uri='/folder/123/nope')
+    assert response.status == 404
+
+
 def test_route_duplicate():
     app = Sanic('test_route_duplicate')
 
@@ -356,3 +427,113 @@ def test_add_route_method_not_allowed():
 
     request, response = sanic_endpoint_test(app, method='post', uri='/test')
     assert response.status == 405
+
+
+# ------------------------------------------------------------ #
+#  Route cache
+# ------------------------------------------------------------ #
+
+def test_route_cache_hits():
+    app = Sanic('test_route_cache_hits')
+
+    @app.route('/folder/<name>')
+    async def handler(request, name):
+        return text(name)
+
+    @app.route('/static')
+    async def handler2(request):
+        return text('OK')
+
+    sanic_endpoint_test(app, uri='/folder/test')
+    request, response = sanic_endpoint_test(app, uri='/folder/test')
+    assert response.text == 'test'
+
+    sanic_endpoint_test(app, uri='/static')
+    sanic_endpoint_test(app, uri='/nope')
+
+    info = app.router.cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.currsize == 1
+
+
+def test_route_cache_per_route_size():
+    app = Sanic('test_route_cache_per_route_size')
+
+    @app.route('/user/<user_id:int>', cache_size=2)
+    async def handler1(request, user_id):
+        return text('OK')
+
+    @app.route('/folder/<name>')
+    async def handler2(request, name):
+        return text('OK')
+
+    sanic_endpoint_test(app, uri='/folder/test')
+    for user_id in range(5):
+        request, response = sanic_endpoint_test(
+            app, uri='/user/{}'.format(user_id))
+        assert response.status == 200
+
+    info = app.router.cache_info()
+    assert info.evictions == 3
+    assert info.currsize == 3
+
+    # The high cardinality route must not evict other routes
+    sanic_endpoint_test(app, uri='/folder/test')
+    assert app.router.cache_info().hits == 1
+
+
+def test_route_cache_disabled():
+    app = Sanic('test_route_cache_disabled')
+
+    @app.route('/user/<user_id:int>', cache_size=0)
+    async def handler(request, user_id):
+        return text('OK')
+
+    sanic_endpoint_test(app, uri='/user/1')
+    request, response = sanic_endpoint_test(app, uri='/user/1')
+    assert response.status == 200
+
+    info = app.router.cache_info()
+    assert info.hits == 0
+    assert info.currsize == 0
+
+
+def test_route_cache_method_not_allowed():
+    app = Sanic('test_route_cache_method_not_allowed')
+
+    @app.route('/user/<user_id:int>', methods=['GET'])
+    async def handler(request, user_id):
+        return text('OK')
+
+    request, response = sanic_endpoint_test(app, uri='/user/1')
+    assert response.status == 200
+
+    request, response = sanic_endpoint_test(app, method='post', uri='/user/1')
+    assert response.status == 405
+    assert app.router.cache_info().hits == 1
+
+
+def test_route_cache_counts_each_request_once():
+    app = Sanic('test_route_cache_counts_each_request_once')
+    app.config.CONCURRENCY_LIMIT = 10
+
+    # A stream route and a concurrency limit make the server look up
+    # the route before the handler runs
+    @app.route('/upload', methods=['POST'], stream=True)
+    async def upload(request):
+        return text('OK')
+
+    @app.route('/folder/<name>', concurrency_limit=1)
+    async def handler(request, name):
+        return text(name)
+
+    sanic_endpoint_test(app, uri='/folder/test')
+    request, response = sanic_endpoint_test(app, uri='/folder/test')
+    assert response.text == 'test'
+    request, response = sanic_endpoint_test(app, uri='/nope')
+    assert response.status == 404
+
+    info = app.router.cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
@@ -1,10 +1,13 @@
+import asyncio
+import gzip
 import inspect
 import os
 
 import pytest
 
 from sanic import Sanic
-from sanic.utils import sanic_endpoint_test
+from sanic.response import StreamingFileResponse
+from sanic.utils import HOST, PORT, sanic_endpoint_test
 
 
 @pytest.fixture(scope='module')
@@ -60,3 +63,291 @@ def test_static_url_decode_file(static_file_directory):
     request, response = sanic_endpoint_test(app, uri='/dir/decode me.txt')
     assert response.status == 200
     assert response.body == decode_me_contents
+
+
+def test_static_file_range(static_file_path, static_file_content):
+    app = Sanic('test_static')
+    app.static('/testing.file', static_file_path)
+
+    headers = {'Range': 'bytes=2-5'}
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', headers=headers)
+    assert response.status == 206
+    assert response.body == static_file_content[2:6]
+    assert response.headers['Content-Range'] == 'bytes 2-5/{}'.format(
+        len(static_file_content))
+
+    headers = {'Range': 'bytes=-3'}
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', headers=headers)
+    assert response.status == 206
+    assert response.body == static_file_content[-3:]
+
+    headers = {'Range': 'bytes=3-'}
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', headers=headers)
+    assert response.status == 206
+    assert response.body == static_file_content[3:]
+
+
+def test_static_file_range_not_satisfiable(
+        static_file_path, static_file_content):
+    app = Sanic('test_static')
+    app.static('/testing.file', static_file_path)
+
+    headers = {'Range': 'bytes={}-'.format(len(static_file_content))}
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', headers=headers)
+    assert response.status == 416
+    assert response.headers['Content-Range'] == 'bytes */{}'.format(
+        len(static_file_content))
+
+    # Multiple ranges are not supported, the whole file is returned
+    headers = {'Range': 'bytes=0-1,3-4'}
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', headers=headers)
+    assert response.status == 200
+    assert response.body == static_file_content
+
+
+def test_static_file_sendfile(static_file_path, static_file_content):
+    app = Sanic('test_static')
+    app.static('/testing.file', static_file_path)
+
+    # The default asyncio loop supports loop.sendfile()
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', loop=asyncio.new_event_loop())
+    assert response.status == 200
+    assert response.body == static_file_content
+
+
+def test_static_large_file(tmpdir):
+    content = b'0123456789abcdef' * 1024 * 192
+    large_file = tmpdir.join('large.file')
+    large_file.write_binary(content)
+
+    app = Sanic('test_static')
+    app.static('/large.file', str(large_file))
+
+    request, response = sanic_endpoint_test(app, uri='/large.file')
+    assert response.status == 200
+    assert response.body == content
+
+
+#
+# 下载大文件:
+#   - delay: 每读取 read_size 字节后等待的秒数
+#   - stall: 读完 HTTP 头后, 停止读取的秒数
+#   - 返回: 收到的响应体字节数
+#
+def download(app, uri, loop, read_size=131072, delay=0, stall=0):
+    results = []
+
+    async def _download():
+        reader, writer = await asyncio.open_connection(HOST, PORT)
+        writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\n\r\n'.format(
+            uri).encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        size = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+        await asyncio.sleep(stall)
+        received = 0
+        try:
+            while received < size:
+                chunk = await reader.read(read_size)
+                if not chunk:
+                    break
+                received += len(chunk)
+                await asyncio.sleep(delay)
+        except ConnectionError:
+            pass
+        writer.close()
+        return received
+
+    async def _collect(sanic, loop):
+        try:
+            results.append(await asyncio.wait_for(_download(), 15))
+        finally:
+            app.stop()
+
+    app.run(host=HOST, port=PORT, after_start=_collect, loop=loop)
+    return results[0]
+
+
+@pytest.fixture(params=['uvloop', 'asyncio'])
+def event_loop_factory(request):
+    # asyncio: loop.sendfile() 零拷贝; uvloop: 按块写出
+    if request.param == 'asyncio':
+        return asyncio.new_event_loop
+    return lambda: None
+
+
+def test_static_slow_download_not_timed_out(tmpdir, event_loop_factory):
+    content = os.urandom(16 * 1024 * 1024)
+    large_file = tmpdir.join('large.file')
+    large_file.write_binary(content)
+
+    app = Sanic('test_static_slow_download_not_timed_out')
+    app.config.REQUEST_TIMEOUT = 1
+    app.static('/large.file', str(large_file))
+
+    # The download takes longer than REQUEST_TIMEOUT, but keeps progressing
+    received = download(app, '/large.file', event_loop_factory(),
+                        delay=0.025)
+    assert received == len(content)
+
+
+def test_static_stalled_download_aborted(tmpdir, event_loop_factory):
+    content = os.urandom(32 * 1024 * 1024)
+    large_file = tmpdir.join('large.file')
+    large_file.write_binary(content)
+
+    app = Sanic('test_static_stalled_download_aborted')
+    app.config.REQUEST_TIMEOUT = 1
+    app.static('/large.file', str(large_file))
+
+    # No progress for longer than REQUEST_TIMEOUT: the connection is
+    # aborted, no 408 is written into the body
+    received = download(app, '/large.file', event_loop_factory(), stall=4)
+    assert 0 < received < len(content)
+
+
+def test_static_truncated_file_aborted(tmpdir, event_loop_factory):
+    content = os.urandom(4 * 1024 * 1024)
+    large_file = tmpdir.join('large.file')
+    large_file.write_binary(content)
+    results = []
+
+    app = Sanic('test_static_truncated_file_aborted')
+
+    # 文件在 stat 之后, 写出之前被截短
+    @app.route('/large.file')
+    async def handler(request):
+        size = os.stat(str(large_file)).st_size
+        os.truncate(str(large_file), size // 2)
+        return StreamingFileResponse(str(large_file), count=size)
+
+    async def _collect_response(sanic, loop):
+        try:
+            reader, writer = await asyncio.open_connection(HOST, PORT)
+            request = b'GET /large.file HTTP/1.1\r\nHost: localhost\r\n\r\n'
+            writer.write(request * 2)
+            results.append(await asyncio.wait_for(reader.read(), 3))
+            writer.close()
+        finally:
+            app.stop()
+
+    app.run(host=HOST, port=PORT, after_start=_collect_response,
+            loop=event_loop_factory())
+
+    # 连接被断开: 不足 Content-Length, 也没有第二个响应
+    head, body = results[0].split(b'\r\n\r\n', 1)
+    assert b'Content-Length: %d\r\n' % len(content) in head
+    assert len(body) < len(content)
+    assert b'HTTP/1.1 200 OK' not in body
+
+
+def test_static_file_etag(static_file_path, static_file_content):
+    app = Sanic('test_static')
+    app.static('/testing.file', static_file_path)
+
+    request, response = sanic_endpoint_test(app, uri='/testing.file')
+    assert response.status == 200
+    etag = response.headers['ETag']
+    last_modified = response.headers['Last-Modified']
+
+    headers = {'If-None-Match': etag}
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', headers=headers)
+    assert response.status == 304
+    assert response.headers['ETag'] == etag
+
+    headers = {'If-Modified-Since': last_modified}
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', headers=headers)
+    assert response.status == 304
+
+    headers = {'If-None-Match': '"nope"', 'If-Modified-Since': last_modified}
+    request, response = sanic_endpoint_test(
+        app, uri='/testing.file', headers=headers)
+    assert response.status == 200
+    assert response.body == static_file_content
+
+
+def test_static_content_cache(tmpdir):
+    static_file = tmpdir.join('cached.file')
+    static_file.write_binary(b'first version')
+
+    app = Sanic('test_static')
+    app.config.STATIC_CONTENT_CACHE_SIZE = 1024
+    app.config.STATIC_CACHE_CHECK_INTERVAL = 0
+    app.static('/cached.file', str(static_file))
+
+    request, response = sanic_endpoint_test(app, uri='/cached.file')
+    assert response.body == b'first version'
+
+    headers = {'Range': 'bytes=6-'}
+    request, response = sanic_endpoint_test(
+        app, uri='/cached.file', headers=headers)
+    assert response.status == 206
+    assert response.body == b'version'
+
+    # A changed size or mtime invalidates the cached content
+    static_file.write_binary(b'second version!')
+    request, response = sanic_endpoint_test(app, uri='/cached.file')
+    assert response.body == b'second version!'
+
+
+def test_static_file_not_found(static_file_directory):
+    app = Sanic('test_static')
+    app.static('/dir', static_file_directory)
+
+    request, response = sanic_endpoint_test(app, uri='/dir/nope.file')
+    assert response.status == 404
+
+
+def test_static_precompressed(tmpdir):
+    static_directory = tmpdir.mkdir('static')
+    static_directory.join('app.js').write('var fast = true;\n' * 100)
+    static_directory.join('app.js.gz').write_binary(
+        gzip.compress(b'var fast = true;\n' * 100))
+
+    app = Sanic('test_static')
+    app.static('/dir', str(static_directory), precompressed=True)
+
+    request, response = sanic_endpoint_test(
+        app, uri='/dir/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.status == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['ETag'].startswith('W/"')
+    assert response.text == 'var fast = true;\n' * 100
+
+    # 没有对应的预压缩文件, 返回原文件
+    request, response = sanic_endpoint_test(
+        app, uri='/dir/app.js', headers={'Accept-Encoding': 'br'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.text == 'var fast = true;\n' * 100
+
+
+def test_static_compressed_cache(tmpdir):
+    static_file = tmpdir.join('index.html')
+    static_file.write('<p>Gotta go fast!</p>\n' * 100)
+
+    app = Sanic('test_static')
+    app.config.COMPRESS_RESPONSES = True
+    app.config.STATIC_CONTENT_CACHE_SIZE = 65536
+    app.static('/index.html', str(static_file))
+
+    request, response = sanic_endpoint_test(
+        app, uri='/index.html', headers={'Accept-Encoding': 'gzip'})
+    assert response.status == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.text == '<p>Gotta go fast!</p>\n' * 100
+
+    # Range 请求不压缩
+    request, response = sanic_endpoint_test(
+        app, uri='/index.html',
+        headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-2'})
+    assert response.status == 206
+    assert 'Content-Encoding' not in response.headers
+    assert response.text == '<p>'
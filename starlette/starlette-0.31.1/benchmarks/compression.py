@@ -0,0 +1,96 @@
+"""
+Throughput, CPU time and compression ratio of each encoding supported by
+CompressionMiddleware, across compression levels.
+
+Bodies are compressed in one shot, as for a regular response, and in 16 KiB
+chunks with a flush after each, as for a streaming response.
+
+Run with: python benchmarks/compression.py
+"""
+import json
+import os
+import sys
+import time
+import typing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from starlette.middleware.compression import (  # noqa: E402
+    BrotliEncoder,
+    Encoder,
+    GZipEncoder,
+    ZstdEncoder,
+    available_encodings,
+)
+
+EncoderClass = typing.Callable[[int], Encoder]
+
+LEVELS: typing.Dict[str, typing.Tuple[EncoderClass, typing.List[int]]] = {
+    "gzip": (GZipEncoder, [1, 6, 9]),
+    "br": (BrotliEncoder, [1, 4, 6, 9]),
+    "zstd": (ZstdEncoder, [1, 3, 9]),
+}
+
+CHUNK_SIZE = 16 * 1024
+
+
+def json_body(size: int) -> bytes:
+    items = [
+        {
+            "id": index,
+            "name": f"user-{index}",
+            "email": f"user{index}@example.org",
+            "active": index % 3 == 0,
+            "score": index * 7 % 1000 / 10,
+        }
+        for index in range(size // 80)
+    ]
+    return json.dumps(items).encode()[:size]
+
+
+def run(
+    encoder_class: EncoderClass, level: int, body: bytes, chunked: bool
+) -> typing.Tuple[float, float, int]:
+    """
+    Returns (wall seconds, CPU seconds, compressed size) for the best of three runs.
+    """
+    best = None
+    for _ in range(3):
+        encoder = encoder_class(level)
+        wall, cpu = time.perf_counter(), time.process_time()
+        if chunked:
+            size = 0
+            for start in range(0, len(body), CHUNK_SIZE):
+                size += len(encoder.compress(body[start : start + CHUNK_SIZE], False))
+            size += len(encoder.compress(b"", True))
+        else:
+            size = len(encoder.compress(body, True))
+        result = (time.perf_counter() - wall, time.process_time() - cpu, size)
+        if best is None or result < best:
+            best = result
+    assert best is not None
+    return best
+
+
+def main() -> None:
+    body = json_body(1024 * 1024)
+    print(f"JSON body, {len(body) // 1024} KiB")
+    print(
+        f"{'encoding':<10}{'level':>6}{'mode':>10}"
+        f"{'MB/s':>9}{'cpu ms':>9}{'ratio':>8}"
+    )
+    for encoding in available_encodings():
+        encoder_class, levels = LEVELS[encoding]
+        for level in levels:
+            for chunked in (False, True):
+                wall, cpu, size = run(encoder_class, level, body, chunked)
+                mode = "stream" if chunked else "single"
+                print(
+                    f"{encoding:<10}{level:>6}{mode:>10}"
+                    f"{len(body) / wall / 1e6:>9.1f}{cpu * 1000:>9.1f}"
+                    f"{size / len(body):>8.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ _KeyType = typing.TypeVar("_KeyType")
 # you can only read them
 # that is, you can't do `Mapping[str, Animal]()["fido"] = Dog()`
 _CovariantValueType = typing.TypeVar("_CovariantValueType", covariant=True)
+_DefaultType = typing.TypeVar("_DefaultType")
 
 
 class URL:
@@ -505,11 +506,45 @@ class FormData(ImmutableMultiDict[str, typing.Union[UploadFile, str]]):
                 await value.close()
 
 
+# Scope key under which `Headers(scope=...)` shares its index. The value is
+# (copy of the indexed headers, index, unique), see `Headers._build_index()`.
+_HEADERS_INDEX_SCOPE_KEY = "starlette.headers_index"
+
+# Header names as looked up, to their lowercased, encoded form.
+# Cleared when full, as arbitrary names may be looked up.
+_HEADER_KEYS: typing.Dict[str, bytes] = {}
+_HEADER_KEYS_SIZE = 512
+
+
+def _header_key(key: str) -> bytes:
+    try:
+        return _HEADER_KEYS[key]
+    except KeyError:
+        header_key = key.lower().encode("latin-1")
+        if len(_HEADER_KEYS) >= _HEADER_KEYS_SIZE:
+            _HEADER_KEYS.clear()
+        _HEADER_KEYS[key] = header_key
+        return header_key
+
+
 class Headers(typing.Mapping[str, str]):
     """
     An immutable, case-insensitive multidict.
+
+    Lookups go through an index of header name to its first position in the
+    raw list, built on first use. Headers created from the same scope share
+    the index, as long as `scope["headers"]` hasn't changed in between.
     """
 
+    # Whether `Headers(scope=...)` may use the index stored in the scope.
+    # Mutable headers keep their index to themselves.
+    _share_index = True
+
+    _index: typing.Optional[typing.Dict[bytes, int]] = None
+    _index_length = -1
+    _index_unique = True  # No header name appears more than once.
+    _scope: typing.Optional[typing.MutableMapping[str, typing.Any]] = None
+
     def __init__(
         self,
         headers: typing.Optional[typing.Mapping[str, str]] = None,
@@ -531,6 +566,36 @@ class Headers(typing.Mapping[str, str]):
             # scope["headers"] isn't necessarily a list
             # it might be a tuple or other iterable
             self._list = scope["headers"] = list(scope["headers"])
+            if self._share_index:
+                self._scope = scope
+                shared = scope.get(_HEADERS_INDEX_SCOPE_KEY)
+                if shared is not None and shared[0] == self._list:
+                    self._index, self._index_unique = shared[1], shared[2]
+                    self._index_length = len(self._list)
+
+    def _get_index(self) -> typing.Dict[bytes, int]:
+        index = self._index
+        if index is None or self._index_length != len(self._list):
+            # Not built yet, or headers were added to or removed from the
+            # raw list directly.
+            index = self._build_index()
+        return index
+
+    def _build_index(self) -> typing.Dict[bytes, int]:
+        raw = self._list
+        index: typing.Dict[bytes, int] = {}
+        for idx in range(len(raw) - 1, -1, -1):
+            index[raw[idx][0]] = idx
+        self._index = index
+        self._index_length = len(raw)
+        self._index_unique = len(index) == len(raw)
+        if self._scope is not None:
+            self._scope[_HEADERS_INDEX_SCOPE_KEY] = (
+                list(raw),
+                index,
+                self._index_unique,
+            )
+        return index
 
     @property
     def raw(self) -> typing.List[typing.Tuple[bytes, bytes]]:
@@ -549,29 +614,45 @@ class Headers(typing.Mapping[str, str]):
         ]
 
     def getlist(self, key: str) -> typing.List[str]:
-        get_header_key = key.lower().encode("latin-1")
+        get_header_key = _header_key(key)
+        idx = self._get_index().get(get_header_key)
+        if idx is None:
+            return []
+        if self._index_unique:
+            return [self._list[idx][1].decode("latin-1")]
         return [
             item_value.decode("latin-1")
-            for item_key, item_value in self._list
+            for item_key, item_value in self._list[idx:]
             if item_key == get_header_key
         ]
 
+    @typing.overload
+    def get(self, key: str) -> typing.Optional[str]:
+        ...
+
+    @typing.overload
+    def get(
+        self, key: str, default: typing.Union[str, _DefaultType]
+    ) -> typing.Union[str, _DefaultType]:
+        ...
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        idx = self._get_index().get(_header_key(key))
+        if idx is None:
+            return default
+        return self._list[idx][1].decode("latin-1")
+
     def mutablecopy(self) -> "MutableHeaders":
         return MutableHeaders(raw=self._list[:])
 
     def __getitem__(self, key: str) -> str:
-        get_header_key = key.lower().encode("latin-1")
-        for header_key, header_value in self._list:
-            if header_key == get_header_key:
-                return header_value.decode("latin-1")
-        raise KeyError(key)
+        idx = self._get_index().get(_header_key(key))
+        if idx is None:
+            raise KeyError(key)
+        return self._list[idx][1].decode("latin-1")
 
     def __contains__(self, key: typing.Any) -> bool:
-        get_header_key = key.lower().encode("latin-1")
-        for header_key, header_value in self._list:
-            if header_key == get_header_key:
-                return True
-        return False
+        return _header_key(key) in self._get_index()
 
     def __iter__(self) -> typing.Iterator[typing.Any]:
         return iter(self.keys())
@@ -593,41 +674,60 @@ class Headers(typing.Mapping[str, str]):
 
 
 class MutableHeaders(Headers):
+    _share_index = False
+
+    def _append(self, key: bytes, value: bytes) -> None:
+        index = self._get_index()
+        if key in index:
+            self._index_unique = False
+        else:
+            index[key] = len(self._list)
+        self._list.append((key, value))
+        self._index_length += 1
+
+    def _find(self, key: bytes) -> typing.List[int]:
+        idx = self._get_index().get(key)
+        if idx is None:
+            return []
+        if self._index_unique:
+            return [idx]
+        return [
+            idx
+            for idx, (item_key, item_value) in enumerate(self._list)
+            if item_key == key
+        ]
+
     def __setitem__(self, key: str, value: str) -> None:
         """
         Set the header `key` to `value`, removing any duplicate entries.
         Retains insertion order.
         """
-        set_key = key.lower().encode("latin-1")
+        set_key = _header_key(key)
         set_value = value.encode("latin-1")
 
-        found_indexes: "typing.List[int]" = []
-        for idx, (item_key, item_value) in enumerate(self._list):
-            if item_key == set_key:
-                found_indexes.append(idx)
+        found_indexes = self._find(set_key)
 
         for idx in reversed(found_indexes[1:]):
             del self._list[idx]
+            self._index = None  # Later headers have moved.
 
         if found_indexes:
             idx = found_indexes[0]
             self._list[idx] = (set_key, set_value)
         else:
-            self._list.append((set_key, set_value))
+            self._append(set_key, set_value)
 
     def __delitem__(self, key: str) -> None:
         """
         Remove the header `key`.
         """
-        del_key = key.lower().encode("latin-1")
+        del_key = _header_key(key)
 
-        pop_indexes: "typing.List[int]" = []
-        for idx, (item_key, item_value) in enumerate(self._list):
-            if item_key == del_key:
-                pop_indexes.append(idx)
+        pop_indexes = self._find(del_key)
 
         for idx in reversed(pop_indexes):
             del self._list[idx]
+            self._index = None  # Later headers have moved.
 
     def __ior__(self, other: typing.Mapping[str, str]) -> "MutableHeaders":
         if not isinstance(other, typing.Mapping):
@@ -651,13 +751,13 @@ class MutableHeaders(Headers):
         If the header `key` does not exist, then set it to `value`.
         Returns the header value.
         """
-        set_key = key.lower().encode("latin-1")
+        set_key = _header_key(key)
         set_value = value.encode("latin-1")
 
-        for idx, (item_key, item_value) in enumerate(self._list):
-            if item_key == set_key:
-                return item_value.decode("latin-1")
-        self._list.append((set_key, set_value))
+        idx = self._get_index().get(set_key)
+        if idx is not None:
+            return self._list[idx][1].decode("latin-1")
+        self._append(set_key, set_value)
         return value
 
     def update(self, other: typing.Mapping[str, str]) -> None:
@@ -668,9 +768,9 @@ class MutableHeaders(Headers):
         """
         Append a header, preserving any duplicate entries.
         """
-        append_key = key.lower().encode("latin-1")
+        append_key = _header_key(key)
         append_value = value.encode("latin-1")
-        self._list.append((append_key, append_value))
+        self._append(append_key, append_value)
 
     def add_vary_header(self, vary: str) -> None:
         existing = self.get("vary")
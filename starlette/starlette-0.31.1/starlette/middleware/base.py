@@ -6,7 +6,12 @@ from anyio.abc import ObjectReceiveStream, ObjectSendStream
 from starlette._utils import collapse_excgroups
 from starlette.background import BackgroundTask
 from starlette.requests import ClientDisconnect, Request
-from starlette.responses import ContentStream, Response, StreamingResponse
+from starlette.responses import (
+    ContentStream,
+    FileResponse,
+    Response,
+    StreamingResponse,
+)
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 RequestResponseEndpoint = typing.Callable[[Request], typing.Awaitable[Response]]
@@ -138,7 +143,13 @@ class BaseHTTPMiddleware:
 
             async def send_no_error(message: Message) -> None:
                 try:
-                    await send_stream.send(message)
+                    if message["type"] == "http.response.zerocopysend":
+                        # The app may close the file as soon as this returns,
+                        # so it's read into body messages here instead.
+                        async for body_message in _read_zerocopysend(message):
+                            await send_stream.send(body_message)
+                    else:
+                        await send_stream.send(message)
                 except anyio.BrokenResourceError:
                     # recv_stream has been closed, i.e. response_sent has been set.
                     return
@@ -167,9 +178,15 @@ class BaseHTTPMiddleware:
 
             assert message["type"] == "http.response.start"
 
+            # Assigned below, and read by `body_stream` once streaming starts.
+            response: _StreamingResponse
+
             async def body_stream() -> typing.AsyncGenerator[bytes, None]:
                 async with recv_stream:
                     async for message in recv_stream:
+                        if message["type"] == "http.response.pathsend":
+                            response.pathsend_message = message
+                            break
                         assert message["type"] == "http.response.body"
                         body = message.get("body", b"")
                         if body:
@@ -198,7 +215,42 @@ class BaseHTTPMiddleware:
         raise NotImplementedError()  # pragma: no cover
 
 
+async def _read_zerocopysend(message: Message) -> typing.AsyncIterator[Message]:
+    """
+    Read the file of an "http.response.zerocopysend" message, and return its
+    contents as "http.response.body" messages.
+    """
+    file = message["file"]
+    offset = message.get("offset")
+    count = message.get("count")
+    chunk_size = FileResponse.chunk_size
+
+    def read(size: int) -> bytes:
+        # The seek runs in the same worker thread call as the first read.
+        nonlocal offset
+        if offset is not None:
+            file.seek(offset)
+            offset = None
+        return typing.cast(bytes, file.read(size))
+
+    while True:
+        size = chunk_size if count is None else min(chunk_size, count)
+        chunk = await anyio.to_thread.run_sync(read, size) if size else b""
+        if count is not None:
+            count -= len(chunk)
+        done = len(chunk) < size or count == 0
+        yield {
+            "type": "http.response.body",
+            "body": chunk,
+            "more_body": message.get("more_send", False) or not done,
+        }
+        if done:
+            return
+
+
 class _StreamingResponse(StreamingResponse):
+    pathsend_message: typing.Optional[Message]
+
     def __init__(
         self,
         content: ContentStream,
@@ -209,9 +261,26 @@ class _StreamingResponse(StreamingResponse):
         info: typing.Optional[typing.Mapping[str, typing.Any]] = None,
     ) -> None:
         self._info = info
+        self.pathsend_message = None
         super().__init__(content, status_code, headers, media_type, background)
 
     async def stream_response(self, send: Send) -> None:
         if self._info:
             await send({"type": "http.response.debug", "info": self._info})
-        return await super().stream_response(send)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        async for chunk in self.body_iterator:
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode(self.charset)  # pragma: no cover
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        if self.pathsend_message is not None:
+            # The wrapped app sent its body with "http.response.pathsend",
+            # which is passed on to the server unchanged.
+            await send(self.pathsend_message)
+        else:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
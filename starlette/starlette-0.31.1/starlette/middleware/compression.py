@@ -0,0 +1,290 @@
+import functools
+import typing
+import zlib
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ModuleNotFoundError:  # pragma: nocover
+    try:
+        import brotlicffi as brotli
+    except ModuleNotFoundError:
+        brotli = None
+
+try:
+    import zstandard
+except ModuleNotFoundError:  # pragma: nocover
+    zstandard = None  # type: ignore[assignment]
+
+
+# Media types which are already compressed, and gain nothing from compressing
+# them again. Matched as prefixes of the response "Content-Type".
+DEFAULT_EXCLUDED_CONTENT_TYPES = (
+    "image/png",
+    "image/jpeg",
+    "image/gif",
+    "image/webp",
+    "image/avif",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/zstd",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+)
+
+
+class Encoder(typing.Protocol):
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        ...  # pragma: no cover
+
+
+class GZipEncoder:
+    """
+    A gzip stream, written with a raw zlib compressor.
+
+    Every call flushes with `Z_SYNC_FLUSH`, so that each streamed chunk can
+    be decompressed as soon as it's received, rather than held back in the
+    compressor's buffers.
+    """
+
+    def __init__(self, level: int = 6) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        mode = zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int = 4) -> None:
+        assert brotli is not None, "brotli or brotlicffi must be installed"
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        compressor = self._compressor
+        body = compressor.process(data)
+        body += compressor.finish() if finish else compressor.flush()
+        return typing.cast(bytes, body)
+
+
+class ZstdEncoder:
+    def __init__(self, level: int = 3) -> None:
+        assert zstandard is not None, "zstandard must be installed"
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        if finish:
+            mode = zstandard.COMPRESSOBJ_FLUSH_FINISH
+        else:
+            mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+def available_encodings() -> typing.Tuple[str, ...]:
+    """
+    The encodings supported with the installed packages, in order of
+    preference.
+    """
+    encodings: typing.Tuple[str, ...] = ()
+    if zstandard is not None:
+        encodings += ("zstd",)
+    if brotli is not None:
+        encodings += ("br",)
+    return encodings + ("gzip",)
+
+
+def parse_accept_encoding(accept_encoding: str) -> typing.Dict[str, float]:
+    """
+    Given an "Accept-Encoding" header, like: "gzip, br;q=0.9, *;q=0",
+    return the quality of each coding: {"gzip": 1.0, "br": 0.9, "*": 0.0}.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the best encoding the client accepts.
+
+    * **encodings** - The encodings to offer, in order of preference. Defaults
+    to zstd and brotli when installed, followed by gzip.
+    * **minimum_size** - Responses smaller than this are sent uncompressed.
+    * **threadpool_size** - Single-shot bodies at least this large are
+    compressed in a worker thread, rather than on the event loop.
+    * **excluded_content_types** - Media types which are sent uncompressed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        encodings: typing.Optional[typing.Sequence[str]] = None,
+        threadpool_size: int = 256 * 1024,
+        excluded_content_types: typing.Sequence[str] = DEFAULT_EXCLUDED_CONTENT_TYPES,
+    ) -> None:
+        supported = available_encodings()
+        if encodings is None:
+            encodings = supported
+        for encoding in encodings:
+            assert encoding in supported, f"Unsupported encoding '{encoding}'"
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.encodings = tuple(encodings)
+        self.threadpool_size = threadpool_size
+        self.excluded_content_types = tuple(excluded_content_types)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            encoding = self.select_encoding(headers.get("Accept-Encoding", ""))
+            if encoding is not None:
+                responder = CompressionResponder(
+                    self.app,
+                    self.minimum_size,
+                    encoding,
+                    self.encoder_factory(encoding),
+                    threadpool_size=self.threadpool_size,
+                    excluded_content_types=self.excluded_content_types,
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    def select_encoding(self, accept_encoding: str) -> typing.Optional[str]:
+        if not accept_encoding:
+            return None
+        qualities = parse_accept_encoding(accept_encoding)
+        default = qualities.get("*", 0.0)
+        best, best_quality = None, 0.0
+        for encoding in self.encodings:
+            quality = qualities.get(encoding, default)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def encoder_factory(self, encoding: str) -> typing.Callable[[], Encoder]:
+        if encoding == "br":
+            return functools.partial(BrotliEncoder, self.brotli_quality)
+        elif encoding == "zstd":
+            return functools.partial(ZstdEncoder, self.zstd_level)
+        return functools.partial(GZipEncoder, self.compresslevel)
+
+
+class CompressionResponder:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int,
+        encoding: str,
+        encoder_factory: typing.Callable[[], Encoder],
+        threadpool_size: int = 256 * 1024,
+        excluded_content_types: typing.Sequence[str] = DEFAULT_EXCLUDED_CONTENT_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoding = encoding
+        self.encoder_factory = encoder_factory
+        self.threadpool_size = threadpool_size
+        self.excluded_content_types = tuple(excluded_content_types)
+        self.send: Send = unattached_send
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.encoder: typing.Optional[Encoder] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def compress(self, data: bytes, finish: bool) -> bytes:
+        assert self.encoder is not None
+        if len(data) >= self.threadpool_size:
+            return await run_in_threadpool(self.encoder.compress, data, finish)
+        return self.encoder.compress(data, finish)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Don't send the initial message until we've determined how to
+            # modify the outgoing headers correctly.
+            self.initial_message = message
+            headers = Headers(raw=self.initial_message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or "content-range" in headers
+                or headers.get("content-type", "").startswith(
+                    self.excluded_content_types
+                )
+            )
+        elif message_type != "http.response.body" or self.passthrough:
+            # Responses which are already encoded, partial, not worth
+            # compressing, or sent through an extension such as
+            # "http.response.pathsend".
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+        elif not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) < self.minimum_size and not more_body:
+                # Don't compress small outgoing responses.
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            self.encoder = self.encoder_factory()
+            message["body"] = await self.compress(body, finish=not more_body)
+            if more_body:
+                # Initial body in streaming response.
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+
+            await self.send(self.initial_message)
+            await self.send(message)
+
+        else:
+            # Remaining body in streaming response.
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            message["body"] = await self.compress(body, finish=not more_body)
+
+            await self.send(message)
+
+
+async def unattached_send(message: Message) -> typing.NoReturn:
+    raise RuntimeError("send awaitable not set")  # pragma: no cover
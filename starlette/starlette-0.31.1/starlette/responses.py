@@ -1,6 +1,7 @@
 import http.cookies
 import json
 import os
+import re
 import stat
 import typing
 from datetime import datetime
@@ -14,7 +15,7 @@ import anyio
 from starlette._compat import md5_hexdigest
 from starlette.background import BackgroundTask
 from starlette.concurrency import iterate_in_threadpool
-from starlette.datastructures import URL, MutableHeaders
+from starlette.datastructures import URL, Headers, MutableHeaders
 from starlette.types import Receive, Scope, Send
 
 
@@ -265,8 +266,64 @@ class StreamingResponse(Response):
             await self.background()
 
 
+# A single "first-last" or "-suffix" entry of a "Range: bytes=..." header.
+_RANGE_SPEC = re.compile(r"(\d*)-(\d*)")
+
+
+def _parse_range_header(
+    value: str, file_size: int
+) -> typing.Optional[typing.List[typing.Tuple[int, int]]]:
+    """
+    Given a "Range" header, like: "bytes=0-99, -500", return the satisfiable
+    byte ranges as sorted `(start, end)` pairs, with `end` exclusive. Ranges
+    which overlap or touch are coalesced.
+
+    Returns `None` if the header should be ignored, and the whole file sent,
+    either because the unit isn't "bytes" or because it's malformed. An empty
+    list means that none of the ranges can be satisfied.
+    """
+    unit, _, range_set = value.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    ranges = []
+    for range_spec in range_set.split(","):
+        match = _RANGE_SPEC.fullmatch(range_spec.strip())
+        if match is None:
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else file_size
+            if last and end <= start:
+                return None
+        elif last:
+            start, end = max(file_size - int(last), 0), file_size
+        else:
+            return None
+        end = min(end, file_size)
+        if start < end:
+            ranges.append((start, end))
+
+    ranges.sort()
+    coalesced: typing.List[typing.Tuple[int, int]] = []
+    for start, end in ranges:
+        if coalesced and start <= coalesced[-1][1]:
+            coalesced[-1] = (coalesced[-1][0], max(end, coalesced[-1][1]))
+        else:
+            coalesced.append((start, end))
+    return coalesced
+
+
 class FileResponse(Response):
+    # Files are read in chunks which start at `chunk_size`, and double with
+    # each read up to `max_chunk_size`, so that small files are sent without
+    # delay and large ones without a thread hop for every 64 KiB.
     chunk_size = 64 * 1024
+    max_chunk_size = 1024 * 1024
+    # A "Range" header which still has more than `max_ranges` ranges after
+    # coalescing is ignored, and the whole file sent, so that one small request
+    # can't make us send thousands of multipart parts.
+    max_ranges = 100
 
     def __init__(
         self,
@@ -313,6 +370,7 @@ class FileResponse(Response):
         self.headers.setdefault("content-length", content_length)
         self.headers.setdefault("last-modified", last_modified)
         self.headers.setdefault("etag", etag)
+        self.headers.setdefault("accept-ranges", "bytes")
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if self.stat_result is None:
@@ -325,6 +383,56 @@ class FileResponse(Response):
                 mode = stat_result.st_mode
                 if not stat.S_ISREG(mode):
                     raise RuntimeError(f"File at path {self.path} is not a file.")
+        else:
+            stat_result = self.stat_result
+
+        ranges = self.requested_ranges(scope, stat_result.st_size)
+        if ranges is None:
+            await self.send_file(scope, send, stat_result.st_size)
+        elif not ranges:
+            await self.send_range_not_satisfiable(send, stat_result.st_size)
+        elif len(ranges) == 1:
+            await self.send_single_range(scope, send, ranges[0], stat_result.st_size)
+        else:
+            await self.send_multiple_ranges(send, ranges, stat_result.st_size)
+        if self.background is not None:
+            await self.background()
+
+    def requested_ranges(
+        self, scope: Scope, file_size: int
+    ) -> typing.Optional[typing.List[typing.Tuple[int, int]]]:
+        """
+        The byte ranges to send, or `None` to send the whole file.
+        """
+        if self.status_code != 200 or scope.get("method") not in ("GET", "HEAD"):
+            return None
+        headers = Headers(scope=scope)
+        http_range = headers.get("range")
+        if http_range is None:
+            return None
+        if_range = headers.get("if-range")
+        if if_range is not None and not self.is_current(if_range):
+            return None
+        ranges = _parse_range_header(http_range, file_size)
+        if ranges is not None and len(ranges) > self.max_ranges:
+            return None
+        return ranges
+
+    def is_current(self, if_range: str) -> bool:
+        """
+        Whether an "If-Range" validator, an entity tag or a date, matches this
+        file. Weak entity tags never match.
+        """
+        if_range = if_range.strip()
+        if if_range.startswith("W/"):
+            return False
+        etag = self.headers.get("etag", "").strip('"')
+        if if_range.strip('"') == etag:
+            return True
+        last_modified: typing.Optional[str] = self.headers.get("last-modified")
+        return if_range == last_modified
+
+    async def send_file(self, scope: Scope, send: Send, file_size: int) -> None:
         await send(
             {
                 "type": "http.response.start",
@@ -332,20 +440,141 @@ class FileResponse(Response):
                 "headers": self.raw_headers,
             }
         )
+        extensions = scope.get("extensions", {})
         if self.send_header_only:
             await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.pathsend" in extensions:
+            await send(
+                {
+                    "type": "http.response.pathsend",
+                    "path": os.path.abspath(self.path),
+                }
+            )
+        elif "http.response.zerocopysend" in extensions:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file.wrapped,
+                        "more_send": False,
+                    }
+                )
         else:
             async with await anyio.open_file(self.path, mode="rb") as file:
-                more_body = True
-                while more_body:
-                    chunk = await file.read(self.chunk_size)
-                    more_body = len(chunk) == self.chunk_size
-                    await send(
-                        {
-                            "type": "http.response.body",
-                            "body": chunk,
-                            "more_body": more_body,
-                        }
-                    )
-        if self.background is not None:
-            await self.background()
+                await self.send_chunks(send, file, 0, file_size, more_body=False)
+
+    async def send_range_not_satisfiable(self, send: Send, file_size: int) -> None:
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        headers["content-range"] = f"bytes */{file_size}"
+        headers["content-length"] = "0"
+        await send(
+            {"type": "http.response.start", "status": 416, "headers": headers.raw}
+        )
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def send_single_range(
+        self,
+        scope: Scope,
+        send: Send,
+        byte_range: typing.Tuple[int, int],
+        file_size: int,
+    ) -> None:
+        start, end = byte_range
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        headers["content-length"] = str(end - start)
+        await send(
+            {"type": "http.response.start", "status": 206, "headers": headers.raw}
+        )
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file.wrapped,
+                        "offset": start,
+                        "count": end - start,
+                        "more_send": False,
+                    }
+                )
+            else:
+                await self.send_chunks(send, file, start, end, more_body=False)
+
+    async def send_multiple_ranges(
+        self,
+        send: Send,
+        ranges: typing.List[typing.Tuple[int, int]],
+        file_size: int,
+    ) -> None:
+        boundary = os.urandom(16).hex()
+        # Each part after the first is preceded by the CRLF which ends the
+        # previous part's body.
+        part_headers = [
+            (
+                ("\r\n" if index else "") + f"--{boundary}\r\n"
+                f"content-type: {self.media_type}\r\n"
+                f"content-range: bytes {start}-{end - 1}/{file_size}\r\n\r\n"
+            ).encode("latin-1")
+            for index, (start, end) in enumerate(ranges)
+        ]
+        closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        content_length = (
+            sum(len(part_header) for part_header in part_headers)
+            + sum(end - start for start, end in ranges)
+            + len(closing)
+        )
+
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        headers["content-length"] = str(content_length)
+        await send(
+            {"type": "http.response.start", "status": 206, "headers": headers.raw}
+        )
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for part_header, (start, end) in zip(part_headers, ranges):
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": part_header,
+                        "more_body": True,
+                    }
+                )
+                await self.send_chunks(send, file, start, end, more_body=True)
+        await send({"type": "http.response.body", "body": closing, "more_body": False})
+
+    async def send_chunks(
+        self,
+        send: Send,
+        file: "anyio.AsyncFile[bytes]",
+        start: int,
+        end: int,
+        more_body: bool,
+    ) -> None:
+        """
+        Send the bytes from `start` up to `end` as "http.response.body"
+        messages, stopping early if the file has been truncated.
+        """
+        if start:
+            await file.seek(start)
+        chunk_size = self.chunk_size
+        while True:
+            size = min(chunk_size, end - start)
+            chunk = await file.read(size) if size else b""
+            start += len(chunk)
+            done = len(chunk) < size or start == end
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": more_body or not done,
+                }
+            )
+            if done:
+                return
+            chunk_size = min(chunk_size * 2, self.max_chunk_size)
@@ -1,5 +1,6 @@
 import contextlib
 import functools
+import heapq
 import inspect
 import re
 import traceback
@@ -178,6 +179,41 @@ def compile_path(
     return re.compile(path_regex), path_format, param_convertors
 
 
+_PathParts = typing.Tuple[typing.Tuple[str, str, Convertor[typing.Any]], ...]
+
+
+def _compile_path_format(
+    path_format: str, param_convertors: typing.Dict[str, Convertor[typing.Any]]
+) -> typing.Tuple[_PathParts, str]:
+    """
+    Given a path format, like: "/users/{username}/posts", return a two-tuple
+    of (parts, tail), for building paths without searching the format string.
+
+    parts: (("/users/", "username", StringConvertor()),)
+    tail:  "/posts"
+    """
+    parts = []
+    idx = 0
+    for match in PARAM_REGEX.finditer(path_format):
+        param_name = match.group(1)
+        if param_name in param_convertors:
+            literal = path_format[idx : match.start()]
+            parts.append((literal, param_name, param_convertors[param_name]))
+            idx = match.end()
+    return tuple(parts), path_format[idx:]
+
+
+def _format_path(
+    parts: _PathParts,
+    tail: str,
+    path_params: typing.Dict[str, typing.Any],
+) -> str:
+    path = ""
+    for literal, param_name, convertor in parts:
+        path += literal + convertor.to_string(path_params[param_name])
+    return path + tail
+
+
 class BaseRoute:
     def matches(self, scope: Scope) -> typing.Tuple[Match, Scope]:
         raise NotImplementedError()  # pragma: no cover
@@ -268,6 +304,9 @@ class Route(BaseRoute):
                 self.methods.add("HEAD")
 
         self.path_regex, self.path_format, self.param_convertors = compile_path(path)
+        self._path_parts, self._path_tail = _compile_path_format(
+            self.path_format, self.param_convertors
+        )
 
     ########################################################################
     #
@@ -294,16 +333,10 @@ class Route(BaseRoute):
         return Match.NONE, {}
 
     def url_path_for(self, name: str, /, **path_params: typing.Any) -> URLPath:
-        seen_params = set(path_params.keys())
-        expected_params = set(self.param_convertors.keys())
-
-        if name != self.name or seen_params != expected_params:
+        if name != self.name or path_params.keys() != self.param_convertors.keys():
             raise NoMatchFound(name, path_params)
 
-        path, remaining_params = replace_params(
-            self.path_format, self.param_convertors, path_params
-        )
-        assert not remaining_params
+        path = _format_path(self._path_parts, self._path_tail, path_params)
         return URLPath(path=path, protocol="http")
 
     ########################################################################
@@ -380,6 +413,9 @@ class WebSocketRoute(BaseRoute):
             self.app = endpoint
 
         self.path_regex, self.path_format, self.param_convertors = compile_path(path)
+        self._path_parts, self._path_tail = _compile_path_format(
+            self.path_format, self.param_convertors
+        )
 
     ########################################################################
     #
@@ -403,16 +439,10 @@ class WebSocketRoute(BaseRoute):
         return Match.NONE, {}
 
     def url_path_for(self, name: str, /, **path_params: typing.Any) -> URLPath:
-        seen_params = set(path_params.keys())
-        expected_params = set(self.param_convertors.keys())
-
-        if name != self.name or seen_params != expected_params:
+        if name != self.name or path_params.keys() != self.param_convertors.keys():
             raise NoMatchFound(name, path_params)
 
-        path, remaining_params = replace_params(
-            self.path_format, self.param_convertors, path_params
-        )
-        assert not remaining_params
+        path = _format_path(self._path_parts, self._path_tail, path_params)
         return URLPath(path=path, protocol="websocket")
 
     async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
@@ -507,7 +537,7 @@ class Mount(BaseRoute):
             )
             if path_kwarg is not None:
                 remaining_params["path"] = path_kwarg
-            for route in self.routes or []:
+            for route in _reverse_candidates(self._base_app, remaining_name):
                 try:
                     url = route.url_path_for(remaining_name, **remaining_params)
                     return URLPath(
@@ -581,7 +611,7 @@ class Host(BaseRoute):
             host, remaining_params = replace_params(
                 self.host_format, self.param_convertors, path_params
             )
-            for route in self.routes or []:
+            for route in _reverse_candidates(self.app, remaining_name):
                 try:
                     url = route.url_path_for(remaining_name, **remaining_params)
                     return URLPath(path=str(url), protocol=url.protocol, host=host)
@@ -652,6 +682,277 @@ class _DefaultLifespan:
         return self
 
 
+def _mutator(name: str) -> typing.Callable[..., typing.Any]:
+    method = getattr(list, name)
+
+    @functools.wraps(method)
+    def wrapper(self: "_RouteList", *args: typing.Any) -> typing.Any:
+        result = method(self, *args)
+        self.version += 1
+        return result
+
+    return wrapper
+
+
+class _RouteList(typing.List[BaseRoute]):
+    """
+    The list behind `Router.routes`.
+
+    Counts in-place modifications, so that the router knows when its
+    dispatch index is out of date.
+    """
+
+    version = 0
+
+
+for _name in (
+    "append",
+    "extend",
+    "insert",
+    "remove",
+    "pop",
+    "clear",
+    "sort",
+    "reverse",
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+):
+    setattr(_RouteList, _name, _mutator(_name))
+del _name
+
+
+class _DispatchTable:
+    """
+    Candidate routes for a single scope type, by position in the route list.
+
+    static:   {path: [position, ...]}, for parameterless `Route`/`WebSocketRoute`.
+              Each entry already includes every other route that could match
+              that path.
+    prefixes: {first path segment: [position, ...]}, for `Mount`s with a fixed
+              prefix.
+    always:   Routes which must be tried on every request. Root mounts, mounts
+              with path parameters, and anything the index doesn't understand.
+    dynamic:  Parameterised routes, matched with one regex alternation.
+    """
+
+    def __init__(self) -> None:
+        self.static: typing.Dict[str, typing.List[int]] = {}
+        self.prefixes: typing.Dict[str, typing.List[int]] = {}
+        self.always: typing.List[int] = []
+        self.dynamic: typing.List[typing.Tuple[int, str]] = []
+        self._dynamic_regexes: typing.Dict[int, typing.Pattern[str]] = {}
+
+    def compile(self) -> None:
+        try:
+            self._dynamic_regex(0)
+        except re.error:
+            # Custom convertor regexes that can't be combined are still
+            # matched route by route.
+            self.always.extend(position for position, _ in self.dynamic)
+            self.always.sort()
+            self.dynamic = []
+
+        for path, positions in self.static.items():
+            self.static[path] = sorted(
+                positions + self.always + list(self.dynamic_positions(path))
+            )
+
+    def _dynamic_regex(self, start: int) -> typing.Pattern[str]:
+        """
+        Alternation of the dynamic routes from `start` onwards. The name of
+        the matched group is the index of the first one that matches.
+        """
+        try:
+            return self._dynamic_regexes[start]
+        except KeyError:
+            pass
+        alternatives = "|".join(
+            f"(?P<_{index}>{pattern})"
+            for index, (_, pattern) in enumerate(self.dynamic)
+            if index >= start
+        )
+        regex = re.compile(f"^(?:{alternatives})$")
+        self._dynamic_regexes[start] = regex
+        return regex
+
+    def dynamic_positions(self, path: str) -> typing.Iterator[int]:
+        start = 0
+        while start < len(self.dynamic):
+            match = self._dynamic_regex(start).match(path)
+            if match is None:
+                return
+            index = int(match.lastgroup[1:])  # type: ignore[index]
+            yield self.dynamic[index][0]
+            start = index + 1
+
+    def positions(self, path: str) -> typing.Iterable[int]:
+        try:
+            positions: typing.Iterable[int] = self.static[path]
+        except KeyError:
+            positions = self.always
+            if self.dynamic:
+                positions = heapq.merge(positions, self.dynamic_positions(path))
+
+        prefixed = self.prefixes.get(path[1:].partition("/")[0])
+        if prefixed:
+            positions = heapq.merge(positions, prefixed)
+        return positions
+
+
+class _ReverseTable:
+    """
+    Routes which may build a URL for a given name, by position in the route list.
+
+    names:    {name: [position, ...]}, for named routes, mounts and hosts.
+              Each entry already includes the `always` routes.
+    prefixes: {mount name: [position, ...]}, for "<mount_name>:<child_name>".
+    always:   Unnamed mounts and hosts, which pass any name on to their
+              routes, and anything the index doesn't understand.
+    """
+
+    def __init__(self, routes: typing.Tuple[BaseRoute, ...]) -> None:
+        self.routes = routes
+        self.names: typing.Dict[str, typing.List[int]] = {}
+        self.prefixes: typing.Dict[str, typing.List[int]] = {}
+        self.always: typing.List[int] = []
+        self.unnamed: typing.Dict[int, ASGIApp] = {}
+
+        for position, route in enumerate(routes):
+            route_class = type(route)
+            if (
+                isinstance(route, Route)
+                and route_class.url_path_for is Route.url_path_for
+            ) or (
+                isinstance(route, WebSocketRoute)
+                and route_class.url_path_for is WebSocketRoute.url_path_for
+            ):
+                self.names.setdefault(route.name, []).append(position)
+            elif (
+                isinstance(route, Mount)
+                and route_class.url_path_for is Mount.url_path_for
+            ) or (
+                isinstance(route, Host)
+                and route_class.url_path_for is Host.url_path_for
+            ):
+                if route.name is None:
+                    self.always.append(position)
+                    app = route._base_app if isinstance(route, Mount) else route.app
+                    self.unnamed[position] = app
+                else:
+                    self.names.setdefault(route.name, []).append(position)
+                    self.prefixes.setdefault(route.name, []).append(position)
+            else:
+                self.always.append(position)
+
+        for name, positions in self.names.items():
+            self.names[name] = sorted(positions + self.always)
+
+    def candidates(self, name: str) -> typing.Iterator[BaseRoute]:
+        positions: typing.Iterable[int] = self.names.get(name, self.always)
+        idx = name.find(":")
+        while idx != -1:
+            prefixed = self.prefixes.get(name[:idx])
+            if prefixed:
+                positions = heapq.merge(positions, prefixed)
+            idx = name.find(":", idx + 1)
+
+        routes, unnamed = self.routes, self.unnamed
+        for position in positions:
+            if position in unnamed:
+                # Skip unnamed mounts which have no route of that name.
+                children = iter(_reverse_candidates(unnamed[position], name))
+                if next(children, None) is None:
+                    continue
+            yield routes[position]
+
+
+def _reverse_candidates(app: typing.Any, name: str) -> typing.Iterable[BaseRoute]:
+    """
+    The routes of a mounted app which may build a URL for `name`.
+    """
+    routes = getattr(app, "routes", None) or []
+    router = getattr(app, "router", app)
+    if isinstance(router, Router) and router.routes is routes:
+        return router._get_dispatch_index().reverse_candidates(name)
+    return routes
+
+
+class _DispatchIndex:
+    """
+    Precompiled lookup of the routes which may match a given path.
+
+    The index only narrows the list of routes down to those which could match.
+    The router still calls `.matches()` on each of them, in their original
+    order, so first-match ordering and partial matches behave exactly as
+    if every route had been tried.
+    """
+
+    def __init__(self, routes: typing.List[BaseRoute], version: int) -> None:
+        self.routes = tuple(routes)
+        self.version = version
+        self.tables = {"http": _DispatchTable(), "websocket": _DispatchTable()}
+
+        http, websocket = self.tables["http"], self.tables["websocket"]
+        for position, route in enumerate(self.routes):
+            route_class = type(route)
+            if isinstance(route, Route) and route_class.matches is Route.matches:
+                self._add_path_route(http, position, route)
+            elif (
+                isinstance(route, WebSocketRoute)
+                and route_class.matches is WebSocketRoute.matches
+            ):
+                self._add_path_route(websocket, position, route)
+            elif isinstance(route, Mount) and route_class.matches is Mount.matches:
+                for table in (http, websocket):
+                    if route.path and list(route.param_convertors) == ["path"]:
+                        key = route.path[1:].partition("/")[0]
+                        table.prefixes.setdefault(key, []).append(position)
+                    else:
+                        table.always.append(position)
+            else:
+                http.always.append(position)
+                websocket.always.append(position)
+
+        for table in (http, websocket):
+            table.compile()
+
+        self._reverse: typing.Optional[_ReverseTable] = None
+
+    def _add_path_route(
+        self,
+        table: _DispatchTable,
+        position: int,
+        route: typing.Union[Route, WebSocketRoute],
+    ) -> None:
+        pattern = route.path_regex.pattern
+        if pattern == "^" + re.escape(route.path) + "$":
+            table.static.setdefault(route.path, []).append(position)
+        elif pattern.startswith("^") and pattern.endswith("$"):
+            # Path parameters become plain groups, so that parameter
+            # names can repeat between routes.
+            for name in route.param_convertors:
+                pattern = pattern.replace(f"(?P<{name}>", "(?:")
+            table.dynamic.append((position, pattern[1:-1]))
+        else:
+            table.always.append(position)
+
+    def reverse_candidates(self, name: str) -> typing.Iterator[BaseRoute]:
+        if self._reverse is None:
+            self._reverse = _ReverseTable(self.routes)
+        return self._reverse.candidates(name)
+
+    def candidates(self, scope_type: str, path: str) -> typing.Iterable[BaseRoute]:
+        table = self.tables.get(scope_type)
+        if table is None or path.endswith("\n"):
+            # A trailing "$" also matches before a final newline,
+            # which the static lookup doesn't account for.
+            return self.routes
+        routes = self.routes
+        return (routes[position] for position in table.positions(path))
+
+
 class Router:
     def __init__(
         self,
@@ -668,7 +969,8 @@ class Router:
         # which the router cannot know statically, so we use typing.Any
         lifespan: typing.Optional[Lifespan[typing.Any]] = None,
     ) -> None:
-        self.routes = [] if routes is None else list(routes)
+        self._routes = _RouteList([] if routes is None else routes)
+        self._dispatch_index: typing.Optional[_DispatchIndex] = None
         self.redirect_slashes = redirect_slashes
         self.default = self.not_found if default is None else default
         self.on_startup = [] if on_startup is None else list(on_startup)
@@ -712,6 +1014,26 @@ class Router:
         else:
             self.lifespan_context = lifespan
 
+    @property
+    def routes(self) -> typing.List[BaseRoute]:
+        return self._routes
+
+    @routes.setter
+    def routes(self, routes: typing.List[BaseRoute]) -> None:
+        self._routes = _RouteList(routes)
+        self._dispatch_index = None
+
+    def _get_dispatch_index(self) -> _DispatchIndex:
+        """
+        Returns the dispatch index, rebuilding it if the routes have been
+        modified since it was last built.
+        """
+        index = self._dispatch_index
+        if index is None or index.version != self._routes.version:
+            index = _DispatchIndex(self._routes, self._routes.version)
+            self._dispatch_index = index
+        return index
+
     async def not_found(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] == "websocket":
             websocket_close = WebSocketClose()
@@ -728,7 +1050,7 @@ class Router:
         await response(scope, receive, send)
 
     def url_path_for(self, name: str, /, **path_params: typing.Any) -> URLPath:
-        for route in self.routes:
+        for route in self._get_dispatch_index().reverse_candidates(name):
             try:
                 return route.url_path_for(name, **path_params)
             except NoMatchFound:
@@ -798,8 +1120,9 @@ class Router:
             return
 
         partial = None
+        index = self._get_dispatch_index()
 
-        for route in self.routes:
+        for route in index.candidates(scope["type"], scope["path"]):
             # Determine if any route matches the incoming scope,
             # and hand over to the matching route if found.
             match, child_scope = route.matches(scope)
@@ -826,7 +1149,9 @@ class Router:
             else:
                 redirect_scope["path"] = redirect_scope["path"] + "/"
 
-            for route in self.routes:
+            for route in index.candidates(
+                redirect_scope["type"], redirect_scope["path"]
+            ):
                 match, child_scope = route.matches(redirect_scope)
                 if match != Match.NONE:
                     redirect_url = URL(scope=redirect_scope)
@@ -10,7 +10,12 @@ from starlette.background import BackgroundTask
 from starlette.middleware import Middleware
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
-from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.responses import (
+    FileResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from starlette.routing import Route, WebSocketRoute
 from starlette.testclient import TestClient
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
@@ -897,3 +902,56 @@ def test_pr_1519_comment_1236166180_example() -> None:
     resp.raise_for_status()
 
     assert bodies == [b"Hello, World!-foo"]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "extension, http_range, expected_body",
+    [
+        ("http.response.zerocopysend", None, b"<file content>" * 10000),
+        ("http.response.zerocopysend", b"bytes=1-4", b"file"),
+        ("http.response.pathsend", None, None),
+    ],
+)
+async def test_file_response_send_extensions(
+    tmp_path, extension, http_range, expected_body
+) -> None:
+    path = tmp_path / "example.txt"
+    path.write_bytes(b"<file content>" * 10000)
+
+    async def endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+        await FileResponse(path)(scope, receive, send)
+
+    class CustomHeaderMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
+            response = await call_next(request)
+            response.headers["Custom-Header"] = "Example"
+            return response
+
+    headers = [] if http_range is None else [(b"range", http_range)]
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": headers,
+        "extensions": {extension: {}},
+    }
+
+    async def receive() -> Message:
+        await anyio.sleep_forever()  # pragma: no cover
+
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    await CustomHeaderMiddleware(endpoint)(scope, receive, send)
+
+    assert (b"custom-header", b"Example") in messages[0]["headers"]
+    if expected_body is None:
+        assert messages[1:] == [{"type": "http.response.pathsend", "path": str(path)}]
+    else:
+        # The file is read by the middleware, rather than sent by the server.
+        assert {message["type"] for message in messages[1:]} == {"http.response.body"}
+        assert b"".join(message["body"] for message in messages[1:]) == expected_body
+        assert messages[-1]["more_body"] is False
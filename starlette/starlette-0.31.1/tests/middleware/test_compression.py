@@ -0,0 +1,93 @@
+import zlib
+
+import pytest
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware, compression
+from starlette.middleware.compression import (
+    CompressionMiddleware,
+    available_encodings,
+    parse_accept_encoding,
+)
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+
+def homepage(request):
+    return PlainTextResponse("x" * 4000, status_code=200)
+
+
+def stream(request):
+    async def generator(bytes, count):
+        for index in range(count):
+            yield bytes
+
+    return StreamingResponse(generator(bytes=b"x" * 400, count=10), status_code=200)
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, BR;q=0.5, zstd; q=0, *;q=x") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "zstd": 0.0,
+        "*": 0.0,
+    }
+    assert parse_accept_encoding("") == {}
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("*", "zstd"),
+        ("*, zstd;q=0", "br"),
+        ("identity", None),
+        ("gzip;q=0", None),
+        ("", None),
+    ],
+)
+def test_select_encoding(accept_encoding, expected):
+    middleware = CompressionMiddleware(PlainTextResponse(""))
+    middleware.encodings = ("zstd", "br", "gzip")  # As if all were installed.
+    assert middleware.select_encoding(accept_encoding) == expected
+
+
+def test_unsupported_encoding():
+    with pytest.raises(AssertionError):
+        CompressionMiddleware(PlainTextResponse(""), encodings=["deflate"])
+
+
+def test_available_encodings_end_with_gzip():
+    assert available_encodings()[-1] == "gzip"
+
+
+def decompress(encoding, body):
+    if encoding == "br":
+        return compression.brotli.decompress(body)
+    if encoding == "zstd":
+        decompressor = compression.zstandard.ZstdDecompressor().decompressobj()
+        return decompressor.decompress(body)
+    return zlib.decompress(body, zlib.MAX_WBITS | 16)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+@pytest.mark.parametrize("path", ["/", "/stream"])
+def test_compressed_responses(test_client_factory, encoding, path):
+    if encoding not in available_encodings():
+        pytest.skip(f"{encoding} is not installed")
+
+    app = Starlette(
+        routes=[Route("/", endpoint=homepage), Route("/stream", endpoint=stream)],
+        middleware=[Middleware(CompressionMiddleware, encodings=[encoding])],
+    )
+
+    client = test_client_factory(app)
+    with client.stream("GET", path, headers={"accept-encoding": encoding}) as response:
+        # httpx doesn't decode every encoding, so check the raw body.
+        body = b"".join(response.iter_raw())
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert decompress(encoding, body) == b"x" * 4000
@@ -1,8 +1,17 @@
+import zlib
+
+import anyio
+
 from starlette.applications import Starlette
 from starlette.middleware import Middleware
 from starlette.middleware.gzip import GZipMiddleware
-from starlette.responses import PlainTextResponse, StreamingResponse
-from starlette.routing import Route
+from starlette.responses import (
+    FileResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.routing import Route, Router
 
 
 def test_gzip_responses(test_client_factory):
@@ -100,3 +109,92 @@ def test_gzip_ignored_for_responses_with_encoding_set(test_client_factory):
     assert response.text == "x" * 4000
     assert response.headers["Content-Encoding"] == "text"
     assert "Content-Length" not in response.headers
+
+
+def test_gzip_streaming_response_is_flushed_per_chunk():
+    chunks = []
+
+    def homepage(request):
+        async def generator(bytes, count):
+            for index in range(count):
+                yield bytes
+
+        streaming = generator(bytes=b"x" * 400, count=10)
+        return StreamingResponse(streaming, status_code=200)
+
+    app = GZipMiddleware(Router(routes=[Route("/", endpoint=homepage)]))
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message["body"])
+
+    async def receive():
+        await anyio.sleep_forever()
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    anyio.run(app, scope, receive, send)
+
+    # Each chunk decompresses to its own content as soon as it arrives.
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    assert [decompressor.decompress(chunk) for chunk in chunks] == [
+        b"x" * 400
+    ] * 10 + [b""]
+    assert decompressor.eof
+
+
+def test_gzip_ignored_for_compressed_media_types(test_client_factory):
+    def homepage(request):
+        return Response(b"\x89PNG" + b"x" * 4000, media_type="image/png")
+
+    app = Starlette(
+        routes=[Route("/", endpoint=homepage)],
+        middleware=[Middleware(GZipMiddleware)],
+    )
+
+    client = test_client_factory(app)
+    response = client.get("/", headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert int(response.headers["Content-Length"]) == 4004
+
+
+def test_gzip_ignored_for_partial_content(tmp_path, test_client_factory):
+    path = tmp_path / "example.txt"
+    path.write_bytes(b"x" * 4000)
+
+    def homepage(request):
+        return FileResponse(path)
+
+    app = Starlette(
+        routes=[Route("/", endpoint=homepage)],
+        middleware=[Middleware(GZipMiddleware)],
+    )
+
+    client = test_client_factory(app)
+    response = client.get(
+        "/", headers={"accept-encoding": "gzip", "range": "bytes=0-1999"}
+    )
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.content == b"x" * 2000
+
+
+def test_gzip_large_responses_in_threadpool(test_client_factory):
+    def homepage(request):
+        return PlainTextResponse("x" * 4000, status_code=200)
+
+    app = Starlette(
+        routes=[Route("/", endpoint=homepage)],
+        middleware=[Middleware(GZipMiddleware, threadpool_size=1000)],
+    )
+
+    client = test_client_factory(app)
+    response = client.get("/", headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.text == "x" * 4000
+    assert response.headers["Content-Encoding"] == "gzip"
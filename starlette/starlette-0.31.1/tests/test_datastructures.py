@@ -244,6 +244,48 @@ def test_mutable_headers_from_scope():
     assert list(h.raw) == [(b"a", b"1"), (b"b", b"2")]
 
 
+def test_headers_index_shared_by_scope():
+    scope = {"headers": [(b"a", b"1"), (b"b", b"2"), (b"a", b"3")]}
+    h = Headers(scope=scope)
+    assert h["a"] == "1"
+    assert Headers(scope=scope)._index is h._index
+
+    # Changing scope["headers"] in place rebuilds the index.
+    scope["headers"][0] = (b"c", b"4")
+    h = Headers(scope=scope)
+    assert h.getlist("a") == ["3"]
+    assert h["c"] == "4"
+
+    # So does changing it through mutable headers.
+    m = MutableHeaders(scope=scope)
+    del m["c"]
+    m["d"] = "5"
+    h = Headers(scope=scope)
+    assert h.items() == [("b", "2"), ("a", "3"), ("d", "5")]
+    assert h["d"] == "5"
+    assert "c" not in h
+
+
+def test_mutable_headers_index():
+    raw = [(b"a", b"1"), (b"b", b"2"), (b"a", b"3")]
+    h = MutableHeaders(raw=raw)
+    assert h.getlist("a") == ["1", "3"]
+    h["a"] = "4"
+    assert h.getlist("a") == ["4"]
+    assert h["b"] == "2"
+    h.append("b", "5")
+    assert h.getlist("b") == ["2", "5"]
+    del h["a"]
+    assert h.setdefault("c", "6") == "6"
+    assert h.get("b") == "2"
+    assert h.get("a") is None
+
+    # Raw headers appended directly are picked up.
+    raw.append((b"e", b"7"))
+    assert h["e"] == "7"
+    assert h.items() == [("b", "2"), ("b", "5"), ("c", "6"), ("e", "7")]
+
+
 def test_url_blank_params():
     q = QueryParams("a=123&abc&def&b=456")
     assert "a" in q
@@ -463,3 +463,198 @@ async def test_streaming_response_stops_if_receiving_http_disconnect():
     with anyio.move_on_after(1) as cancel_scope:
         await response({}, receive_disconnect, send)
     assert not cancel_scope.cancel_called, "Content streaming should stop itself."
+
+
+@pytest.fixture
+def range_file(tmpdir):
+    path = os.path.join(tmpdir, "range.txt")
+    content = bytes(range(256)) * 4
+    with open(path, "wb") as file:
+        file.write(content)
+    return path, content
+
+
+def test_file_response_single_range(range_file, test_client_factory):
+    path, content = range_file
+    app = FileResponse(path=path)
+    client: TestClient = test_client_factory(app)
+
+    response = client.get("/", headers={"Range": "bytes=10-19"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+    assert response.headers["content-length"] == "10"
+    assert response.headers["accept-ranges"] == "bytes"
+
+    response = client.get("/", headers={"Range": "bytes=-100"})
+    assert response.content == content[-100:]
+
+    response = client.get("/", headers={"Range": "bytes=1000-"})
+    assert response.content == content[1000:]
+
+    response = client.head("/", headers={"Range": "bytes=0-1"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.headers["content-length"] == "2"
+    assert response.content == b""
+
+
+def test_file_response_multiple_ranges(range_file, test_client_factory):
+    path, content = range_file
+    app = FileResponse(path=path)
+    client: TestClient = test_client_factory(app)
+    response = client.get("/", headers={"Range": "bytes=0-9, 20-29, 5-14, -4"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.headers["content-length"] == str(len(response.content))
+
+    media_type, _, boundary = response.headers["content-type"].partition(
+        "; boundary="
+    )
+    assert media_type == "multipart/byteranges"
+    parts = response.content.split(b"--" + boundary.encode())
+    assert parts[0] == b"" and parts[-1] == b"--\r\n"
+    expected = [(0, 15), (20, 30), (len(content) - 4, len(content))]
+    assert len(parts[1:-1]) == len(expected)
+    for part, (start, end) in zip(parts[1:-1], expected):
+        part_headers, _, body = part.partition(b"\r\n\r\n")
+        assert part_headers.split(b"\r\n")[1:] == [
+            b"content-type: text/plain",
+            f"content-range: bytes {start}-{end - 1}/{len(content)}".encode(),
+        ]
+        assert body == content[start:end] + b"\r\n"
+
+
+def test_file_response_range_not_satisfiable(range_file, test_client_factory):
+    path, content = range_file
+    app = FileResponse(path=path)
+    client: TestClient = test_client_factory(app)
+    response = client.get("/", headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
+    assert response.content == b""
+
+
+def test_file_response_too_many_ranges(range_file, test_client_factory):
+    path, content = range_file
+    app = FileResponse(path=path)
+    client: TestClient = test_client_factory(app)
+
+    # Ranges which don't touch aren't coalesced, and past the limit the
+    # header is ignored.
+    too_many = ",".join(f"{n}-{n}" for n in range(0, 2 * 101, 2))
+    response = client.get("/", headers={"Range": f"bytes={too_many}"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == content
+
+    at_limit = ",".join(f"{n}-{n}" for n in range(0, 2 * 100, 2))
+    response = client.get("/", headers={"Range": f"bytes={at_limit}"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+
+    # Touching ranges are coalesced before the limit is applied.
+    touching = ",".join(f"{n}-{n}" for n in range(200))
+    response = client.get("/", headers={"Range": f"bytes={touching}"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == content[:200]
+
+
+@pytest.mark.parametrize(
+    "http_range", ["items=0-1", "bytes=5-1", "bytes=-", "bytes=1-2,x", "bytes=+1-2"]
+)
+def test_file_response_ignores_invalid_range(
+    range_file, test_client_factory, http_range
+):
+    path, content = range_file
+    app = FileResponse(path=path)
+    client: TestClient = test_client_factory(app)
+    response = client.get("/", headers={"Range": http_range})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == content
+
+
+def test_file_response_if_range(range_file, test_client_factory):
+    path, content = range_file
+    app = FileResponse(path=path)
+    client: TestClient = test_client_factory(app)
+    headers = client.get("/").headers
+
+    for if_range in (headers["etag"], f'"{headers["etag"]}"', headers["last-modified"]):
+        response = client.get("/", headers={"Range": "bytes=0-0", "If-Range": if_range})
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response.content == content[:1]
+
+    for if_range in ('"outdated"', f'W/"{headers["etag"]}"', "outdated"):
+        response = client.get("/", headers={"Range": "bytes=0-0", "If-Range": if_range})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == content
+
+
+def test_file_response_adaptive_chunk_size(range_file, monkeypatch):
+    path, content = range_file
+    monkeypatch.setattr(FileResponse, "chunk_size", 16)
+    monkeypatch.setattr(FileResponse, "max_chunk_size", 64)
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": []}
+    anyio.run(FileResponse(path=path), scope, None, send)
+    sizes = [len(message["body"]) for message in messages[1:]]
+    assert sizes == [16, 32] + [64] * 15 + [16]
+    assert b"".join(message["body"] for message in messages[1:]) == content
+    assert [message["more_body"] for message in messages[1:]][-2:] == [True, False]
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ([], {"type": "http.response.zerocopysend", "more_send": False}),
+        (
+            [(b"range", b"bytes=10-19")],
+            {
+                "type": "http.response.zerocopysend",
+                "offset": 10,
+                "count": 10,
+                "more_send": False,
+            },
+        ),
+    ],
+)
+def test_file_response_zerocopysend(range_file, headers, expected):
+    path, content = range_file
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            assert not message.pop("file").closed
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": headers,
+        "extensions": {"http.response.zerocopysend": {}},
+    }
+    anyio.run(FileResponse(path=path), scope, None, send)
+    assert messages[0]["type"] == "http.response.start"
+    assert messages[1:] == [expected]
+
+
+def test_file_response_pathsend(range_file):
+    path, content = range_file
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [],
+        "extensions": {
+            "http.response.pathsend": {},
+            "http.response.zerocopysend": {},
+        },
+    }
+    anyio.run(FileResponse(path=os.path.relpath(path)), scope, None, send)
+    assert messages[0]["status"] == 200
+    assert messages[1:] == [{"type": "http.response.pathsend", "path": path}]
@@ -1159,3 +1159,76 @@ def test_decorator_deprecations() -> None:
             ...  # pragma: nocover
 
         router.on_event("startup")(startup)
+
+
+def test_dispatch_index_preserves_route_order(
+    test_client_factory: typing.Callable[..., TestClient],
+) -> None:
+    def endpoint(name: str) -> typing.Callable[[Request], Response]:
+        def handler(request: Request) -> Response:
+            return PlainTextResponse(name)
+
+        return handler
+
+    app = Router(
+        [
+            Route("/users/{username}", endpoint("dynamic")),
+            Route("/users/me", endpoint("static")),
+            Route("/items/{value:float}", endpoint("float"), methods=["POST"]),
+            Route("/items/{value:int}", endpoint("int")),
+            Mount("/files", routes=[Route("/{path:path}", endpoint("mount"))]),
+            Route("/files/latest", endpoint("shadowed")),
+        ]
+    )
+    client = test_client_factory(app)
+
+    assert client.get("/users/me").text == "dynamic"
+    assert client.get("/items/1.5").status_code == 405
+    assert client.get("/items/1").text == "int"
+    assert client.get("/files/latest").text == "mount"
+    assert client.get("/users/me/").status_code == 200  # redirected
+    assert client.get("/nope").status_code == 404
+
+
+def test_dispatch_index_rebuilt_on_route_changes(
+    test_client_factory: typing.Callable[..., TestClient],
+) -> None:
+    app = Router([Route("/", homepage)])
+    client = test_client_factory(app)
+    assert client.get("/users").status_code == 404
+
+    app.routes.append(Route("/users", homepage))
+    assert client.get("/users").status_code == 200
+
+    app.routes.insert(0, Route("/users", homepage, methods=["POST"]))
+    assert client.get("/users").status_code == 200
+    assert client.delete("/users").status_code == 405
+
+    del app.routes[:]
+    assert client.get("/users").status_code == 404
+
+    app.routes = [Route("/users", homepage)]
+    assert client.get("/users").status_code == 200
+
+
+def test_url_path_for_index() -> None:
+    users = Router([Route("/{username}", homepage, name="user")])
+    app = Router(
+        [
+            Route("/user/{id:int}", homepage, name="user"),
+            Mount("/users", app=users),
+            Mount("/api", routes=[Mount("/v1", app=users, name="v1")], name="api"),
+        ]
+    )
+
+    assert app.url_path_for("user", id=1) == "/user/1"
+    assert app.url_path_for("user", username="tom") == "/users/tom"
+    assert app.url_path_for("api:v1:user", username="tom") == "/api/v1/tom"
+    with pytest.raises(NoMatchFound):
+        app.url_path_for("user", name="tom")
+    with pytest.raises(NoMatchFound):
+        app.url_path_for("api:user", username="tom")
+
+    users.routes.append(Route("/{username}/posts", homepage, name="posts"))
+    assert app.url_path_for("posts", username="tom") == "/users/tom/posts"
+    assert app.url_path_for("api:v1:posts", username="tom") == "/api/v1/tom/posts"